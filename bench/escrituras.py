@@ -0,0 +1,168 @@
+"""Prueba de estrés: escritores concurrentes en varios procesos.
+
+Simula la hora punta de la comida: varios puestos guardan ventas, gastos,
+compras y mermas a la vez sobre el mismo almacén. Cada proceso hace sus
+altas por la misma ruta que las páginas (journal de ventas y escritura
+diferida de ``compartido.anotar``) y al final se comprueba que no se ha
+perdido ninguna fila y que todas las tablas se leen enteras.
+
+    python bench/escrituras.py [--procesos 8] [--altas 40] [--backend csv]
+        [--matar]
+
+Con ``--matar`` se mata (SIGKILL) un escritor a mitad de la prueba: sus
+altas confirmadas deben estar y ninguna tabla puede quedar truncada.
+Termina con código 1 si falta alguna fila o alguna tabla no se puede leer.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd  # noqa: E402
+
+from oyken import compartido  # noqa: E402
+from oyken.storage import almacen  # noqa: E402
+from oyken.ventas import cargar_ventas, compactar, registrar_venta  # noqa: E402
+
+TABLAS = ("ventas", "gastos", "compras", "mermas")
+
+
+# =========================
+# ESCRITOR (PROCESO HIJO)
+# =========================
+def _alta(a, tabla, proceso, i):
+    if tabla == "ventas":
+        # Una fecha distinta por alta: ventas deduplica por fecha
+        fecha = date(2000, 1, 1) + timedelta(days=proceso * 10_000 + i)
+        registrar_venta({"fecha": fecha, "ventas_total_eur": 100.0}, a)
+        return
+
+    fila = {"Fecha": "01/01/2000", "Mes": "2000-01", "Coste (€)": 1.0}
+    if tabla == "gastos":
+        fila["Concepto"] = f"p{proceso}-{i}"
+    elif tabla == "compras":
+        fila["Proveedor"] = f"p{proceso}-{i}"
+    else:
+        fila = {"Fecha": "01/01/2000", "Mes": "2000-01", "Producto": f"p{proceso}-{i}", "Cantidad": 1.0}
+
+    compartido.anotar(tabla, fila, a)
+
+
+def _escritor(backend, raiz, proceso, altas, confirmaciones):
+    # Una línea por alta confirmada (sobrevive a un SIGKILL del escritor)
+    a = almacen(backend, raiz)
+    with open(confirmaciones, "w", buffering=1) as f:
+        for i in range(altas):
+            for tabla in TABLAS:
+                inicio = time.perf_counter()
+                _alta(a, tabla, proceso, i)
+                f.write(f"{tabla} {time.perf_counter() - inicio}\n")
+
+
+def _confirmadas(ruta):
+    if not ruta.exists():
+        return []
+    with open(ruta) as f:
+        return [linea.split() for linea in f if linea.endswith("\n")]
+
+
+# =========================
+# COMPROBACIÓN
+# =========================
+def _filas(a, tabla):
+    if tabla == "ventas":
+        compactar(a)
+        return len(cargar_ventas(a))
+    # Tabla + altas aún en el journal; tras volcar, la tabla sola
+    pendientes = len(compartido.tabla(tabla, a))
+    compartido.volcar(tabla, a)
+    if len(a.leer(tabla)) != pendientes:
+        raise RuntimeError("el volcado no coincide con la lectura unida")
+    return pendientes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python bench/escrituras.py",
+        description="Escritores concurrentes: filas perdidas, tablas truncadas y latencia."
+    )
+    parser.add_argument("--procesos", type=int, default=8)
+    parser.add_argument("--altas", type=int, default=40, help="altas por proceso y tabla")
+    parser.add_argument("--backend", default="csv", choices=["csv", "parquet", "sqlite"])
+    parser.add_argument("--matar", action="store_true", help="matar un escritor a mitad")
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as raiz, tempfile.TemporaryDirectory() as salida:
+        confirmaciones = [Path(salida) / f"p{p}.txt" for p in range(args.procesos)]
+        procesos = [
+            contexto.Process(
+                target=_escritor,
+                args=(args.backend, raiz, p, args.altas, confirmaciones[p])
+            )
+            for p in range(args.procesos)
+        ]
+
+        inicio = time.perf_counter()
+        for p in procesos:
+            p.start()
+
+        if args.matar:
+            while len(_confirmadas(confirmaciones[0])) < args.altas * len(TABLAS) // 3:
+                time.sleep(0.01)
+            os.kill(procesos[0].pid, signal.SIGKILL)
+
+        for p in procesos:
+            p.join()
+        segundos = time.perf_counter() - inicio
+
+        tiempos = [
+            (p, tabla, float(s))
+            for p, ruta in enumerate(confirmaciones)
+            for tabla, s in _confirmadas(ruta)
+        ]
+        a = almacen(args.backend, raiz)
+        df = pd.DataFrame(tiempos, columns=["proceso", "tabla", "segundos"])
+        confirmadas = df.groupby("tabla").size()
+
+        print(
+            f"{args.procesos} procesos · {len(df)} altas en {segundos:.1f} s "
+            f"({len(df) / segundos:.0f} altas/s) · backend {args.backend}"
+        )
+        print(f"{'tabla':<9}{'altas':>7}{'filas':>7}{'p50 (ms)':>10}{'p95 (ms)':>10}  estado")
+
+        fallos = 0
+        for tabla in TABLAS:
+            lat = df.loc[df["tabla"] == tabla, "segundos"] * 1000
+            try:
+                filas = _filas(a, tabla)
+            except Exception as e:  # tabla ilegible (truncada)
+                filas, estado = None, f"ILEGIBLE: {e}"
+            else:
+                # Con --matar puede quedar una alta escrita sin confirmar
+                esperadas = confirmadas.get(tabla, 0)
+                if filas < esperadas:
+                    estado = "FILAS PERDIDAS"
+                elif filas > esperadas + args.matar:
+                    estado = "FILAS DE MÁS"
+                else:
+                    estado = "OK"
+            fallos += estado != "OK"
+            print(
+                f"{tabla:<9}{confirmadas.get(tabla, 0):>7}{filas if filas is not None else '-':>7}"
+                f"{lat.quantile(0.50):>10.1f}{lat.quantile(0.95):>10.1f}  {estado}"
+            )
+
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    main()
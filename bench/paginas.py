@@ -0,0 +1,269 @@
+"""Benchmark de páginas con Streamlit AppTest y presupuestos de latencia.
+
+Ejecuta cada página de ``pages/`` (y ``app.py``) sin navegador contra los
+almacenes sintéticos de ``oyken.sintetico`` y mide, por página y dataset:
+
+- ``frio_ms``: primera ejecución en un proceso nuevo (cachés vacías);
+- ``cambio_local_ms``: primera ejecución contra los demás locales, con el
+  proceso ya caliente (solo multi-local);
+- ``rerun_ms``: re-ejecución sin cambios;
+- ``interaccion_ms``: la interacción típica de la página, si la tiene
+  (guardar venta, gasto o compra, cambiar de mes...);
+- ``rss_pico_mb``: RSS pico del proceso;
+- ``bytes_escritos``: bytes enviados a disco por el proceso en cada paso
+  (``write_bytes`` de /proc/self/io, en páginas de 4 KiB; incluye los
+  recálculos en segundo plano y excluye la salida por consola).
+
+    python bench/paginas.py [--anios 1 5 10] [--locales 1 3]
+        [--backend csv] [--paginas 001 006] [--datos DIR] [--informe FICHERO]
+
+El informe JSON incluye el presupuesto aplicado a cada página
+(``bench/presupuestos.json``) y los que se superan; el proceso termina con
+código 1 si hay alguno, de modo que puede usarse antes de desplegar.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from oyken.derivados import HILO_CONSOLIDACION  # noqa: E402
+from oyken.sintetico import generar_locales, raices_locales  # noqa: E402
+
+PRESUPUESTOS = Path(__file__).with_name("presupuestos.json")
+
+TIMEOUT_PAGINA = 300
+
+
+# =========================
+# INTERACCIONES POR PÁGINA
+# =========================
+def _guardar_venta(at):
+    at.number_input[0].set_value(123.0)
+    return at.button[0].click()
+
+
+def _registrar_gasto(at):
+    at.text_input[0].set_value("Bench")
+    at.number_input[0].set_value(99.0)
+    return at.button[0].click()
+
+
+def _registrar_compra(at):
+    at.number_input[0].set_value(250.0)
+    return at.button[0].click()
+
+
+def _cambiar_mes(at):
+    return at.selectbox[0].set_value(date.today().month)
+
+
+INTERACCIONES = {
+    "pages/001_Control_Operativo.py": _guardar_venta,
+    "pages/002_Gastos.py": _registrar_gasto,
+    "pages/003_Compras.py": _registrar_compra,
+    "pages/006_Breakeven.py": _cambiar_mes,
+}
+
+
+# =========================
+# MEDICIÓN (PROCESO HIJO)
+# =========================
+def _bytes_escritos():
+    try:
+        with open("/proc/self/io") as f:
+            campos = dict(linea.split(": ") for linea in f.read().splitlines())
+        return int(campos["write_bytes"])
+    except OSError:
+        return None
+
+
+def _esperar_consolidacion():
+    for hilo in threading.enumerate():
+        if hilo.name == HILO_CONSOLIDACION:
+            hilo.join(TIMEOUT_PAGINA)
+
+
+def _paso(at, accion):
+    escritos = _bytes_escritos()
+    inicio = time.perf_counter()
+    at = accion(at).run()
+    segundos = time.perf_counter() - inicio
+    _esperar_consolidacion()
+
+    if escritos is not None:
+        escritos = _bytes_escritos() - escritos
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return at, segundos * 1000, escritos
+
+
+def _medir(pagina, raices, backend):
+    # Los .pyc no cuentan como escrituras de la página
+    sys.dont_write_bytecode = True
+    os.environ["OYKEN_STORAGE"] = backend
+    from streamlit.testing.v1 import AppTest
+
+    interaccion = INTERACCIONES.get(pagina)
+    pasos = []
+
+    for raiz in raices:
+        os.environ["OYKEN_DATA_DIR"] = str(raiz)
+        os.chdir(raiz)
+
+        at = AppTest.from_file(str(REPO / pagina), default_timeout=TIMEOUT_PAGINA)
+        at, frio, b_frio = _paso(at, lambda at: at)
+        at, rerun, b_rerun = _paso(at, lambda at: at)
+        paso = {"frio": (frio, b_frio), "rerun": (rerun, b_rerun)}
+        if interaccion is not None:
+            at, ms, b = _paso(at, interaccion)
+            paso["interaccion"] = (ms, b)
+        pasos.append(paso)
+
+    def maximo(valores):
+        valores = [v for v in valores if v is not None]
+        return max(valores) if valores else None
+
+    resultado = {
+        "frio_ms": pasos[0]["frio"][0],
+        "cambio_local_ms": maximo(p["frio"][0] for p in pasos[1:]),
+        "rerun_ms": maximo(p["rerun"][0] for p in pasos),
+        "interaccion_ms": None,
+        "rss_pico_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "bytes_escritos": {
+            "frio": maximo(p["frio"][1] for p in pasos),
+            "rerun": maximo(p["rerun"][1] for p in pasos),
+            "interaccion": None,
+        },
+    }
+    if interaccion is not None:
+        resultado["interaccion_ms"] = maximo(p["interaccion"][0] for p in pasos)
+        resultado["bytes_escritos"]["interaccion"] = maximo(p["interaccion"][1] for p in pasos)
+    return resultado
+
+
+def medir(pagina, raices, backend):
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(1) as pool:
+        return pool.apply(_medir, (pagina, [str(r) for r in raices], backend))
+
+
+# =========================
+# PRESUPUESTOS
+# =========================
+def presupuesto(presupuestos, pagina):
+    return {**presupuestos["defecto"], **presupuestos.get(pagina, {})}
+
+
+def excedidos(resultado, limites):
+    medidas = {
+        "frio_ms": resultado["frio_ms"],
+        "cambio_local_ms": resultado["cambio_local_ms"],
+        "rerun_ms": resultado["rerun_ms"],
+        "interaccion_ms": resultado["interaccion_ms"],
+        "rss_pico_mb": resultado["rss_pico_mb"],
+        "bytes_frio": resultado["bytes_escritos"]["frio"],
+        "bytes_rerun": resultado["bytes_escritos"]["rerun"],
+        "bytes_interaccion": resultado["bytes_escritos"]["interaccion"],
+    }
+    return sorted(
+        clave for clave, limite in limites.items()
+        if medidas.get(clave) is not None and medidas[clave] > limite
+    )
+
+
+# =========================
+# DATASETS
+# =========================
+def dataset(datos, anios, locales, backend):
+    """Genera (una vez) el dataset y devuelve su carpeta."""
+    destino = Path(datos) / f"{backend}_{anios}a_{locales}l"
+    if not (destino / ".completo").exists():
+        shutil.rmtree(destino, ignore_errors=True)
+        generar_locales(destino, anios, locales, backend=backend)
+        (destino / ".completo").touch()
+    return destino
+
+
+def paginas(filtros):
+    todas = ["app.py"] + sorted(
+        f"pages/{p.name}" for p in (REPO / "pages").glob("*.py")
+    )
+    if not filtros:
+        return todas
+    return [p for p in todas if any(f in p for f in filtros)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python bench/paginas.py",
+        description="Latencia, memoria y escrituras por página con AppTest."
+    )
+    parser.add_argument("--anios", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--locales", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--backend", default="csv", choices=["csv", "parquet", "sqlite"])
+    parser.add_argument("--paginas", nargs="+", default=None,
+                        help="filtrar páginas por fragmento del nombre")
+    parser.add_argument("--datos", type=Path,
+                        default=Path(tempfile.gettempdir()) / "oyken-bench",
+                        help="carpeta de datasets sintéticos (se reutilizan)")
+    parser.add_argument("--informe", type=Path, default=Path("informe_paginas.json"))
+    args = parser.parse_args()
+
+    with open(PRESUPUESTOS, encoding="utf-8") as f:
+        presupuestos = json.load(f)
+
+    resultados = []
+    for anios in args.anios:
+        for locales in args.locales:
+            origen = dataset(args.datos, anios, locales, args.backend)
+
+            for pagina in paginas(args.paginas):
+                # Copia de trabajo (mismo disco que los datasets): las interacciones escriben
+                with tempfile.TemporaryDirectory(dir=args.datos) as tmp:
+                    copia = Path(tmp) / "datos"
+                    shutil.copytree(origen, copia)
+                    r = medir(pagina, raices_locales(copia, locales), args.backend)
+
+                limites = presupuesto(presupuestos, pagina)
+                r.update({
+                    "pagina": pagina,
+                    "anios": anios,
+                    "locales": locales,
+                    "presupuesto": limites,
+                    "excedidos": excedidos(r, limites),
+                })
+                resultados.append(r)
+
+                estado = "OK" if not r["excedidos"] else "EXCEDE " + ", ".join(r["excedidos"])
+                print(
+                    f"{anios:>2}a {locales}l  {pagina:<34}"
+                    f"frío {r['frio_ms']:>7.0f} ms  rerun {r['rerun_ms']:>6.0f} ms  "
+                    f"RSS {r['rss_pico_mb']:>5.0f} MB  {estado}"
+                )
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "resultados": resultados,
+    }
+    with open(args.informe, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+
+    sys.exit(1 if any(r["excedidos"] for r in resultados) else 0)
+
+
+if __name__ == "__main__":
+    main()
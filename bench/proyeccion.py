@@ -0,0 +1,153 @@
+"""Benchmark: proyección de columnas al leer del almacén.
+
+Compara la lectura completa de ventas y gastos con la lectura de solo las
+columnas que declaran las páginas (tiempo de parseo y RSS pico).
+
+    python bench/proyeccion.py [--anios 10] [--backends csv parquet sqlite]
+
+Cada medición corre en un proceso nuevo para que el RSS pico sea comparable;
+además se informa del pico de memoria asignada durante la lectura
+(tracemalloc), que no depende del ruido del intérprete.
+"""
+import argparse
+import multiprocessing
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd  # noqa: E402
+
+from oyken import breakeven  # noqa: E402
+from oyken.storage import almacen  # noqa: E402
+
+REPETICIONES = 3
+
+# Columnas de 2_Comportamiento (las más amplias entre las páginas de ventas)
+COLUMNAS_VENTAS = [
+    "fecha",
+    "ventas_manana_eur", "ventas_tarde_eur", "ventas_noche_eur", "ventas_total_eur",
+    "comensales_manana", "comensales_tarde", "comensales_noche",
+    "tickets_manana", "tickets_tarde", "tickets_noche",
+]
+
+CASOS = {
+    "ventas": ("ventas", None),
+    "ventas (proyección)": ("ventas", COLUMNAS_VENTAS),
+    "gastos": ("gastos", None),
+    "gastos (proyección)": ("gastos", list(breakeven.COLUMNAS_GASTOS)),
+}
+
+NOTAS = [
+    "", "", "", "lluvia", "partido en la tele, terraza llena hasta las 23h",
+    "falta de personal en cocina, se cierra antes el turno de noche",
+]
+
+
+# =========================
+# DATOS SINTÉTICOS
+# =========================
+def generar(a, anios):
+    rng = random.Random(1)
+    inicio = date(date.today().year - anios + 1, 1, 1)
+
+    filas = []
+    for i in range((date.today() - inicio).days + 1):
+        vm, vt, vn = (round(rng.uniform(200, 1500), 2) for _ in range(3))
+        filas.append({
+            "fecha": inicio + timedelta(days=i),
+            "ventas_manana_eur": vm, "ventas_tarde_eur": vt, "ventas_noche_eur": vn,
+            "ventas_total_eur": round(vm + vt + vn, 2),
+            **{f"comensales_{t}": rng.randint(10, 60) for t in ("manana", "tarde", "noche")},
+            **{f"tickets_{t}": rng.randint(5, 40) for t in ("manana", "tarde", "noche")},
+            "observaciones": rng.choice(NOTAS),
+        })
+    ventas = pd.DataFrame(filas)
+    for anio, parte in ventas.groupby(pd.to_datetime(ventas["fecha"]).dt.year):
+        a.escribir_particion("ventas", anio, parte)
+
+    gastos = []
+    for anio in range(inicio.year, date.today().year + 1):
+        for mes in range(1, 13):
+            for j in range(40):
+                gastos.append({
+                    "Fecha": f"{rng.randint(1, 28):02d}/{mes:02d}/{anio}",
+                    "Mes": f"{anio}-{mes:02d}",
+                    "Concepto": f"Factura proveedor {j} · {rng.choice(NOTAS)}",
+                    "Categoria": rng.choice(["Alquiler", "Electricidad", "Limpieza", "Seguros"]),
+                    "Tipo_Gasto": rng.choice(["Fijo", "Variable"]),
+                    "Rol_Gasto": rng.choice(["Estructural", "Operativo"]),
+                    "Coste (€)": round(rng.uniform(20, 2000), 2),
+                })
+    a.escribir("gastos", pd.DataFrame(gastos))
+
+
+# =========================
+# MEDICIÓN (PROCESO HIJO)
+# =========================
+def _rss_pico_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _medir(backend, raiz, tabla, columnas):
+    a = almacen(backend, raiz)
+    tablas = (
+        [a.tabla_particion(tabla, anio) for anio in a.particiones(tabla)]
+        if tabla == "ventas" else [tabla]
+    )
+
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        for t in tablas:
+            a.leer(t, columnas)
+        tiempos.append(time.perf_counter() - inicio)
+    rss = _rss_pico_mb()
+
+    tracemalloc.start()
+    leidas = [a.leer(t, columnas) for t in tablas]
+    asignado = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    del leidas
+
+    return min(tiempos), rss, asignado
+
+
+def medir(backend, raiz, tabla, columnas):
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(1) as pool:
+        return pool.apply(_medir, (backend, str(raiz), tabla, columnas))
+
+
+# =========================
+# INFORME
+# =========================
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python bench/proyeccion.py",
+        description="Tiempo de parseo y RSS pico con y sin proyección de columnas."
+    )
+    parser.add_argument("--anios", type=int, default=10)
+    parser.add_argument("--backends", nargs="+", default=["csv", "parquet", "sqlite"])
+    args = parser.parse_args()
+
+    print(f"{'backend':<9}{'caso':<22}{'parseo (ms)':>12}{'RSS pico (MB)':>15}{'asignado (MB)':>15}")
+    for backend in args.backends:
+        with tempfile.TemporaryDirectory() as raiz:
+            generar(almacen(backend, raiz), args.anios)
+            for caso, (tabla, columnas) in CASOS.items():
+                segundos, rss, asignado = medir(backend, raiz, tabla, columnas)
+                print(
+                    f"{backend:<9}{caso:<22}{segundos * 1000:>12.1f}"
+                    f"{rss:>15.1f}{asignado:>15.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
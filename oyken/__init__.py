@@ -0,0 +1,6 @@
+"""Núcleo OYKEN: persistencia y cálculo compartidos por las páginas.
+
+Los módulos de cálculo (kpi, rrhh, breakeven, ebitda, cobertura) son
+funciones puras sin Streamlit; no importan pandas al cargarse, de modo que
+procesos por lotes, pruebas o una API pueden usarlos sin coste de arranque.
+"""
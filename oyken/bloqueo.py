@@ -0,0 +1,62 @@
+"""Cerrojos de fichero entre procesos (y entre hilos del mismo proceso).
+
+Cada recurso tiene un fichero ``.lock`` en la carpeta ``.bloqueos`` de su
+almacén; ``flock`` exclusivo sobre él serializa a todos los escritores,
+estén en el mismo proceso de Streamlit o en otro (varios workers, la
+reconstrucción por línea de comandos...). El cerrojo es reentrante dentro
+de un mismo hilo, de modo que una operación que ya lo tiene puede llamar a
+otra que también lo pide.
+
+Sin ``fcntl`` (Windows) el cerrojo solo protege entre hilos del proceso.
+"""
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+CARPETA = ".bloqueos"
+
+_LOCAL = threading.local()
+_HILOS = {}
+_HILOS_LOCK = threading.Lock()
+
+
+def ruta_cerrojo(raiz, nombre):
+    return Path(raiz) / CARPETA / f"{nombre}.lock"
+
+
+def _cerrojo_hilos(ruta):
+    with _HILOS_LOCK:
+        return _HILOS.setdefault(ruta, threading.Lock())
+
+
+@contextmanager
+def cerrojo(ruta):
+    """Cerrojo exclusivo sobre ``ruta`` mientras dure el bloque ``with``."""
+    ruta = str(Path(ruta).resolve())
+    tomados = _LOCAL.__dict__.setdefault("tomados", {})
+
+    if ruta in tomados:
+        tomados[ruta] += 1
+        try:
+            yield
+        finally:
+            tomados[ruta] -= 1
+        return
+
+    Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+    hilos = _cerrojo_hilos(ruta)
+    with hilos, open(ruta, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        tomados[ruta] = 1
+        try:
+            yield
+        finally:
+            del tomados[ruta]
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
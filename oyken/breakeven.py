@@ -0,0 +1,168 @@
+"""Breakeven operativo y real (OYKEN) a partir de los consolidados."""
+import calendar
+
+from oyken import rrhh
+
+VERSION_MODELO = "OYKEN_BE_v1"
+
+# Columnas de breakeven_resumen (las de ``fila_resumen``)
+COLUMNAS_RESUMEN = (
+    "anio", "mes",
+    "costes_fijos_totales_eur", "costes_variables_reales_eur",
+    "margen_bruto_pct", "margen_contribucion_real_pct",
+    "breakeven_operativo_eur", "breakeven_real_eur", "brecha_operativa_eur",
+    "dias_periodo",
+    "breakeven_operativo_diario_eur", "breakeven_real_diario_eur",
+    "brecha_operativa_diaria_eur",
+    "resultado_check_eur", "fecha_calculo", "version_modelo",
+)
+
+# Columnas de gastos que usa el cálculo (proyección al leer)
+COLUMNAS_GASTOS = ("Mes", "Categoria", "Tipo_Gasto", "Rol_Gasto", "Coste (€)")
+
+
+def _fila_periodo(df, anio, mes):
+    df = df[df["anio"] == int(anio)]
+    if mes != 0:
+        df = df[df["mes"] == int(mes)]
+    return df
+
+
+# =====================================================
+# ENTRADAS DEL PERÍODO
+# =====================================================
+def entradas_periodo(df_compras_m, df_ventas_m, df_puestos, df_gastos, anio, mes):
+    """Reúne las magnitudes del período; None si faltan compras o ventas."""
+    row_compras = _fila_periodo(df_compras_m, anio, mes)
+    row_ventas = _fila_periodo(df_ventas_m, anio, mes)
+
+    if row_compras.empty or row_ventas.empty:
+        return None
+
+    # Gastos fijos estructurales
+    gastos_fijos = df_gastos[
+        (df_gastos["Tipo_Gasto"] == "Fijo") &
+        (df_gastos["Rol_Gasto"] == "Estructural")
+    ]
+    gastos_por_categoria = (
+        gastos_fijos
+        .groupby("Categoria", as_index=False)["Coste (€)"]
+        .sum()
+    )
+
+    # Gastos variables estructurales del período
+    gastos_variables = df_gastos[
+        (df_gastos["Tipo_Gasto"] == "Variable") &
+        (df_gastos["Rol_Gasto"] == "Estructural")
+    ]
+    if mes == 0:
+        gastos_variables = gastos_variables[
+            gastos_variables["Mes"].str.startswith(str(anio))
+        ]
+    else:
+        gastos_variables = gastos_variables[
+            gastos_variables["Mes"] == f"{anio}-{mes:02d}"
+        ]
+
+    return {
+        "compras": float(row_compras.iloc[0]["compras_total_eur"]),
+        "ventas": float(row_ventas.iloc[0]["ventas_total_eur"]),
+        "coste_rrhh_fijo": rrhh.coste_puestos(df_puestos, anio, mes, rrhh.ROLES_FIJOS),
+        "gastos_por_categoria": gastos_por_categoria,
+        "gastos_fijos": float(gastos_por_categoria["Coste (€)"].sum()),
+        "gastos_variables": float(gastos_variables["Coste (€)"].sum()),
+        "rrhh_variable": rrhh.coste_puestos(df_puestos, anio, mes, rrhh.ROLES_VARIABLES),
+        "dias_periodo": calendar.monthrange(int(anio), int(mes))[1] if mes != 0 else 0,
+    }
+
+
+# =====================================================
+# CÁLCULO
+# =====================================================
+def calcular(compras, ventas, coste_rrhh_fijo, gastos_fijos,
+             gastos_variables, rrhh_variable, dias_periodo, **_):
+    """Breakeven operativo / real. Los valores no calculables quedan en None."""
+    margen_bruto = 1 - compras / ventas
+    costes_fijos = coste_rrhh_fijo + gastos_fijos
+
+    costes_variables = compras + gastos_variables + rrhh_variable
+    contribucion = ventas - costes_variables
+    margen_contribucion = contribucion / ventas
+
+    be_operativo = costes_fijos / margen_bruto if margen_bruto > 0 else None
+    be_real = costes_fijos / margen_contribucion if margen_contribucion > 0 else None
+
+    r = {
+        "margen_bruto": margen_bruto,
+        "costes_fijos_totales": costes_fijos,
+        "costes_variables_reales": costes_variables,
+        "contribucion": contribucion,
+        "margen_contribucion": margen_contribucion,
+        "breakeven_operativo": be_operativo,
+        "breakeven_real": be_real,
+        "dias_periodo": dias_periodo,
+        "breakeven_operativo_diario": None,
+        "breakeven_real_diario": None,
+        "brecha_operativa": None,
+        "brecha_operativa_diaria": None,
+        "resultado_check": None,
+    }
+
+    if be_real is not None:
+        costes_variables_impl = be_real * (1 - margen_contribucion)
+        r["resultado_check"] = be_real - costes_variables_impl - costes_fijos
+
+    if be_operativo is not None and be_real is not None:
+        r["brecha_operativa"] = be_real - be_operativo
+
+    if dias_periodo:
+        if be_operativo is not None:
+            r["breakeven_operativo_diario"] = be_operativo / dias_periodo
+        if be_real is not None:
+            r["breakeven_real_diario"] = be_real / dias_periodo
+        if r["brecha_operativa"] is not None:
+            r["brecha_operativa_diaria"] = r["brecha_operativa"] / dias_periodo
+
+    return r
+
+
+def fila_resumen(anio, mes, r, fecha_calculo):
+    """Fila canónica de breakeven_resumen; None si el período no es calculable."""
+    if r["brecha_operativa"] is None:
+        return None
+
+    return {
+        "anio": int(anio),
+        "mes": int(mes),
+        "costes_fijos_totales_eur": float(r["costes_fijos_totales"]),
+        "costes_variables_reales_eur": float(r["costes_variables_reales"]),
+        "margen_bruto_pct": float(r["margen_bruto"]),
+        "margen_contribucion_real_pct": float(r["margen_contribucion"]),
+        "breakeven_operativo_eur": float(r["breakeven_operativo"]),
+        "breakeven_real_eur": float(r["breakeven_real"]),
+        "brecha_operativa_eur": float(r["brecha_operativa"]),
+        "dias_periodo": int(r["dias_periodo"]),
+        "breakeven_operativo_diario_eur": float(r["breakeven_operativo_diario"] or 0.0),
+        "breakeven_real_diario_eur": float(r["breakeven_real_diario"] or 0.0),
+        "brecha_operativa_diaria_eur": float(r["brecha_operativa_diaria"] or 0.0),
+        "resultado_check_eur": float(r["resultado_check"]),
+        "fecha_calculo": fecha_calculo,
+        "version_modelo": VERSION_MODELO,
+    }
+
+
+def resumen(df_compras_m, df_ventas_m, df_puestos, df_gastos, particiones, fecha_calculo):
+    import pandas as pd
+
+    filas = []
+    for anio, mes in particiones:
+        entradas = entradas_periodo(df_compras_m, df_ventas_m, df_puestos, df_gastos, anio, mes)
+        if entradas is None or entradas["ventas"] <= 0:
+            continue
+
+        fila = fila_resumen(anio, mes, calcular(**entradas), fecha_calculo)
+        if fila is not None:
+            filas.append(fila)
+
+    # Sin períodos calculables, tabla vacía con sus columnas
+    return pd.DataFrame(filas, columns=list(COLUMNAS_RESUMEN))
@@ -0,0 +1,43 @@
+"""Caché de proceso para lecturas del almacén.
+
+Las entradas se comparten entre páginas y sesiones (viven en el proceso de
+Streamlit) y se invalidan cuando cambia la versión del dato de origen
+(mtime + tamaño del fichero, o contador de versión en SQLite).
+"""
+import threading
+
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def cacheado(clave, version, cargar):
+    with _LOCK:
+        entrada = _CACHE.get(clave)
+        if entrada is not None and entrada[0] == version:
+            return entrada[1]
+
+    valor = cargar()
+
+    with _LOCK:
+        _CACHE[clave] = (version, valor)
+    return valor
+
+
+def fijar(clave, version, valor):
+    """Publica un valor ya calculado (p. ej. la tabla recién escrita)."""
+    with _LOCK:
+        _CACHE[clave] = (version, valor)
+
+
+def entradas():
+    """Copia de (clave, valor) de las entradas vivas, para diagnóstico."""
+    with _LOCK:
+        return [(clave, valor) for clave, (_, valor) in _CACHE.items()]
+
+
+def invalidar(clave=None):
+    with _LOCK:
+        if clave is None:
+            _CACHE.clear()
+        else:
+            _CACHE.pop(clave, None)
@@ -0,0 +1,167 @@
+"""Utilidades de calendario compartidas (ISO, día de la semana).
+
+La dimensión de calendario (``dimension``) tiene una fila por día de
+``DESDE`` a ``HASTA`` con todo lo que las páginas derivaban en cada rerun:
+año/semana ISO, día de la semana, mes, días del mes, festivo nacional y
+fecha comparable del año anterior. Se calcula una vez por proceso y las
+cargas la cruzan por posición (días desde ``DESDE``) en lugar de llamar a
+``dt.isocalendar()`` sobre cada serie.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from oyken.cache import cacheado
+
+DOW_ES = {
+    0: "Lunes", 1: "Martes", 2: "Miércoles",
+    3: "Jueves", 4: "Viernes", 5: "Sábado", 6: "Domingo"
+}
+
+# Rango precalculado; fechas fuera de él se derivan al vuelo
+DESDE = date(2015, 1, 1)
+HASTA = date(2040, 12, 31)
+
+# Festivos nacionales de fecha fija (los autonómicos y locales no se incluyen)
+FESTIVOS_FIJOS = {
+    (1, 1): "Año Nuevo",
+    (1, 6): "Epifanía del Señor",
+    (5, 1): "Fiesta del Trabajo",
+    (8, 15): "Asunción de la Virgen",
+    (10, 12): "Fiesta Nacional de España",
+    (11, 1): "Todos los Santos",
+    (12, 6): "Día de la Constitución Española",
+    (12, 8): "Inmaculada Concepción",
+    (12, 25): "Natividad del Señor",
+}
+
+# Columnas que las cargas de ventas añaden a cada fila
+CAMPOS = ("iso_year", "iso_week", "weekday", "dow", "anio", "mes", "dia")
+
+
+# =========================
+# CONSTRUCCIÓN
+# =========================
+def _domingo_pascua(anios):
+    # Algoritmo gregoriano anónimo (Meeus/Jones/Butcher), vectorizado
+    a = anios % 19
+    b, c = anios // 100, anios % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return pd.to_datetime(pd.DataFrame({"year": anios, "month": mes, "day": dia}))
+
+
+def _construir(desde, hasta):
+    # Un año más por detrás para resolver la fecha comparable del primero
+    fechas = pd.Series(pd.date_range(date(desde.year - 1, 1, 1), hasta, freq="D"))
+    iso = fechas.dt.isocalendar()
+
+    df = pd.DataFrame({
+        "fecha": fechas,
+        "iso_year": iso.year.astype("int64"),
+        "iso_week": iso.week.astype("int64"),
+        "weekday": fechas.dt.weekday,
+    })
+    df["dow"] = df["weekday"].map(DOW_ES)
+    df["anio"] = fechas.dt.year
+    df["mes"] = fechas.dt.month
+    df["dia"] = fechas.dt.day
+    df["dias_mes"] = fechas.dt.days_in_month
+
+    # Festivos: fijos + Viernes Santo (domingo de Pascua - 2)
+    festividad = pd.Series(
+        list(zip(df["mes"], df["dia"])), index=df.index
+    ).map(FESTIVOS_FIJOS)
+    anios = np.arange(desde.year - 1, hasta.year + 1)
+    viernes_santo = _domingo_pascua(anios) - pd.Timedelta(days=2)
+    festividad = festividad.mask(df["fecha"].isin(viernes_santo), "Viernes Santo")
+    df["festivo"] = festividad.notna()
+    df["festividad"] = festividad
+
+    # Regla ISO (grandes cadenas): mismo día de la misma semana ISO del año
+    # anterior; sin semana 53 previa no hay comparable (NaT)
+    previo = df[["iso_year", "iso_week", "weekday", "fecha"]].rename(
+        columns={"fecha": "fecha_comparable"}
+    )
+    previo["iso_year"] += 1
+    df = df.merge(previo, on=["iso_year", "iso_week", "weekday"], how="left")
+
+    return df[df["fecha"] >= pd.Timestamp(desde)].reset_index(drop=True)
+
+
+def _dimension(desde, hasta):
+    # Sin backend ni raíz: no depende de ningún almacén
+    return cacheado(
+        ("calendario", None, None, desde, hasta), 1,
+        lambda: _construir(desde, hasta)
+    )
+
+
+def dimension():
+    """Dimensión de calendario de ``DESDE`` a ``HASTA``, una fila por día.
+
+    Compartida por todo el proceso: no modificarla (copiar antes).
+    """
+    return _dimension(DESDE, HASTA)
+
+
+# =========================
+# CONSULTA
+# =========================
+def _cruzar(fechas):
+    # (dimensión, posición de cada fecha en ella; -1 para NaT)
+    dim, inicio = dimension(), DESDE
+    validas = fechas.notna().to_numpy()
+    dias = fechas.to_numpy("datetime64[D]")
+
+    if validas.any():
+        primera, ultima = dias[validas].min(), dias[validas].max()
+        if primera < np.datetime64(inicio, "D") or ultima >= np.datetime64(inicio, "D") + len(dim):
+            # Fuera del rango precalculado: dimensión ampliada, por años
+            # completos y cacheada igual que la principal
+            inicio = date(min(pd.Timestamp(primera).year, DESDE.year), 1, 1)
+            fin = date(max(pd.Timestamp(ultima).year, HASTA.year), 12, 31)
+            dim = _dimension(inicio, fin)
+
+    pos = np.full(len(dias), -1, dtype="int64")
+    pos[validas] = (dias[validas] - np.datetime64(inicio, "D")).astype("int64")
+    return dim, pos
+
+
+def _tomar(dim, columna, pos):
+    # Las fechas NaT (pos -1) reciben atributos NA
+    if (pos < 0).any():
+        return dim[columna].array.take(pos, allow_fill=True)
+    return dim[columna].array.take(pos)
+
+
+def atributos(fechas, columnas=None):
+    """Columnas de la dimensión para cada fecha de ``fechas`` (mismo índice)."""
+    fechas = pd.Series(fechas)
+    dim, pos = _cruzar(fechas)
+    columnas = list(columnas or dim.columns.drop("fecha"))
+    return pd.DataFrame(
+        {c: _tomar(dim, c, pos) for c in columnas},
+        index=fechas.index
+    )
+
+
+def dia(fecha):
+    """Fila de la dimensión para una sola fecha."""
+    return atributos([pd.Timestamp(fecha).normalize()]).iloc[0]
+
+
+def derivar_calendario(df, col="fecha"):
+    # Regla ISO (grandes cadenas): comparables por año/semana ISO + DOW
+    dim, pos = _cruzar(df[col])
+    for c in CAMPOS:
+        df[c] = _tomar(dim, c, pos)
+    return df
@@ -0,0 +1,147 @@
+"""Catálogos OYKEN compartidos por las páginas de registro y los generadores.
+
+Sin dependencias: las páginas los muestran en sus formularios y
+``oyken.sintetico`` los usa para producir datos con la misma forma.
+"""
+from oyken.rrhh import ROLES_FIJOS, ROLES_VARIABLES
+
+# =========================
+# CATEGORÍAS BASE OYKEN
+# =========================
+CATEGORIAS = [
+
+    # 1. Estructurales fijos
+    "Alquiler",
+    "Hipoteca / Leasing inmueble",
+    "IBI",
+    "Comunidad",
+    "Licencia de actividad",
+    "Licencia de terraza",
+    "SGAE / Música",
+    "Seguros obligatorios",
+    "Asesoría fiscal",
+    "Asesoría laboral",
+    "Asesoría autonómica",
+    "PRL",
+    "RGPD / LOPD",
+
+    # 2. Estructurales variables
+    "Electricidad",
+    "Agua",
+    "Gas",
+    "Internet",
+    "Telefonía",
+    "Extintores",
+    "Sistemas contra incendios",
+    "Control de plagas",
+    "Análisis sanitarios",
+    "Mantenimiento cocina",
+    "Reparaciones",
+    "Climatización",
+
+    # 3. Plataformas y cobro
+    "Comisiones datáfonos",
+    "Comisiones bancarias",
+    "Plataformas delivery",
+    "Pasarelas de pago",
+
+    # 4. Operativos no estructurales
+    "Limpieza externa",
+    "Lavandería",
+    "Uniformes",
+    "Utensilios",
+    "Papelería",
+
+    # 5. Discrecionales / tácticos
+    "Marketing",
+    "Redes sociales",
+    "Eventos",
+    "Formación no obligatoria",
+    "Consultoría estratégica",
+    "Innovación / pruebas"
+]
+
+# =========================
+# MATRIZ OYKEN · CLASIFICACIÓN EXPERTA
+# =========================
+MATRIZ_CATEGORIAS_OYKEN = {
+
+    # 1. Estructurales fijos
+    "Alquiler": ("Fijo", "Estructural", "Coste base imprescindible para operar."),
+    "Hipoteca / Leasing inmueble": ("Fijo", "Estructural", "Sustituye al alquiler como coste base."),
+    "IBI": ("Fijo", "Estructural", "Impuesto obligatorio ligado al inmueble."),
+    "Comunidad": ("Fijo", "Estructural", "Coste recurrente obligatorio."),
+    "Licencia de actividad": ("Fijo", "Estructural", "Permite operar legalmente."),
+    "Licencia de terraza": ("Fijo", "Estructural", "Habilita ingresos adicionales."),
+    "SGAE / Música": ("Fijo", "Estructural", "Obligación legal si hay música."),
+    "Seguros obligatorios": ("Fijo", "Estructural", "Protección mínima exigida."),
+    "Asesoría fiscal": ("Fijo", "Estructural", "Cumplimiento tributario."),
+    "Asesoría laboral": ("Fijo", "Estructural", "Gestión laboral externa."),
+    "Asesoría autonómica": ("Fijo", "Estructural", "Cumplimiento normativo local."),
+    "PRL": ("Fijo", "Estructural", "Prevención obligatoria."),
+    "RGPD / LOPD": ("Fijo", "Estructural", "Cumplimiento legal de datos."),
+
+    # 2. Estructurales variables
+    "Electricidad": ("Variable", "Estructural", "Escala con actividad, pero es imprescindible."),
+    "Agua": ("Variable", "Estructural", "Consumo operativo básico."),
+    "Gas": ("Variable", "Estructural", "Energía productiva esencial."),
+    "Internet": ("Fijo", "Estructural", "Infraestructura mínima digital."),
+    "Telefonía": ("Fijo", "Estructural", "Comunicación operativa."),
+    "Extintores": ("Fijo", "Estructural", "Obligación normativa."),
+    "Sistemas contra incendios": ("Fijo", "Estructural", "Seguridad legal."),
+    "Control de plagas": ("Fijo", "Estructural", "Requisito sanitario."),
+    "Análisis sanitarios": ("Fijo", "Estructural", "Control sanitario."),
+    "Mantenimiento cocina": ("Variable", "Estructural", "Mantiene capacidad productiva."),
+    "Reparaciones": ("Variable", "Estructural", "Evita paradas operativas."),
+    "Climatización": ("Variable", "Estructural", "Condiciones mínimas de confort."),
+
+    # 3. Plataformas y cobro
+    "Comisiones datáfonos": ("Variable", "Estructural", "Directamente ligadas a la venta."),
+    "Comisiones bancarias": ("Variable", "Estructural", "Gestión financiera básica."),
+    "Plataformas delivery": ("Variable", "Estructural", "Canal de venta alternativo."),
+    "Pasarelas de pago": ("Variable", "Estructural", "Cobro digital."),
+
+    # 4. Operativos no estructurales
+    "Limpieza externa": ("Fijo", "No estructural", "Externalización opcional."),
+    "Lavandería": ("Variable", "No estructural", "Depende del modelo."),
+    "Uniformes": ("Variable", "No estructural", "Reposición periódica."),
+    "Utensilios": ("Variable", "No estructural", "Desgaste operativo."),
+    "Papelería": ("Variable", "No estructural", "Soporte administrativo."),
+
+    # 5. Discrecionales / tácticos
+    "Marketing": ("Variable", "No estructural", "Impulsa ventas, no sostiene estructura."),
+    "Redes sociales": ("Variable", "No estructural", "Comunicación táctica."),
+    "Eventos": ("Variable", "No estructural", "Acciones puntuales."),
+    "Formación no obligatoria": ("Variable", "No estructural", "Mejora, no requisito."),
+    "Consultoría estratégica": ("Variable", "No estructural", "Decisión puntual."),
+    "Innovación / pruebas": ("Variable", "No estructural", "Experimentación.")
+}
+
+
+# =========================
+# COMPRAS
+# =========================
+FAMILIAS_COMPRAS = ["Materia prima", "Bebidas", "Limpieza", "Otros"]
+
+# =========================
+# MERMAS
+# =========================
+FAMILIAS_MERMAS = ["Matería Prima", "Bebidas", "Limpieza", "Otros"]
+
+UNIDADES = ["kg", "uds", "l"]
+
+MOTIVOS = [
+    "Caducidad",
+    "Sobreproducción",
+    "Error de elaboración",
+    "Error de pedido",
+    "Deterioro",
+    "Rotura",
+    "Ajuste inventario",
+    "Otro"
+]
+
+# =========================
+# RRHH
+# =========================
+ROLES_RRHH = ROLES_FIJOS + ROLES_VARIABLES
@@ -0,0 +1,66 @@
+"""Motor de estructuralidad y cobertura horaria del RRHH Core."""
+
+FUNCIONES_NO_ESTRUCTURALES = ["Runner comida", "Runner bebida", "Refuerzo"]
+
+MINUTOS_DIA = 24 * 60
+
+
+def minutos(hhmm):
+    """'HH:MM' → minutos desde medianoche. ValueError si el formato no es válido."""
+    h, m = map(int, hhmm.split(":"))
+    return h * 60 + m
+
+
+def horas_entre(inicio, fin):
+    return max((minutos(fin) - minutos(inicio)) / 60, 0)
+
+
+def estructura(posicionamiento):
+    """(tramo, función, es_estructural) de cada función activa por tramo."""
+    return [
+        (tramo, funcion, funcion not in FUNCIONES_NO_ESTRUCTURALES)
+        for tramo, funciones in posicionamiento.items()
+        for funcion, existe in funciones.items()
+        if existe
+    ]
+
+
+def intervalos(horas_estructurales):
+    # Coberturas sin horas válidas se ignoran
+    resultado = []
+    for datos in horas_estructurales.values():
+        try:
+            resultado.append((minutos(datos["inicio"]), minutos(datos["fin"])))
+        except ValueError:
+            continue
+    return resultado
+
+
+def conteo_simultaneo(intervalos, paso=15):
+    """Funciones activas en cada franja de ``paso`` minutos del día.
+
+    Barrido con array de diferencias: O(intervalos + franjas). Una franja
+    cuenta un intervalo [inicio, fin) si su minuto inicial cae dentro.
+    """
+    n = MINUTOS_DIA // paso
+    delta = [0] * (n + 1)
+
+    for inicio, fin in intervalos:
+        desde = min(max(-(-inicio // paso), 0), n)
+        hasta = min(max(-(-fin // paso), 0), n)
+        if desde < hasta:
+            delta[desde] += 1
+            delta[hasta] -= 1
+
+    conteos, activos = [], 0
+    for d in delta[:n]:
+        activos += d
+        conteos.append(activos)
+    return conteos
+
+
+def huella(intervalos, paso=15):
+    """Pico de funciones simultáneas y horas estructurales totales por día."""
+    pico = max(conteo_simultaneo(intervalos, paso), default=0)
+    total_horas = sum(fin - inicio for inicio, fin in intervalos) / 60
+    return pico, total_horas
@@ -0,0 +1,226 @@
+"""Tablas de trabajo compartidas entre sesiones (copy-on-write).
+
+Gastos, compras y proveedores vivían en ``st.session_state``: cada pestaña
+abierta guardaba su propia copia completa y la memoria crecía con las
+sesiones. Ahora hay una sola copia por proceso y versión del dato (caché de
+``oyken.cache``); cada lectura devuelve una vista superficial y, con el
+copy-on-write de pandas (siempre activo desde pandas 3, de ahí el mínimo en
+requirements.txt), una sesión que la modifique solo copia lo que cambia.
+Al guardar, la tabla nueva se publica en la caché para que el resto de
+sesiones la vean sin volver a parsearla.
+
+Altas con escritura diferida: ``anotar`` añade el registro a un journal
+pequeño y duradero (``gastos.journal.jsonl``...) en lugar de reescribir la
+tabla entera. El journal se vuelca al almacén en un solo lote al llegar a
+``UMBRAL_VOLCADO`` registros, a los ``MAX_ESPERA`` segundos del primero o
+tras ``ESPERA_INACTIVIDAD`` segundos sin altas nuevas. Las lecturas unen
+tabla y journal, así que la interfaz ve el registro al momento.
+
+Las bajas por posición pasan la versión leída a ``publicar`` para no borrar
+una fila distinta de la que se vio; ``actualizar`` hace leer-modificar-
+escribir sobre la tabla vigente.
+
+Gastos, compras y mermas no tienen clave con la que deduplicar, así que el
+volcado es idempotente por versión: el lote congelado anota la versión de
+la tabla al congelarse y, si la tabla ya cambió (un volcado cortado tras
+escribirla), sus filas ya están dentro y el lote se descarta sin repetirlo.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from oyken.bloqueo import cerrojo
+from oyken.cache import cacheado, fijar
+from oyken.journal import Journal
+from oyken.storage import ConflictoVersion, almacen, tipar
+
+# Volcado del journal al almacén
+UMBRAL_VOLCADO = 50        # registros
+MAX_ESPERA = 300           # segundos desde la primera alta pendiente
+ESPERA_INACTIVIDAD = 30    # segundos sin altas nuevas
+
+# Nombre de los hilos de volcado diferido
+HILO_VOLCADO = "oyken-volcar"
+
+_TEMPORIZADORES = {}
+_TEMPORIZADORES_LOCK = threading.Lock()
+
+
+def _clave(a, nombre, *resto):
+    return ("tabla", type(a.backend).__name__, str(a.raiz.resolve()), nombre) + resto
+
+
+def _journal(a, nombre):
+    return Journal(a.raiz / f"{nombre}.journal.jsonl")
+
+
+def _version(a, nombre):
+    # Versión de la tabla tal como queda anotada en el journal (JSON; la
+    # de una tabla aún inexistente es None, por eso va dentro de un dict)
+    return json.loads(json.dumps({"tabla": a.version(nombre)}, default=str))
+
+
+def _lote_volcado(a, nombre, journal):
+    """True si el lote congelado ya está en la tabla (volcado interrumpido).
+
+    Toda escritura de la tabla incluye el lote congelado: si la versión
+    cambió desde que se congeló, no hay que volver a añadirlo.
+    """
+    marca = journal.marca()
+    return marca is not None and marca != _version(a, nombre)
+
+
+@contextmanager
+def _cerrojos(a, nombre):
+    # Siempre tabla → journal (mismo orden que el volcado)
+    with a.bloqueo(nombre), cerrojo(_journal(a, nombre).ruta_cerrojo):
+        yield
+
+
+# =========================
+# LECTURA
+# =========================
+def _base(a, nombre):
+    return cacheado(
+        _clave(a, nombre),
+        a.version(nombre),
+        lambda: a.leer(nombre).reset_index(drop=True)
+    )
+
+
+def tabla_versionada(nombre, a=None):
+    """(tabla, versión) compartidas, con las altas pendientes de volcar.
+
+    Modificar la tabla devuelta no afecta a otras sesiones.
+    """
+    a = a or almacen()
+    journal = _journal(a, nombre)
+    version = (a.version(nombre), journal.version())
+    base = _base(a, nombre)
+
+    def unir():
+        registros = journal.leer(congelado=not _lote_volcado(a, nombre, journal))
+        if not registros:
+            return base
+        pendientes = tipar(nombre, pd.DataFrame(registros))
+        return pd.concat([base, pendientes], ignore_index=True)
+
+    df = cacheado(_clave(a, nombre, "journal"), version, unir)
+    return df.copy(deep=False), version
+
+
+def tabla(nombre, a=None):
+    return tabla_versionada(nombre, a)[0]
+
+
+def existe(nombre, a=None):
+    a = a or almacen()
+    return a.existe(nombre) or len(_journal(a, nombre)) > 0
+
+
+# =========================
+# ESCRITURA
+# =========================
+def publicar(nombre, df, a=None, version=None):
+    """Escribe la tabla completa (altas pendientes incluidas) y la deja en caché.
+
+    Con ``version`` (la de ``tabla_versionada``) falla con
+    ``ConflictoVersion`` si otra sesión guardó o anotó algo antes.
+    """
+    a = a or almacen()
+    journal = _journal(a, nombre)
+    with _cerrojos(a, nombre):
+        if version is not None and (a.version(nombre), journal.version()) != version:
+            raise ConflictoVersion(f"La tabla {nombre!r} ha cambiado desde que se leyó.")
+        escrita = a.escribir(nombre, df.reset_index(drop=True))
+        # df ya contenía las altas del journal (vivo y congelado)
+        journal.vaciar()
+        fijar(_clave(a, nombre), a.version(nombre), escrita)
+    return escrita.copy(deep=False)
+
+
+def actualizar(nombre, cambio, a=None):
+    """Leer-modificar-escribir sobre la tabla vigente, bajo su cerrojo."""
+    a = a or almacen()
+    with _cerrojos(a, nombre):
+        return publicar(nombre, cambio(tabla(nombre, a)), a)
+
+
+def anotar(nombre, registro, a=None):
+    """Alta diferida: al journal ahora, al almacén en el próximo volcado."""
+    a = a or almacen()
+    journal = _journal(a, nombre)
+    journal.append(registro)
+
+    if len(journal) >= UMBRAL_VOLCADO:
+        volcar(nombre, a)
+    else:
+        _programar(a, nombre)
+
+
+def volcar(nombre, a=None):
+    """Vuelca las altas pendientes de ``nombre`` al almacén en un solo lote."""
+    a = a or almacen()
+    journal = _journal(a, nombre)
+
+    with a.bloqueo(nombre):
+        if _lote_volcado(a, nombre, journal):
+            # Ya escrito antes de un corte: se descarta y se congela el vivo
+            journal.descartar_congelado()
+        # Temporizador que cubre lo que se congela ahora; uno programado
+        # después por otra alta sigue vivo para volcarla
+        temporizador = _temporizador(a, nombre)
+        registros = journal.congelar(_version(a, nombre))
+        if registros:
+            df = pd.concat([a.leer(nombre), pd.DataFrame(registros)], ignore_index=True)
+            escrita = a.escribir(nombre, df)
+            fijar(_clave(a, nombre), a.version(nombre), escrita)
+        journal.descartar_congelado()
+
+    _cancelar(a, nombre, temporizador)
+    return len(registros)
+
+
+# =========================
+# VOLCADO DIFERIDO
+# =========================
+def _programar(a, nombre):
+    # Un temporizador por tabla: se reinicia con cada alta (inactividad)
+    # sin pasar de MAX_ESPERA desde la primera alta pendiente
+    clave = _clave(a, nombre)
+    with _TEMPORIZADORES_LOCK:
+        previo = _TEMPORIZADORES.get(clave)
+        if previo is not None:
+            previo.cancel()
+            limite = previo.limite
+        else:
+            limite = time.monotonic() + MAX_ESPERA
+
+        espera = max(0.0, min(ESPERA_INACTIVIDAD, limite - time.monotonic()))
+        temporizador = threading.Timer(espera, volcar, args=(nombre, a))
+        temporizador.name = HILO_VOLCADO
+        temporizador.daemon = True
+        temporizador.limite = limite
+        _TEMPORIZADORES[clave] = temporizador
+        temporizador.start()
+
+
+def _temporizador(a, nombre):
+    with _TEMPORIZADORES_LOCK:
+        return _TEMPORIZADORES.get(_clave(a, nombre))
+
+
+def _cancelar(a, nombre, temporizador):
+    # Solo si sigue siendo el mismo: otra alta pudo reprogramar el volcado
+    if temporizador is None:
+        return
+    with _TEMPORIZADORES_LOCK:
+        clave = _clave(a, nombre)
+        if _TEMPORIZADORES.get(clave) is not temporizador:
+            return
+        del _TEMPORIZADORES[clave]
+    if temporizador is not threading.current_thread():
+        temporizador.cancel()
@@ -0,0 +1,550 @@
+"""Grafo de artefactos derivados de los datos operativos.
+
+Cada consolidado declara en ``GRAFO`` sus entradas directas, que pueden ser
+fuentes operativas (ventas, compras, gastos, rrhh_puestos) u otros
+consolidados. Un cambio en una fuente marca como pendientes las particiones
+(anio, mes) afectadas en todos sus descendientes; el recálculo se lanza en
+segundo plano y, en cualquier caso, se completa de forma perezosa al leer:
+``leer_fresco()`` y ``asegurar_consolidados()`` recalculan solo los
+ancestros pendientes del artefacto pedido. Las vistas nunca escriben.
+
+Cada pasada retira sus marcas antes de leer las fuentes (quedan en
+``consolidados.en_curso.json`` hasta terminar): un guardado durante el
+cálculo vuelve a marcar y no se pierde. Si la pasada falla o el proceso
+muere a mitad, las marcas en curso vuelven a pendientes.
+
+En la vista de grupo (``oyken.locales``) ``leer_fresco`` suma por (anio, mes)
+los consolidados aditivos de cada local, leídos en paralelo.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import cached_property
+
+import pandas as pd
+
+from oyken import breakeven, compartido, locales, rrhh
+from oyken.storage import almacen
+
+PENDIENTES = "consolidados.pendientes.json"
+EN_CURSO = "consolidados.en_curso.json"
+
+# Artefacto → entradas directas (fuentes u otros artefactos)
+GRAFO = {
+    "ventas_mensuales": ("ventas",),
+    "compras_mensuales": ("compras",),
+    "gastos_mensuales": ("gastos",),
+    "rrhh_mensual": ("rrhh_puestos",),
+    "coste_producto": ("ventas_mensuales", "compras_mensuales"),
+    "breakeven_resumen": ("ventas_mensuales", "compras_mensuales", "rrhh_puestos", "gastos"),
+}
+
+# Aristas que invalidan todas las particiones del artefacto:
+# el breakeven suma los gastos fijos estructurales sin filtrar por período.
+INVALIDACION_TOTAL = {("breakeven_resumen", "gastos")}
+
+# Artefactos con fila anual (mes = 0) además de las mensuales
+CON_ANUAL = {"coste_producto", "breakeven_resumen"}
+
+# Consolidados que el grupo obtiene sumando los de sus locales
+ADITIVOS = {"ventas_mensuales", "compras_mensuales", "gastos_mensuales", "rrhh_mensual"}
+
+# Marca de "todas las particiones" (bootstrap o invalidación total)
+TODAS = "*"
+
+# Columnas de cada fuente que usan los cálculos (proyección al leer)
+COLUMNAS_FUENTE = {
+    "ventas": ("ventas_total_eur",),
+    "compras": ("Fecha", "Coste (€)"),
+    "gastos": ("Fecha", *breakeven.COLUMNAS_GASTOS),
+}
+
+# Nombre de los hilos de recálculo en segundo plano
+HILO_CONSOLIDACION = "oyken-consolidar"
+
+# Cerrojo de fichero (oyken.bloqueo): una consolidación por almacén, aunque
+# haya varios procesos sirviendo la app
+CONSOLIDACION = "consolidacion"
+
+# Almacén con hilo de consolidación en marcha → hay otra petición pendiente
+_CONSOLIDANDO = {}
+_CONSOLIDANDO_LOCK = threading.Lock()
+
+
+# =========================
+# GRAFO
+# =========================
+def _hijos(nodo):
+    return [n for n, entradas in GRAFO.items() if nodo in entradas]
+
+
+def _orden():
+    """Artefactos en orden topológico (entradas antes que salidas)."""
+    orden, visitados = [], set()
+
+    def visitar(nodo):
+        if nodo in visitados or nodo not in GRAFO:
+            return
+        visitados.add(nodo)
+        for entrada in GRAFO[nodo]:
+            visitar(entrada)
+        orden.append(nodo)
+
+    for nodo in GRAFO:
+        visitar(nodo)
+    return orden
+
+
+def ancestros(nombres):
+    """Artefactos necesarios para tener frescos ``nombres`` (incluidos)."""
+    pila, vistos = list(nombres), set()
+    while pila:
+        nodo = pila.pop()
+        if nodo in vistos or nodo not in GRAFO:
+            continue
+        vistos.add(nodo)
+        pila.extend(GRAFO[nodo])
+    return vistos
+
+
+# =========================
+# PARTICIONES
+# =========================
+def particion(fecha):
+    # Texto en formato de registro OYKEN (dd/mm/YYYY)
+    if isinstance(fecha, str):
+        fecha = pd.to_datetime(fecha, format="%d/%m/%Y")
+    fecha = pd.Timestamp(fecha)
+    return (fecha.year, fecha.month)
+
+
+def particiones_anio(anio):
+    return [(int(anio), mes) for mes in range(1, 13)]
+
+
+def _con_anual(particiones):
+    return set(particiones) | {(anio, 0) for anio, _ in particiones}
+
+
+# =========================
+# ESTADO PENDIENTE
+# =========================
+def _ruta_pendientes(a):
+    return a.raiz / PENDIENTES
+
+
+def _ruta_en_curso(a):
+    return a.raiz / EN_CURSO
+
+
+def _leer_marcas(ruta):
+    if not ruta.exists():
+        return {}
+    with open(ruta, encoding="utf-8") as f:
+        datos = json.load(f)
+    return {
+        nodo: {p if p == TODAS else tuple(p) for p in parts}
+        for nodo, parts in datos.items()
+    }
+
+
+def _copia(pendientes):
+    return {nodo: set(parts) for nodo, parts in pendientes.items()}
+
+
+def _guardar_marcas(ruta, marcas):
+    marcas = {n: sorted(p, key=str) for n, p in marcas.items() if p}
+
+    if not marcas:
+        ruta.unlink(missing_ok=True)
+        return
+
+    # Se llama con el cerrojo de PENDIENTES tomado
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(marcas, f)
+    os.replace(tmp, ruta)
+
+
+def _leer_pendientes(a):
+    return _leer_marcas(_ruta_pendientes(a))
+
+
+def _guardar_pendientes(a, pendientes):
+    _guardar_marcas(_ruta_pendientes(a), pendientes)
+
+
+def _unir(marcas, otras):
+    for nodo, parts in otras.items():
+        marcas.setdefault(nodo, set()).update(parts)
+
+
+def _propagar(pendientes, nodo, particiones):
+    for hijo in _hijos(nodo):
+        if TODAS in particiones or (hijo, nodo) in INVALIDACION_TOTAL:
+            parts = {TODAS}
+        else:
+            parts = set(particiones)
+        pendientes.setdefault(hijo, set()).update(parts)
+        _propagar(pendientes, hijo, parts)
+
+
+def marcar(fuente, particiones, a=None):
+    """Marca las particiones de ``fuente`` como sucias en sus descendientes."""
+    a = a or almacen()
+    particiones = {(int(anio), int(mes)) for anio, mes in particiones}
+    with a.bloqueo(PENDIENTES):
+        pendientes = _leer_pendientes(a)
+        previos = _copia(pendientes)
+        _propagar(pendientes, fuente, particiones)
+        # Sin cambios no se reescribe el fichero
+        if pendientes != previos:
+            _guardar_pendientes(a, pendientes)
+
+
+def _marcar_inexistentes(a, nodos):
+    # Lo habitual es que existan todos: entonces no se toca el disco
+    faltan = [nodo for nodo in nodos if not a.existe(nodo)]
+    if not faltan:
+        return
+
+    with a.bloqueo(PENDIENTES):
+        pendientes = _leer_pendientes(a)
+        previos = _copia(pendientes)
+        for nodo in faltan:
+            if TODAS not in pendientes.get(nodo, ()):
+                pendientes.setdefault(nodo, set()).add(TODAS)
+                _propagar(pendientes, nodo, {TODAS})
+        if pendientes != previos:
+            _guardar_pendientes(a, pendientes)
+
+
+def _tomar(a, nodos):
+    # Pendientes → en curso (primero en curso: un corte entre ambas
+    # escrituras duplica marcas, no las pierde)
+    with a.bloqueo(PENDIENTES):
+        pendientes = _leer_pendientes(a)
+        tomadas = {n: pendientes.pop(n) for n in nodos if pendientes.get(n)}
+        if tomadas:
+            en_curso = _leer_marcas(_ruta_en_curso(a))
+            _unir(en_curso, tomadas)
+            _guardar_marcas(_ruta_en_curso(a), en_curso)
+            _guardar_pendientes(a, pendientes)
+    return tomadas
+
+
+def _devolver(a):
+    # En curso → pendientes (pasada fallida o cortada)
+    if not _ruta_en_curso(a).exists():
+        return
+    with a.bloqueo(PENDIENTES):
+        en_curso = _leer_marcas(_ruta_en_curso(a))
+        if en_curso:
+            pendientes = _leer_pendientes(a)
+            _unir(pendientes, en_curso)
+            _guardar_pendientes(a, pendientes)
+        _ruta_en_curso(a).unlink(missing_ok=True)
+
+
+@contextmanager
+def _pasada(a, nodos):
+    """Marcas pendientes de ``nodos``, retiradas mientras se recalculan.
+
+    Requiere el cerrojo de CONSOLIDACION. Se toman antes de leer las
+    fuentes, así que las que lleguen durante el cálculo persisten; si el
+    cálculo falla, vuelven a pendientes.
+    """
+    # Las de una pasada anterior cortada a mitad
+    _devolver(a)
+    tomadas = _tomar(a, nodos)
+    try:
+        yield tomadas
+    except BaseException:
+        _devolver(a)
+        raise
+    with a.bloqueo(PENDIENTES):
+        _ruta_en_curso(a).unlink(missing_ok=True)
+
+
+# =========================
+# DATOS DE ORIGEN
+# =========================
+def _con_periodo(df, col="Fecha"):
+    fechas = pd.to_datetime(df[col], dayfirst=True, errors="coerce")
+    df = df.assign(anio=fechas.dt.year, mes=fechas.dt.month)
+    return df.dropna(subset=["anio"]).astype({"anio": "int64", "mes": "int64"})
+
+
+class _Datos:
+    """Carga perezosa de las fuentes que necesite la consolidación.
+
+    ``precargados`` permite calcular sin almacén a partir de fuentes y
+    artefactos ya en memoria (reconstrucción por lotes).
+    """
+
+    def __init__(self, a, precargados=None):
+        self.a = a
+        self.artefactos = {}
+        self.__dict__.update(precargados or {})
+
+    @cached_property
+    def ventas(self):
+        from oyken.ventas import cargar_ventas
+        return cargar_ventas(self.a, columnas=COLUMNAS_FUENTE["ventas"])
+
+    @cached_property
+    def compras(self):
+        # Con las altas aún en el journal de escritura diferida
+        return _con_periodo(compartido.tabla("compras", self.a)[list(COLUMNAS_FUENTE["compras"])])
+
+    @cached_property
+    def gastos(self):
+        return _con_periodo(compartido.tabla("gastos", self.a)[list(COLUMNAS_FUENTE["gastos"])])
+
+    @cached_property
+    def rrhh_puestos(self):
+        return self.a.leer("rrhh_puestos")
+
+    def ventas_anios(self, anios):
+        # Con almacén, solo se leen las particiones anuales afectadas
+        if "ventas" in self.__dict__:
+            return self.ventas
+        from oyken.ventas import cargar_ventas
+        return cargar_ventas(
+            self.a,
+            desde=f"{min(anios)}-01-01",
+            hasta=f"{max(anios)}-12-31",
+            columnas=COLUMNAS_FUENTE["ventas"]
+        )
+
+    def artefacto(self, nombre):
+        if nombre not in self.artefactos:
+            return self.a.leer(nombre)
+        return self.artefactos[nombre]
+
+    def anios(self, fuente):
+        if fuente == "rrhh_puestos":
+            return set(self.rrhh_puestos["Año"].tolist())
+        if fuente == "ventas" and "ventas" not in self.__dict__:
+            from oyken.ventas import anios_ventas
+            return set(anios_ventas(self.a))
+        return set(getattr(self, fuente)["anio"].tolist())
+
+
+# =========================
+# CÁLCULO POR CONSOLIDADO
+# =========================
+def _suma_mensual(df, col, destino, particiones):
+    suma = df.groupby(["anio", "mes"])[col].sum()
+    indice = pd.MultiIndex.from_tuples(sorted(particiones), names=["anio", "mes"])
+    return (
+        suma.reindex(indice, fill_value=0.0)
+        .round(2)
+        .rename(destino)
+        .reset_index()
+    )
+
+
+def _calcular(nombre, datos, particiones):
+    if nombre == "ventas_mensuales":
+        ventas = datos.ventas_anios({anio for anio, _ in particiones})
+        return _suma_mensual(ventas, "ventas_total_eur", "ventas_total_eur", particiones)
+
+    if nombre == "compras_mensuales":
+        return _suma_mensual(datos.compras, "Coste (€)", "compras_total_eur", particiones)
+
+    if nombre == "gastos_mensuales":
+        return _suma_mensual(datos.gastos, "Coste (€)", "gastos_total_eur", particiones)
+
+    if nombre == "rrhh_mensual":
+        df = rrhh.coste_mensual(datos.rrhh_puestos)
+        return _suma_mensual(df, "rrhh_total_eur", "rrhh_total_eur", particiones)
+
+    if nombre == "coste_producto":
+        compras = datos.artefacto("compras_mensuales").set_index(["anio", "mes"])["compras_total_eur"]
+        ventas = datos.artefacto("ventas_mensuales").set_index(["anio", "mes"])["ventas_total_eur"]
+
+        filas = []
+        for anio, mes in sorted(particiones):
+            if mes == 0:
+                c = compras[compras.index.get_level_values("anio") == anio].sum()
+                v = ventas[ventas.index.get_level_values("anio") == anio].sum()
+            else:
+                c = compras.get((anio, mes), 0.0)
+                v = ventas.get((anio, mes), 0.0)
+
+            # Sin ventas no hay porcentaje calculable
+            if v > 0:
+                filas.append({
+                    "anio": anio,
+                    "mes": mes,
+                    "coste_producto_pct": round(c / v, 4),
+                })
+        return pd.DataFrame(filas, columns=["anio", "mes", "coste_producto_pct"])
+
+    if nombre == "breakeven_resumen":
+        return breakeven.resumen(
+            datos.artefacto("compras_mensuales"),
+            datos.artefacto("ventas_mensuales"),
+            datos.rrhh_puestos,
+            datos.gastos,
+            sorted(particiones),
+            datetime.now(),
+        )
+
+    raise KeyError(nombre)
+
+
+def _reemplazar(a, nombre, nuevas, particiones):
+    df = a.leer(nombre)
+
+    claves = pd.MultiIndex.from_tuples(sorted(particiones))
+    existentes = pd.MultiIndex.from_arrays([df["anio"], df["mes"]])
+    df = df[~existentes.isin(claves)]
+
+    if not nuevas.empty:
+        nuevas = nuevas.copy()
+        if "fecha_actualizacion" in df.columns and "fecha_actualizacion" not in nuevas:
+            nuevas["fecha_actualizacion"] = datetime.now()
+        df = pd.concat([df, nuevas], ignore_index=True)
+
+    a.escribir(nombre, df.sort_values(["anio", "mes"]))
+
+
+# =========================
+# CONSOLIDACIÓN
+# =========================
+def _todas(nombre, datos, a):
+    particiones = set()
+    for entrada in GRAFO[nombre]:
+        if entrada in GRAFO:
+            anios = set(a.leer(entrada)["anio"].tolist())
+        else:
+            anios = datos.anios(entrada)
+        for anio in anios:
+            particiones.update(particiones_anio(anio))
+
+    existentes = a.leer(nombre)
+    particiones.update(zip(existentes["anio"], existentes["mes"]))
+    return {(int(anio), int(mes)) for anio, mes in particiones}
+
+
+def consolidar(a=None, nombres=None):
+    """Recalcula las particiones pendientes de ``nombres`` y sus ancestros."""
+    a = a or almacen()
+    objetivo = ancestros(nombres) if nombres is not None else set(GRAFO)
+    objetivo = [nombre for nombre in _orden() if nombre in objetivo]
+    escritos = []
+
+    # Nada pendiente ni en curso: ni cerrojo ni escritura (los ficheros se
+    # reemplazan atómicamente). Con una pasada en curso se espera a que acabe.
+    if not _leer_pendientes(a) and not _ruta_en_curso(a).exists():
+        return escritos
+
+    with a.bloqueo(CONSOLIDACION), _pasada(a, objetivo) as pendientes:
+        datos = _Datos(a)
+        for nombre in _orden():
+            sucias = pendientes.get(nombre)
+            if not sucias:
+                continue
+
+            particiones = {p for p in sucias if p != TODAS}
+            if TODAS in sucias:
+                particiones |= _todas(nombre, datos, a)
+            if nombre in CON_ANUAL:
+                particiones = _con_anual(particiones)
+
+            if particiones:
+                nuevas = _calcular(nombre, datos, particiones)
+                _reemplazar(a, nombre, nuevas, particiones)
+                escritos.append(nombre)
+            elif not a.existe(nombre):
+                # Fuentes vacías: tabla solo con el esquema, para que cuente
+                # como materializado y no se vuelva a marcar en cada lectura
+                a.escribir(nombre, a.leer(nombre))
+                escritos.append(nombre)
+
+    return escritos
+
+
+def notificar_cambio(fuente, particiones, a=None):
+    """Marca el cambio y recalcula los descendientes en segundo plano.
+
+    Un solo hilo por almacén: los avisos que llegan mientras consolida se
+    agrupan en una pasada más al terminar.
+    """
+    a = a or almacen()
+    marcar(fuente, particiones, a)
+
+    clave = (type(a.backend).__name__, str(a.raiz.resolve()))
+    with _CONSOLIDANDO_LOCK:
+        if clave in _CONSOLIDANDO:
+            _CONSOLIDANDO[clave] = True
+            return
+        _CONSOLIDANDO[clave] = False
+    threading.Thread(
+        target=_consolidar_en_segundo_plano, args=(a, clave),
+        name=HILO_CONSOLIDACION, daemon=True
+    ).start()
+
+
+def _consolidar_en_segundo_plano(a, clave):
+    try:
+        while True:
+            consolidar(a)
+            with _CONSOLIDANDO_LOCK:
+                if not _CONSOLIDANDO[clave]:
+                    del _CONSOLIDANDO[clave]
+                    return
+                _CONSOLIDANDO[clave] = False
+    except BaseException:
+        with _CONSOLIDANDO_LOCK:
+            _CONSOLIDANDO.pop(clave, None)
+        raise
+
+
+def asegurar_consolidados(a=None, nombres=None):
+    """Deja frescos ``nombres`` (todos por defecto), materializando los que falten."""
+    a = a or almacen()
+    objetivo = ancestros(nombres) if nombres is not None else set(GRAFO)
+    _marcar_inexistentes(a, [n for n in _orden() if n in objetivo])
+    return consolidar(a, nombres)
+
+
+def leer_fresco(nombre, a=None):
+    """Lectura de un artefacto con sus particiones pendientes ya recalculadas."""
+    if a is None and locales.es_grupo():
+        return _leer_grupo(nombre)
+    a = a or almacen()
+    asegurar_consolidados(a, [nombre])
+    return a.leer(nombre)
+
+
+def _leer_grupo(nombre):
+    if nombre not in ADITIVOS:
+        raise locales.VistaGrupo(f"{nombre} no se puede sumar entre locales: elige un local.")
+
+    df = pd.concat(
+        locales.en_paralelo(lambda a: leer_fresco(nombre, a)).values(),
+        ignore_index=True
+    )
+    valores = [c for c in df.columns if c not in ("anio", "mes", "fecha_actualizacion")]
+    meses = df.groupby(["anio", "mes"], as_index=False)
+    grupo = meses[valores].sum()
+    grupo["fecha_actualizacion"] = meses["fecha_actualizacion"].max()["fecha_actualizacion"]
+    return grupo[list(df.columns)]
+
+
+# =========================
+# INVENTARIO
+# =========================
+def variacion_inventario(df_inv):
+    df = df_inv.sort_values(["anio", "mes"]).copy()
+    df["variacion_inventario_eur"] = (
+        df["inventario_cierre_eur"] - df["inventario_cierre_eur"].shift(1)
+    )
+    # Primer registro sin variación
+    df["variacion_inventario_eur"] = df["variacion_inventario_eur"].fillna(0.0)
+    return df
@@ -0,0 +1,83 @@
+"""EBITDA mensual y escenarios de absorción de la brecha operativa."""
+
+# Columnas de los consolidados que entran en la base mensual
+ENTRADAS = {
+    "ventas_total_eur": "ventas_mensuales",
+    "compras_total_eur": "compras_mensuales",
+    "rrhh_total_eur": "rrhh_mensual",
+    "gastos_total_eur": "gastos_mensuales",
+    "variacion_inventario_eur": "inventario_mensual",
+}
+
+
+def base_mensual(consolidados, anio, mes=0):
+    """Una fila por mes con las entradas de EBITDA (0 donde falten).
+
+    ``consolidados`` mapea el nombre del consolidado a su DataFrame.
+    """
+    import pandas as pd
+
+    base = pd.DataFrame({"mes": range(1, 13)})
+
+    for col, nombre in ENTRADAS.items():
+        df = consolidados[nombre]
+        df = df[df["anio"] == anio]
+        base = base.merge(df[["mes", col]], on="mes", how="left")
+
+    base = base.fillna(0)
+
+    if mes != 0:
+        base = base[base["mes"] == mes]
+
+    return base.sort_values("mes")
+
+
+def ebitda(base):
+    base = base.copy()
+    base["ebitda_base_eur"] = (
+        base["ventas_total_eur"]
+        - base["compras_total_eur"]
+        - base["rrhh_total_eur"]
+        - base["gastos_total_eur"]
+    )
+    base["ebitda_ajustado_eur"] = (
+        base["ebitda_base_eur"]
+        - base["variacion_inventario_eur"]
+    )
+    return base
+
+
+def zona(ratio):
+    # Zona operativa según la fracción de brecha absorbida
+    if ratio < 0.5:
+        return "sostenible"
+    if ratio < 0.7:
+        return "eficiente"
+    if ratio <= 1:
+        return "exigente"
+    return "forzado"
+
+
+def escenario(be_real, brecha, ratio):
+    return {
+        "ventas_objetivo": be_real + brecha * ratio,
+        "ebitda_esperado": brecha * ratio,
+        "zona": zona(ratio),
+    }
+
+
+def objetivos(be_real, brecha, mc):
+    """Referencias sostenible / eficiente / exigente de la estructura actual."""
+    ventas_eficiente_min = be_real + brecha * 0.5
+    ventas_eficiente_max = be_real + brecha * 0.7
+
+    return {
+        "ventas_sostenible": be_real,
+        "ventas_eficiente_min": ventas_eficiente_min,
+        "ventas_eficiente_max": ventas_eficiente_max,
+        "ventas_exigente": be_real + brecha,
+        "ebitda_eficiente_min": (ventas_eficiente_min - be_real) * mc,
+        "ebitda_eficiente_max": (ventas_eficiente_max - be_real) * mc,
+        # Interpretación directa OYKEN
+        "ebitda_exigente": brecha,
+    }
@@ -0,0 +1,171 @@
+"""Esquemas tipados de los almacenes OYKEN.
+
+Cada columna declara su tipo lógico: "fecha", "float", "int" o "str".
+El almacén usa estos tipos para devolver siempre DataFrames tipados, con
+independencia del backend (CSV, Parquet o SQLite).
+"""
+
+MESES = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+]
+
+ESQUEMAS = {
+
+    # =========================
+    # DATOS OPERATIVOS
+    # =========================
+    "ventas": {
+        "fecha": "fecha",
+        "ventas_manana_eur": "float",
+        "ventas_tarde_eur": "float",
+        "ventas_noche_eur": "float",
+        "ventas_total_eur": "float",
+        "comensales_manana": "int",
+        "comensales_tarde": "int",
+        "comensales_noche": "int",
+        "tickets_manana": "int",
+        "tickets_tarde": "int",
+        "tickets_noche": "int",
+        "observaciones": "str",
+    },
+    "gastos": {
+        "Fecha": "str",
+        "Mes": "str",
+        "Concepto": "str",
+        "Categoria": "str",
+        "Tipo_Gasto": "str",
+        "Rol_Gasto": "str",
+        "Coste (€)": "float",
+    },
+    "compras": {
+        "Fecha": "str",
+        "Proveedor": "str",
+        "Familia": "str",
+        "Coste (€)": "float",
+    },
+    "proveedores": {
+        "Proveedor": "str",
+    },
+    "rrhh_puestos": {
+        "Año": "int",
+        "Puesto": "str",
+        "Rol_RRHH": "str",
+        "Bruto anual (€)": "float",
+        **{mes: "int" for mes in MESES},
+    },
+    "inventario_mensual": {
+        "anio": "int",
+        "mes": "int",
+        "inventario_cierre_eur": "float",
+        "variacion_inventario_eur": "float",
+        "fecha_actualizacion": "str",
+    },
+    "mermas": {
+        "Fecha": "str",
+        "Mes": "str",
+        "Familia": "str",
+        "Producto": "str",
+        "Unidad": "str",
+        "Cantidad": "float",
+        "Motivo": "str",
+    },
+
+    # =========================
+    # TICKETS DEL TPV (opcional, particiones mensuales)
+    # =========================
+    # momento: segundos desde 1970-01-01 en hora local; importe en céntimos
+    "tickets": {
+        "momento": "int",
+        "importe_cent": "int",
+        "comensales": "int",
+        "canal": "str",
+    },
+
+    # Ventas por franja de 15 minutos (céntimos) de cada día de negocio:
+    # v_0000 ... v_2345 por hora de reloj (oyken.intradia)
+    "ventas_intradia": {
+        "fecha": "fecha",
+        **{f"v_{m // 60:02d}{m % 60:02d}": "int" for m in range(0, 24 * 60, 15)},
+    },
+
+    # =========================
+    # KPIs DIARIOS (materializados al guardar ventas)
+    # =========================
+    "ventas_kpi_diario": {
+        "fecha": "fecha",
+        "ventas_total_eur": "float",
+        "comensales_total": "int",
+        "tickets_total": "int",
+        "ticket_medio_manana_eur": "float",
+        "ticket_medio_tarde_eur": "float",
+        "ticket_medio_noche_eur": "float",
+        "ticket_medio_total_eur": "float",
+        "eur_comensal_manana": "float",
+        "eur_comensal_tarde": "float",
+        "eur_comensal_noche": "float",
+        "eur_comensal_total": "float",
+        "tickets_comensal_manana": "float",
+        "tickets_comensal_tarde": "float",
+        "tickets_comensal_noche": "float",
+        "tickets_comensal_total": "float",
+    },
+
+    # =========================
+    # CONSOLIDADOS MENSUALES
+    # =========================
+    "ventas_mensuales": {
+        "anio": "int",
+        "mes": "int",
+        "ventas_total_eur": "float",
+        "fecha_actualizacion": "str",
+    },
+    "compras_mensuales": {
+        "anio": "int",
+        "mes": "int",
+        "compras_total_eur": "float",
+        "fecha_actualizacion": "str",
+    },
+    "gastos_mensuales": {
+        "anio": "int",
+        "mes": "int",
+        "gastos_total_eur": "float",
+        "fecha_actualizacion": "str",
+    },
+    "rrhh_mensual": {
+        "anio": "int",
+        "mes": "int",
+        "rrhh_total_eur": "float",
+        "fecha_actualizacion": "str",
+    },
+    "coste_producto": {
+        "anio": "int",
+        "mes": "int",
+        "coste_producto_pct": "float",
+        "fecha_actualizacion": "str",
+    },
+    "breakeven_resumen": {
+        "anio": "int",
+        "mes": "int",
+        "costes_fijos_totales_eur": "float",
+        "costes_variables_reales_eur": "float",
+        "margen_bruto_pct": "float",
+        "margen_contribucion_real_pct": "float",
+        "breakeven_operativo_eur": "float",
+        "breakeven_real_eur": "float",
+        "brecha_operativa_eur": "float",
+        "dias_periodo": "int",
+        "breakeven_operativo_diario_eur": "float",
+        "breakeven_real_diario_eur": "float",
+        "brecha_operativa_diaria_eur": "float",
+        "resultado_check_eur": "float",
+        "fecha_calculo": "str",
+        "version_modelo": "str",
+    },
+}
+
+# Valores por defecto distintos del neutro del tipo ("" / 0)
+DEFECTOS = {
+    # Compatibilidad retroactiva OYKEN
+    "rrhh_puestos": {"Rol_RRHH": "Estructural mínimo"},
+}
@@ -0,0 +1,233 @@
+"""Importación masiva de exportaciones del TPV a las ventas diarias.
+
+Una exportación del TPV trae una fila por ticket (momento, importe y,
+opcionalmente, comensales). ``importar`` la lee por bloques (CSV o JSON
+lines) sin cargarla entera: cada bloque se valida en bloque y se agrega por
+día de negocio y turno, así que la memoria depende de los días importados,
+no de los tickets. Al terminar, los días se guardan con una sola escritura
+por partición anual (``ventas.registrar_ventas``) y sustituyen a los que ya
+existieran, igual que volver a guardar el formulario, aunque conservan las
+observaciones que ya tuvieran.
+
+    python -m oyken.importar export.csv [--formato jsonl] [--bloque 200000]
+        [--momento fecha_hora] [--hora hora] [--importe importe]
+        [--comensales comensales] [--dayfirst] [--formato-fecha FORMATO]
+        [--canal canal] [--sep ";"] [--decimal ","] [--tickets]
+
+Turnos por franja horaria, las del almacén (``tickets.inicio_turnos``): los
+tickets anteriores al inicio del primer turno (madrugada) cuentan en la
+noche del día anterior. Los importes negativos son abonos: restan ventas
+pero no cuentan tickets. Con ``--tickets`` cada ticket se guarda además en
+el registro de tickets (``oyken.tickets``).
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from oyken import intradia
+from oyken.derivados import marcar
+from oyken.storage import almacen
+from oyken.tickets import (
+    INICIO_TURNOS, Carga, agregar, desde_momentos, dia_negocio, dias_ventas,
+    inicio_turnos,
+)
+from oyken.ventas import COLUMNAS, registrar_ventas
+
+# Columnas del TPV → campo OYKEN ("hora" solo si viene separada de la fecha)
+CAMPOS_TPV = {
+    "momento": "fecha_hora",
+    "hora": None,
+    "importe": "importe",
+    "comensales": "comensales",
+    "canal": "canal",
+}
+
+# Filas por bloque de lectura
+BLOQUE = 200_000
+
+FORMATOS = ("csv", "jsonl")
+
+
+class ImportacionInvalida(ValueError):
+    """La exportación no tiene las columnas mínimas (momento e importe)."""
+
+
+# =========================
+# LECTURA POR BLOQUES
+# =========================
+def _formato(origen, formato):
+    if formato is not None:
+        return formato
+    nombre = str(getattr(origen, "name", origen)).lower()
+    return "jsonl" if nombre.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _bloques(origen, formato, campos, bloque, sep):
+    buscadas = {c for c in campos.values() if c}
+    if formato == "csv":
+        return pd.read_csv(
+            origen, sep=sep, chunksize=bloque,
+            usecols=lambda c: c in buscadas, dtype=str
+        )
+    return pd.read_json(origen, lines=True, chunksize=bloque, dtype=False)
+
+
+# =========================
+# TURNOS Y VALIDACIÓN
+# =========================
+def _numero(serie, decimal):
+    if decimal != "." and pd.api.types.is_string_dtype(serie):
+        serie = serie.str.replace(".", "", regex=False).str.replace(decimal, ".", regex=False)
+    return pd.to_numeric(serie, errors="coerce")
+
+
+def _formato_fecha(momento, dayfirst):
+    # Un solo formato por bloque, deducido de sus primeras filas legibles:
+    # sin él pandas analiza fila a fila
+    for valor in momento.head(100):
+        formato = guess_datetime_format(valor, dayfirst=dayfirst)
+        if formato is not None:
+            return formato
+    return None
+
+
+def _tickets(df, campos, formato_fecha, dayfirst, decimal):
+    # Bloque de la exportación → tickets válidos (esquema de oyken.tickets)
+    momento = df[campos["momento"]].astype(str)
+    if campos.get("hora"):
+        momento = momento + " " + df[campos["hora"]].astype(str)
+    momento = pd.to_datetime(
+        momento, errors="coerce", format=formato_fecha or _formato_fecha(momento, dayfirst)
+    )
+
+    importe = _numero(df[campos["importe"]], decimal)
+    if campos.get("comensales") in df.columns:
+        comensales = _numero(df[campos["comensales"]], decimal).fillna(0)
+    else:
+        comensales = pd.Series(0, index=df.index)
+    if campos.get("canal") in df.columns:
+        canal = df[campos["canal"]].fillna("").astype(str).to_numpy()
+    else:
+        canal = ""
+
+    validas = (momento.notna() & importe.notna() & (comensales >= 0)).to_numpy()
+    if not isinstance(canal, str):
+        canal = canal[validas]
+    tickets = desde_momentos(momento[validas], importe[validas], comensales[validas], canal)
+    return tickets, int((~validas).sum())
+
+
+# =========================
+# IMPORTACIÓN
+# =========================
+def leer_exportacion(origen, formato=None, campos=None, bloque=BLOQUE,
+                     sep=",", decimal=".", dayfirst=False, formato_fecha=None,
+                     inicios=None, carga=None):
+    """Ventas diarias (esquema ``ventas``) de una exportación del TPV.
+
+    Devuelve (días, serie intradía de ``intradia.franjas``, filas leídas,
+    filas rechazadas). Los tickets de un mismo día se suman aunque lleguen
+    en bloques distintos. Con ``carga``
+    (``tickets.Carga``) los tickets válidos se guardan además uno a uno.
+    """
+    formato = _formato(origen, formato)
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de importación desconocido: {formato!r}")
+    campos = {**CAMPOS_TPV, **(campos or {})}
+    inicios = inicios or INICIO_TURNOS
+
+    acumulado, serie, leidas, rechazadas = None, None, 0, 0
+    for df in _bloques(origen, formato, campos, bloque, sep):
+        faltan = [campos[c] for c in ("momento", "hora", "importe")
+                  if campos.get(c) and campos[c] not in df.columns]
+        if faltan:
+            raise ImportacionInvalida(f"Faltan columnas en la exportación: {', '.join(faltan)}")
+
+        tickets, malas = _tickets(df, campos, formato_fecha, dayfirst, decimal)
+        if carga is not None:
+            carga.anadir(tickets)
+        parte = agregar(tickets, inicios)
+        franjas = intradia.franjas(tickets, dia_negocio(tickets["momento"], inicios))
+        leidas += len(df)
+        rechazadas += malas
+        # Solo se conserva el agregado por día (turnos y franjas)
+        acumulado = parte if acumulado is None else acumulado.add(parte, fill_value=0)
+        serie = franjas if serie is None else serie.add(franjas, fill_value=0)
+
+    if acumulado is None or acumulado.empty:
+        return pd.DataFrame(columns=COLUMNAS), None, leidas, rechazadas
+    return dias_ventas(acumulado), serie.astype("int64"), leidas, rechazadas
+
+
+def importar(origen, a=None, guardar_tickets=False, **opciones):
+    """Importa una exportación del TPV; devuelve un resumen de la carga.
+
+    Con ``guardar_tickets`` los tickets quedan también en el registro de
+    tickets (``oyken.tickets``), del que se pueden volver a agregar. La
+    serie de franjas de 15 minutos va a ``oyken.intradia``.
+    """
+    a = a or almacen()
+    opciones["inicios"] = opciones.get("inicios") or inicio_turnos(a)
+    carga = Carga(a, opciones["inicios"]) if guardar_tickets else None
+    dias, serie, leidas, rechazadas = leer_exportacion(origen, carga=carga, **opciones)
+    if carga is not None:
+        carga.cerrar()
+
+    anios = []
+    if not dias.empty:
+        anios = registrar_ventas(dias, a)
+        intradia.registrar(serie, a)
+        # Consolidados: se recalculan al leerlos (o en el próximo cambio)
+        marcar("ventas", set(zip(dias["fecha"].dt.year, dias["fecha"].dt.month)), a)
+
+    return {
+        # Importados: las filas rechazadas no cuentan
+        "tickets": leidas - rechazadas,
+        "rechazadas": rechazadas,
+        "dias": len(dias),
+        "anios": anios,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m oyken.importar",
+        description="Importa una exportación del TPV (un ticket por fila) a las ventas diarias."
+    )
+    parser.add_argument("origen", type=Path)
+    parser.add_argument("--formato", choices=FORMATOS, default=None,
+                        help="por defecto, según la extensión del fichero")
+    parser.add_argument("--bloque", type=int, default=BLOQUE, help="filas por bloque de lectura")
+    parser.add_argument("--sep", default=",", help="separador del CSV")
+    parser.add_argument("--decimal", default=".", help="separador decimal de los importes")
+    parser.add_argument("--tickets", action="store_true",
+                        help="guardar también cada ticket (oyken.tickets, en parquet: requiere pyarrow)")
+    parser.add_argument("--dayfirst", action="store_true", help="fechas DD/MM/AAAA")
+    parser.add_argument("--formato-fecha", default=None,
+                        help="formato strftime del momento (por defecto, deducido)")
+    for campo, defecto in CAMPOS_TPV.items():
+        parser.add_argument(f"--{campo}", default=defecto, help=f"columna de {campo} en el TPV")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resumen = importar(
+        args.origen,
+        guardar_tickets=args.tickets,
+        formato=args.formato,
+        campos={campo: getattr(args, campo) for campo in CAMPOS_TPV},
+        bloque=args.bloque,
+        sep=args.sep,
+        decimal=args.decimal,
+        dayfirst=args.dayfirst,
+        formato_fecha=args.formato_fecha,
+    )
+    print(
+        f"importados: {resumen['dias']} días de {resumen['tickets']} tickets "
+        f"({resumen['rechazadas']} filas rechazadas) · años {resumen['anios']}"
+    )
+    print(f"tiempo: {time.perf_counter() - inicio:.2f} s")
+    sys.exit(0)
@@ -0,0 +1,219 @@
+"""Ventas intradía: una serie de franjas de 15 minutos por día.
+
+Cada día de negocio guarda 96 importes (céntimos, franja por su hora de
+reloj: la madrugada del día siguiente cae en las primeras franjas) en
+``ventas_intradia``, con particiones anuales. Se escribe desde los tickets
+del TPV (``oyken.importar`` y ``oyken.tickets``); los días tecleados en el
+formulario solo tienen los tres turnos.
+
+En memoria la serie es una matriz int32 (días × 96) por partición, en la
+caché de proceso. ``remuestrear`` la lleva a cualquier reparto horario
+(turnos, tramos del RRHH Core, bandas propias) con un único producto de
+matrices para todo el rango pedido.
+"""
+import numpy as np
+import pandas as pd
+
+from oyken import locales
+from oyken.cache import cacheado
+from oyken.cobertura import MINUTOS_DIA, minutos
+from oyken.storage import almacen
+
+TABLA = "ventas_intradia"
+
+MINUTOS_FRANJA = 15
+FRANJAS = MINUTOS_DIA // MINUTOS_FRANJA
+COLUMNAS_FRANJA = [
+    f"v_{m // 60:02d}{m % 60:02d}" for m in range(0, MINUTOS_DIA, MINUTOS_FRANJA)
+]
+
+
+def _clave(a, *resto):
+    return ("intradia", type(a.backend).__name__, str(a.raiz.resolve())) + resto
+
+
+# =========================
+# CONSTRUCCIÓN
+# =========================
+def franjas(tickets, dias):
+    """Céntimos por (día de negocio, franja) de ``tickets``.
+
+    ``dias`` es el día de negocio de cada ticket (días desde 1970-01-01);
+    devuelve un DataFrame indexado por día con una columna por franja.
+    """
+    momento = tickets["momento"].to_numpy()
+    franja = momento % 86_400 // (MINUTOS_FRANJA * 60)
+    dias = np.asarray(dias, dtype="int64")
+    if not len(dias):
+        return pd.DataFrame(columns=range(FRANJAS), dtype="int64")
+
+    unicos, fila = np.unique(dias, return_inverse=True)
+    suma = np.bincount(
+        fila * FRANJAS + franja,
+        weights=tickets["importe_cent"].to_numpy(),
+        minlength=len(unicos) * FRANJAS
+    )
+    return pd.DataFrame(
+        np.rint(suma).astype("int64").reshape(len(unicos), FRANJAS),
+        index=pd.Index(unicos, name="dia")
+    )
+
+
+def registrar(serie, a=None):
+    """Guarda la serie de ``franjas`` (una escritura por año); sus días sustituyen a los guardados."""
+    a = a or almacen()
+    if serie.empty:
+        return []
+
+    df = pd.DataFrame(serie.to_numpy(), columns=COLUMNAS_FRANJA)
+    df.insert(0, "fecha", serie.index.to_numpy().astype("datetime64[D]"))
+    df["fecha"] = pd.to_datetime(df["fecha"])
+
+    with a.bloqueo(TABLA):
+        for anio, parte in df.groupby(df["fecha"].dt.year):
+            previa = a.leer_particion(TABLA, anio)
+            nueva = pd.concat([previa, parte], ignore_index=True)
+            nueva = nueva.drop_duplicates(subset=["fecha"], keep="last").sort_values("fecha")
+            a.escribir_particion(TABLA, anio, nueva)
+
+    return sorted(int(anio) for anio in df["fecha"].dt.year.unique())
+
+
+def descartar(fechas, a=None):
+    """Quita los días ``fechas`` de la serie guardada."""
+    a = a or almacen()
+    fechas = pd.DatetimeIndex(fechas)
+    with a.bloqueo(TABLA):
+        for anio in sorted(set(fechas.year)):
+            df = a.leer_particion(TABLA, anio)
+            quedan = df[~df["fecha"].isin(fechas)]
+            if len(quedan) != len(df):
+                a.escribir_particion(TABLA, anio, quedan)
+
+
+# =========================
+# LECTURA
+# =========================
+def _particion(a, anio):
+    # (fechas, matriz int32 días × franjas), una vez por versión
+    tabla = a.tabla_particion(TABLA, anio)
+
+    def cargar():
+        df = a.leer(tabla)
+        return (
+            pd.DatetimeIndex(df["fecha"]),
+            df[COLUMNAS_FRANJA].to_numpy(dtype="int32"),
+        )
+
+    return cacheado(_clave(a, anio), a.version(tabla), cargar)
+
+
+def cargar_serie(a=None, desde=None, hasta=None):
+    """Serie intradía de [desde, hasta]: (fechas, matriz int32 en céntimos).
+
+    En la vista de grupo, la suma de los locales por día y franja.
+    """
+    if a is None and locales.es_grupo():
+        partes = [
+            pd.DataFrame(matriz, index=fechas).astype("int64")
+            for fechas, matriz in locales.en_paralelo(
+                lambda a: cargar_serie(a, desde, hasta)
+            ).values()
+        ]
+        grupo = pd.concat(partes).groupby(level=0).sum() if partes else pd.DataFrame()
+        return pd.DatetimeIndex(grupo.index), grupo.to_numpy(dtype="int32").reshape(-1, FRANJAS)
+
+    a = a or almacen()
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+
+    anios = [
+        anio for anio in a.particiones(TABLA)
+        if (desde is None or anio >= desde.year) and (hasta is None or anio <= hasta.year)
+    ]
+    if not anios:
+        return pd.DatetimeIndex([]), np.zeros((0, FRANJAS), dtype="int32")
+
+    partes = [_particion(a, anio) for anio in anios]
+    fechas = pd.DatetimeIndex(np.concatenate([f.to_numpy() for f, _ in partes]))
+    matriz = np.concatenate([m for _, m in partes])
+
+    dentro = np.ones(len(fechas), dtype=bool)
+    if desde is not None:
+        dentro &= fechas >= desde
+    if hasta is not None:
+        dentro &= fechas <= hasta
+    return fechas[dentro], matriz[dentro]
+
+
+# =========================
+# REMUESTREO
+# =========================
+def bandas_turnos(inicios):
+    """Bandas de los turnos a partir de sus horas de inicio ({turno: hora})."""
+    horas = list(inicios.values())
+    return [
+        (turno, int(round(inicio * 60)), int(round(fin * 60)) % MINUTOS_DIA)
+        for turno, inicio, fin in zip(inicios, horas, horas[1:] + horas[:1])
+    ]
+
+
+def bandas_tramos(tramos):
+    """Bandas de los tramos del RRHH Core (nombre, inicio y fin 'HH:MM').
+
+    Los tramos sin horas válidas se ignoran.
+    """
+    bandas = []
+    for tramo in tramos:
+        try:
+            bandas.append((tramo["nombre"], minutos(tramo["inicio"]), minutos(tramo["fin"])))
+        except ValueError:
+            continue
+    return bandas
+
+
+def pertenencia(bandas):
+    """Matriz franjas × bandas: 1 si la franja empieza dentro de la banda.
+
+    Cada banda es (nombre, minuto inicial, minuto final) en [inicio, fin);
+    con fin <= inicio la banda cruza la medianoche.
+    """
+    inicio_franja = np.arange(FRANJAS) * MINUTOS_FRANJA
+    columnas = []
+    for _, inicio, fin in bandas:
+        if fin > inicio:
+            dentro = (inicio_franja >= inicio) & (inicio_franja < fin)
+        else:
+            dentro = (inicio_franja >= inicio) | (inicio_franja < fin)
+        columnas.append(dentro)
+    return np.column_stack(columnas).astype("int64") if columnas else np.zeros((FRANJAS, 0), dtype="int64")
+
+
+def remuestrear(fechas, matriz, bandas):
+    """Ventas (€) de cada día por banda: una columna por banda, índice fecha."""
+    valores = matriz.astype("int64") @ pertenencia(bandas)
+    return pd.DataFrame(
+        valores / 100,
+        index=pd.DatetimeIndex(fechas, name="fecha"),
+        columns=[nombre for nombre, _, _ in bandas]
+    )
+
+
+def ventas_por_banda(bandas, a=None, desde=None, hasta=None):
+    """``remuestrear`` sobre la serie guardada de [desde, hasta]."""
+    fechas, matriz = cargar_serie(a, desde, hasta)
+    return remuestrear(fechas, matriz, bandas)
+
+
+def curva_media(fechas, matriz, horas=False):
+    """Venta media (€) por franja de 15 minutos (o por hora) sobre los días dados."""
+    if not len(fechas):
+        media = np.zeros(FRANJAS)
+    else:
+        media = matriz.mean(axis=0) / 100
+    etiquetas = [c[2:4] + ":" + c[4:] for c in COLUMNAS_FRANJA]
+    curva = pd.Series(media, index=etiquetas)
+    if horas:
+        curva = curva.groupby(np.arange(FRANJAS) // (60 // MINUTOS_FRANJA)).sum()
+        curva.index = [f"{h:02d}:00" for h in curva.index]
+    return curva
@@ -0,0 +1,126 @@
+"""Journal append-only en JSON Lines.
+
+Cada registro se añade al final del fichero con una sola escritura, de modo
+que el coste de guardar no depende del tamaño del histórico. La compactación
+(volcado al almacén principal) la decide el consumidor.
+
+Añadir y congelar comparten un cerrojo de fichero (``oyken.bloqueo``): un
+guardado nunca cae en un journal que ya se está volcando. El consumidor
+puede dejar una marca en el fichero congelado (p. ej. la versión de la tabla
+destino al congelar) para reconocer, tras un corte, un lote ya volcado.
+"""
+import json
+import os
+from pathlib import Path
+
+from oyken.bloqueo import cerrojo, ruta_cerrojo
+
+
+# Clave de la línea de marca del fichero congelado (no es un registro)
+MARCA = "_marca"
+
+
+class Journal:
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        # Fichero congelado durante una compactación en curso
+        self.ruta_compactando = self.ruta.with_name(self.ruta.name + ".compactando")
+        self.ruta_cerrojo = ruta_cerrojo(self.ruta.parent, self.ruta.name)
+
+    # -------------------------
+    # ESCRITURA
+    # -------------------------
+    def append(self, registro: dict):
+        linea = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+        with cerrojo(self.ruta_cerrojo), open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(linea)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # -------------------------
+    # LECTURA
+    # -------------------------
+    def _leer_fichero(self, ruta):
+        if not ruta.exists():
+            return []
+
+        registros = []
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Línea truncada por un corte a mitad de escritura
+                    continue
+                if MARCA not in registro:
+                    registros.append(registro)
+        return registros
+
+    def leer(self, congelado=True):
+        """Registros pendientes; sin ``congelado``, solo los del journal vivo."""
+        previos = self._leer_fichero(self.ruta_compactando) if congelado else []
+        return previos + self._leer_fichero(self.ruta)
+
+    def marca(self):
+        """Marca del fichero congelado (``congelar(marca)``); None si no hay."""
+        if not self.ruta_compactando.exists():
+            return None
+        with open(self.ruta_compactando, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue
+                if MARCA in registro:
+                    return registro[MARCA]
+        return None
+
+    def version(self):
+        estado = []
+        for ruta in (self.ruta_compactando, self.ruta):
+            try:
+                st = ruta.stat()
+                estado.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                estado.append(None)
+        return tuple(estado)
+
+    def __len__(self):
+        total = 0
+        for ruta in (self.ruta_compactando, self.ruta):
+            if ruta.exists():
+                with open(ruta, "rb") as f:
+                    total += sum(1 for _ in f)
+        return total
+
+    # -------------------------
+    # COMPACTACIÓN
+    # -------------------------
+    def congelar(self, marca=None):
+        """Aparta el journal actual; las escrituras nuevas van a uno vacío.
+
+        Si ya había un congelado (compactación interrumpida) se devuelve ese
+        y el vivo se queda donde está. ``marca`` solo se anota al congelar.
+        """
+        with cerrojo(self.ruta_cerrojo):
+            if self.ruta.exists() and not self.ruta_compactando.exists():
+                os.replace(self.ruta, self.ruta_compactando)
+                if marca is not None:
+                    with open(self.ruta_compactando, "a", encoding="utf-8") as f:
+                        f.write(json.dumps({MARCA: marca}, default=str) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+        return self._leer_fichero(self.ruta_compactando)
+
+    def descartar_congelado(self):
+        self.ruta_compactando.unlink(missing_ok=True)
+
+    def vaciar(self):
+        """Descarta el congelado y el vivo (sus registros ya están en la tabla)."""
+        with cerrojo(self.ruta_cerrojo):
+            self.ruta_compactando.unlink(missing_ok=True)
+            self.ruta.unlink(missing_ok=True)
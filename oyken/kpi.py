@@ -0,0 +1,57 @@
+"""KPIs operativos de ventas (funciones puras, sin Streamlit ni pandas).
+
+Las variantes sobre series completas están en ``oyken.kpi_series`` (numpy),
+para que importar este módulo siga siendo inmediato.
+"""
+
+
+def ratio(numerador, denominador):
+    # Cociente protegido: sin denominador el KPI vale 0
+    return numerador / denominador if denominador > 0 else 0
+
+
+def ticket_medio(ventas, tickets):
+    return ratio(ventas, tickets)
+
+
+def peso_pct(parte, total):
+    return ratio(parte, total) * 100
+
+
+def diff_pct(actual, base):
+    """Diferencia absoluta y porcentual frente a la base.
+
+    Sin base (≤ 0) la variación es 100 % si hay valor actual y 0 % si no.
+    """
+    d = actual - base
+    p = (d / base * 100) if base > 0 else (100.0 if actual > 0 else 0.0)
+    return d, p
+
+
+def proyeccion_cierre(turnos, cuotas):
+    """Cierre estimado de un día con turnos aún sin registrar.
+
+    ``turnos``: € de cada turno en orden (0 si está pendiente); ``cuotas``:
+    peso histórico de cada turno en el día. Los turnos hasta el último con
+    ventas se dan por cerrados y el total es su suma entre su peso; los
+    siguientes valen total × su cuota. Devuelve (€ por turno, total,
+    estimado por turno), o None si no hay nada que proyectar (sin ventas,
+    día completo o sin perfil). Un turno a 0 antes del último registrado
+    cuenta como cerrado sin ventas, no como estimado.
+    """
+    registrados = [i for i, v in enumerate(turnos) if v > 0]
+    if not registrados or not cuotas or registrados[-1] == len(turnos) - 1:
+        return None
+
+    ultimo = registrados[-1]
+    peso = sum(cuotas[:ultimo + 1])
+    if peso <= 0:
+        return None
+
+    total = sum(turnos[:ultimo + 1]) / peso
+    proyectados = [
+        v if i <= ultimo else total * c
+        for i, (v, c) in enumerate(zip(turnos, cuotas))
+    ]
+    estimados = [i > ultimo for i in range(len(turnos))]
+    return proyectados, sum(proyectados), estimados
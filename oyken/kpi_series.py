@@ -0,0 +1,29 @@
+"""Variantes vectorizadas de ``oyken.kpi`` sobre arrays o Series completos.
+
+Misma regla que la función escalar correspondiente, aplicada a un día por
+elemento en una sola pasada de numpy.
+"""
+import numpy as np
+
+
+def ratio_serie(numerador, denominador):
+    numerador = np.asarray(numerador, dtype="float64")
+    denominador = np.asarray(denominador, dtype="float64")
+    return np.divide(
+        numerador, denominador,
+        out=np.zeros_like(numerador), where=denominador > 0
+    )
+
+
+def ticket_medio_serie(ventas, tickets):
+    return ratio_serie(ventas, tickets)
+
+
+def diff_pct_serie(actual, base):
+    """``diff_pct`` elemento a elemento: (diferencias, porcentajes)."""
+    actual = np.asarray(actual, dtype="float64")
+    base = np.asarray(base, dtype="float64")
+    d = actual - base
+    p = np.where(actual > 0, 100.0, 0.0)
+    np.divide(d * 100, base, out=p, where=base > 0)
+    return d, p
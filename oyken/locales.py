@@ -0,0 +1,156 @@
+"""Locales del grupo: un almacén completo por restaurante.
+
+Con varios locales, OYKEN_DATA_DIR es la carpeta del grupo y cada local
+tiene la suya (``local_01``, ``local_02``...) con todas sus tablas: ventas,
+gastos, compras, RRHH, inventario y mermas quedan particionados por local y
+abrir uno nunca lee los demás. Sin subcarpetas de local, la carpeta de
+datos es un único negocio, como hasta ahora.
+
+El selector de cada página (``selector``) fija el local activo para el hilo
+de la sesión y ``almacen()`` lo usa por defecto. ``GRUPO`` es la vista
+consolidada: solo lectura, y se calcula leyendo los locales en paralelo
+(``en_paralelo``). Los nombres visibles salen de ``locales.json`` en la
+carpeta del grupo (``{"local_01": "Centro", ...}``), si existe.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+
+PREFIJO = "local_"
+CATALOGO = "locales.json"
+
+# Vista consolidada de todos los locales
+GRUPO = "grupo"
+
+# Clave de st.session_state con el local elegido (se conserva entre páginas)
+CLAVE_SESION = "oyken_local"
+
+# Hilos de lectura de la vista de grupo
+MAX_HILOS = 8
+
+_ACTIVO = ContextVar("oyken_local", default=None)
+
+
+class VistaGrupo(RuntimeError):
+    """Operación que necesita un local concreto pedida en la vista de grupo."""
+
+
+# =========================
+# DIMENSIÓN DE LOCALES
+# =========================
+def raiz_grupo():
+    return Path(os.environ.get("OYKEN_DATA_DIR", "."))
+
+
+def locales(raiz=None):
+    """Identificadores de los locales (``local_01``...); vacío si es un solo negocio."""
+    raiz = Path(raiz) if raiz is not None else raiz_grupo()
+    if not raiz.is_dir():
+        return []
+    return sorted(
+        p.name for p in raiz.iterdir()
+        if p.is_dir() and p.name.startswith(PREFIJO)
+    )
+
+
+def nombres(raiz=None):
+    raiz = Path(raiz) if raiz is not None else raiz_grupo()
+    ruta = raiz / CATALOGO
+    catalogo = {}
+    if ruta.exists():
+        with open(ruta, encoding="utf-8") as f:
+            catalogo = json.load(f)
+
+    etiquetas = {GRUPO: "Grupo (todos los locales)"}
+    for local in locales(raiz):
+        etiquetas[local] = catalogo.get(local, f"Local {local[len(PREFIJO):]}")
+    return etiquetas
+
+
+def raiz_local(local):
+    return raiz_grupo() / local
+
+
+# =========================
+# LOCAL ACTIVO
+# =========================
+def activar(local):
+    _ACTIVO.set(local)
+
+
+def activo():
+    """Local activo del hilo: el elegido, el primero si no hay elección o None."""
+    disponibles = locales()
+    if not disponibles:
+        return None
+    local = _ACTIVO.get()
+    if local == GRUPO or local in disponibles:
+        return local
+    return disponibles[0]
+
+
+def es_grupo():
+    return activo() == GRUPO
+
+
+def raiz_activa():
+    local = activo()
+    if local is None:
+        return raiz_grupo()
+    if local == GRUPO:
+        raise VistaGrupo("La vista de grupo es de solo lectura: elige un local.")
+    return raiz_local(local)
+
+
+# =========================
+# VISTA DE GRUPO
+# =========================
+def en_paralelo(funcion, lista=None):
+    """{local: funcion(almacén del local)}, leyendo los locales a la vez."""
+    from oyken.storage import almacen
+
+    lista = list(lista or locales())
+    if not lista:
+        return {}
+
+    def ejecutar(local):
+        return funcion(almacen(raiz=raiz_local(local)))
+
+    with ThreadPoolExecutor(max_workers=min(len(lista), MAX_HILOS)) as pool:
+        return dict(zip(lista, pool.map(ejecutar, lista)))
+
+
+# =========================
+# SELECTOR (STREAMLIT)
+# =========================
+def selector(grupo=True):
+    """Selector de local en la barra lateral; activa el elegido y lo devuelve.
+
+    Con un solo negocio no muestra nada. ``grupo`` añade la vista
+    consolidada (páginas de solo lectura); si la sesión venía de ella, una
+    página que escribe abre el primer local sin olvidar la elección.
+    """
+    import streamlit as st
+
+    disponibles = locales()
+    if not disponibles:
+        activar(None)
+        return None
+
+    opciones = ([GRUPO] if grupo else []) + disponibles
+    guardado = st.session_state.get(CLAVE_SESION)
+    inicial = guardado if guardado in opciones else disponibles[0]
+
+    elegido = st.sidebar.selectbox(
+        "Local",
+        opciones,
+        index=opciones.index(inicial),
+        format_func=lambda local, etiquetas=nombres(): etiquetas[local]
+    )
+    if elegido != inicial or guardado in opciones:
+        st.session_state[CLAVE_SESION] = elegido
+
+    activar(elegido)
+    return elegido
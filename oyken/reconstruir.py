@@ -0,0 +1,161 @@
+"""Reconstrucción completa de los artefactos derivados, sin Streamlit.
+
+Uso (p. ej. desde cron, en el directorio de datos o con OYKEN_DATA_DIR; en
+la carpeta de un grupo se reconstruye cada local):
+
+    python -m oyken.reconstruir [--procesos N] [--anios 2024 2025 ...]
+
+Cada año se calcula en un proceso del pool: los artefactos de un año solo
+dependen de las fuentes de ese año (los gastos fijos estructurales se pasan
+completos). El proceso principal concatena y escribe cada artefacto una vez.
+
+También rellena los KPIs diarios materializados (``ventas_kpi_diario``) de
+las ventas ya guardadas, p. ej. tras actualizar desde una versión sin ellos.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from oyken.derivados import (
+    CON_ANUAL, CONSOLIDACION, GRAFO, _Datos, _calcular, _con_anual, _orden, _pasada,
+    particiones_anio, variacion_inventario,
+)
+from oyken.esquemas import ESQUEMAS
+from oyken.locales import locales, raiz_local
+from oyken.storage import almacen
+from oyken.ventas import TABLA_KPI, materializar_kpi
+
+
+# =========================
+# CÁLCULO POR AÑO (PROCESO HIJO)
+# =========================
+def _vacio(nombre):
+    return pd.DataFrame(columns=list(ESQUEMAS[nombre]))
+
+
+def _reconstruir_anio(anio, fuentes, anios_nodo):
+    datos = _Datos(None, fuentes)
+    resultado = {}
+
+    for nombre in _orden():
+        if anio not in anios_nodo[nombre]:
+            df = _vacio(nombre)
+        else:
+            particiones = set(particiones_anio(anio))
+            if nombre in CON_ANUAL:
+                particiones = _con_anual(particiones)
+            df = _calcular(nombre, datos, particiones)
+
+        datos.artefactos[nombre] = df
+        resultado[nombre] = df
+
+    return anio, resultado
+
+
+# =========================
+# ORQUESTACIÓN
+# =========================
+def _anios_nodo(datos):
+    # Años con datos en las fuentes (transitivas) de cada artefacto
+    anios = {}
+    for nombre in _orden():
+        anios[nombre] = set()
+        for entrada in GRAFO[nombre]:
+            anios[nombre] |= anios[entrada] if entrada in GRAFO else datos.anios(entrada)
+    return anios
+
+
+def _fuentes_anio(datos, anio):
+    return {
+        "ventas": datos.ventas[datos.ventas["anio"] == anio],
+        "compras": datos.compras[datos.compras["anio"] == anio],
+        "gastos": datos.gastos,
+        "rrhh_puestos": datos.rrhh_puestos[datos.rrhh_puestos["Año"] == anio],
+    }
+
+
+def reconstruir(a=None, procesos=None, anios=None):
+    """Recalcula todos los artefactos; devuelve {nombre: filas escritas}.
+
+    Con el cerrojo de consolidación tomado de principio a fin: la
+    consolidación en segundo plano de la app espera a que termine.
+    """
+    a = a or almacen()
+    # Sin --anios las marcas previas quedan cubiertas: se retiran antes de
+    # leer las fuentes y las que lleguen entretanto persisten
+    nodos = list(GRAFO) if anios is None else []
+    with a.bloqueo(CONSOLIDACION), _pasada(a, nodos):
+        return _reconstruir(a, procesos, anios)
+
+
+def _reconstruir(a, procesos, anios):
+    datos = _Datos(a)
+    anios_nodo = _anios_nodo(datos)
+    todos = sorted(set().union(*anios_nodo.values()))
+    if anios is not None:
+        todos = [anio for anio in todos if anio in set(anios)]
+
+    trabajos = [(anio, _fuentes_anio(datos, anio), anios_nodo) for anio in todos]
+    procesos = min(procesos or os.cpu_count() or 1, max(len(trabajos), 1))
+
+    if procesos == 1:
+        resultados = [_reconstruir_anio(*t) for t in trabajos]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(_reconstruir_anio, *zip(*trabajos)))
+
+    ahora = datetime.now()
+    escritos = {}
+
+    for nombre in _orden():
+        nuevas = pd.concat(
+            [r[nombre] for _, r in resultados] or [_vacio(nombre)],
+            ignore_index=True
+        )
+        if "fecha_actualizacion" in ESQUEMAS[nombre]:
+            nuevas["fecha_actualizacion"] = ahora
+
+        # Con --anios se conservan los años no reconstruidos
+        if anios is not None:
+            previas = a.leer(nombre)
+            nuevas = pd.concat(
+                [previas[~previas["anio"].isin(todos)], nuevas],
+                ignore_index=True
+            )
+
+        a.escribir(nombre, nuevas.sort_values(["anio", "mes"]))
+        escritos[nombre] = len(nuevas)
+
+    if a.existe("inventario_mensual"):
+        # Tabla de origen: leer-modificar-escribir bajo su cerrojo
+        df_inv = a.actualizar("inventario_mensual", variacion_inventario)
+        escritos["inventario_mensual"] = len(df_inv)
+
+    escritos[TABLA_KPI] = materializar_kpi(a, anios)
+    return escritos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m oyken.reconstruir",
+        description="Reconstruye los consolidados mensuales desde las fuentes."
+    )
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--anios", type=int, nargs="+", default=None,
+                        help="limitar la reconstrucción a estos años")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    for local in locales() or [None]:
+        a = almacen(raiz=raiz_local(local)) if local else None
+        escritos = reconstruir(a, procesos=args.procesos, anios=args.anios)
+        for nombre, filas in escritos.items():
+            print(f"reconstruido: {local + '/' if local else ''}{nombre} ({filas} filas)")
+    print(f"tiempo: {time.perf_counter() - inicio:.2f} s")
+    sys.exit(0)
@@ -0,0 +1,233 @@
+"""Trazas de tiempo por bloque de página (desactivadas por defecto).
+
+Con OYKEN_TRAZAS=1 cada página marca sus bloques (las secciones que separan
+los banners ``# ====``, con un nombre corto y estable) y cada bloque cerrado
+deja un registro en un búfer circular del proceso, compartido por todas las
+sesiones::
+
+    traza = rendimiento.pagina(__file__)
+    traza.bloque("HOY")          # cierra el bloque anterior y abre este
+    traza.filas(len(df_hoy))     # filas procesadas en el bloque
+    ...
+    traza.fin()
+
+Un bloque se cierra al abrir el siguiente o con ``fin()``; las páginas que
+se detienen antes usan ``traza.parar()`` en lugar de ``st.stop()``, que
+cierra el bloque abierto y luego detiene la ejecución. Los bytes de E/S
+salen de /proc/thread-self/io (``rchar`` / ``wchar``, incluidas lecturas
+servidas por la caché del sistema): son del hilo que ejecuta la página, así
+que otras sesiones no los alteran, pero tampoco cuentan las lecturas hechas
+en otros hilos (locales leídos en paralelo, consolidación en segundo plano).
+Sin ese fichero (otros sistemas) quedan vacíos.
+
+``memoria_sesiones()`` y ``memoria_compartida()`` separan lo que guarda cada
+sesión en ``st.session_state`` de lo que comparte el proceso (caché de
+``oyken.cache``: particiones de ventas y tablas de ``oyken.compartido``).
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import pandas as pd
+
+from oyken import cache
+
+# Registros que se conservan (los más antiguos se descartan)
+CAPACIDAD = 5000
+
+_BUFFER = deque(maxlen=CAPACIDAD)
+_LOCK = threading.Lock()
+
+
+def activas():
+    return os.environ.get("OYKEN_TRAZAS", "").lower() in ("1", "true", "si", "sí")
+
+
+def _io():
+    try:
+        # Contadores del hilo actual (los de /proc/self/io son del proceso)
+        with open("/proc/thread-self/io") as f:
+            campos = dict(linea.split(": ") for linea in f.read().splitlines())
+        return int(campos["rchar"]), int(campos["wchar"])
+    except OSError:
+        return None, None
+
+
+# =========================
+# TRAZA DE UNA EJECUCIÓN
+# =========================
+class Traza:
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self._abierto = None
+
+    def bloque(self, nombre):
+        self._cerrar()
+        leidos, escritos = _io()
+        self._abierto = {
+            "bloque": nombre,
+            "inicio": time.perf_counter(),
+            "filas": 0,
+            "leidos": leidos,
+            "escritos": escritos,
+        }
+
+    def filas(self, n):
+        if self._abierto is not None:
+            self._abierto["filas"] += int(n)
+
+    def fin(self):
+        self._cerrar()
+
+    def parar(self):
+        """``st.stop()`` sin perder el bloque abierto."""
+        self._cerrar()
+        _detener()
+
+    def _cerrar(self):
+        abierto, self._abierto = self._abierto, None
+        if abierto is None:
+            return
+
+        ms = (time.perf_counter() - abierto["inicio"]) * 1000
+        leidos, escritos = _io()
+        registro = {
+            "instante": time.time(),
+            "pagina": self.nombre,
+            "bloque": abierto["bloque"],
+            "ms": ms,
+            "filas": abierto["filas"],
+            "bytes_leidos": None if leidos is None else leidos - abierto["leidos"],
+            "bytes_escritos": None if escritos is None else escritos - abierto["escritos"],
+        }
+        with _LOCK:
+            _BUFFER.append(registro)
+
+
+class _TrazaInactiva:
+
+    def bloque(self, nombre):
+        pass
+
+    def filas(self, n):
+        pass
+
+    def fin(self):
+        pass
+
+    def parar(self):
+        _detener()
+
+
+def _detener():
+    import streamlit as st
+    st.stop()
+
+
+def pagina(fichero):
+    """Traza de una ejecución de página (``__file__`` de la página)."""
+    if not activas():
+        return _TrazaInactiva()
+    return Traza(Path(fichero).stem)
+
+
+# =========================
+# CONSULTA
+# =========================
+def registros():
+    with _LOCK:
+        return pd.DataFrame(list(_BUFFER))
+
+
+def vaciar():
+    with _LOCK:
+        _BUFFER.clear()
+
+
+def resumen(df=None):
+    """p50 / p95 de tiempo por página y bloque, con filas y E/S medias."""
+    df = registros() if df is None else df
+    if df.empty:
+        return pd.DataFrame(columns=[
+            "pagina", "bloque", "ejecuciones", "p50_ms", "p95_ms", "max_ms",
+            "filas_media", "leidos_medios", "escritos_medios",
+        ])
+
+    agrupado = df.groupby(["pagina", "bloque"], sort=False)
+    tabla = agrupado["ms"].agg(
+        ejecuciones="size",
+        p50_ms=lambda s: s.quantile(0.50),
+        p95_ms=lambda s: s.quantile(0.95),
+        max_ms="max",
+    )
+    tabla["filas_media"] = agrupado["filas"].mean()
+    tabla["leidos_medios"] = agrupado["bytes_leidos"].mean()
+    tabla["escritos_medios"] = agrupado["bytes_escritos"].mean()
+    return tabla.reset_index().sort_values(["pagina", "p95_ms"], ascending=[True, False])
+
+
+# =========================
+# MEMORIA
+# =========================
+def _bytes(valor):
+    # DataFrame / Series con cadenas incluidas; contenedores, recursivo
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_bytes(k) + _bytes(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set)):
+        return sys.getsizeof(valor) + sum(_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+def memoria_sesiones():
+    """Bytes que guarda cada sesión abierta en ``st.session_state``."""
+    columnas = ["sesion", "claves", "bytes"]
+    try:
+        from streamlit.runtime import Runtime
+    except ImportError:
+        return pd.DataFrame(columns=columnas)
+    if not Runtime.exists():
+        return pd.DataFrame(columns=columnas)
+
+    # API privada de Streamlit: si cambia, la tabla queda vacía
+    gestor = getattr(Runtime.instance(), "_session_mgr", None)
+    listar = getattr(gestor, "list_sessions", None)
+    if listar is None:
+        return pd.DataFrame(columns=columnas)
+    try:
+        sesiones = listar()
+    except (AttributeError, RuntimeError):
+        return pd.DataFrame(columns=columnas)
+
+    filas = []
+    for info in sesiones:
+        try:
+            sesion = info.session.id[:8]
+            estado = dict(info.session.session_state.filtered_state)
+        except (AttributeError, KeyError, RuntimeError):
+            continue
+        filas.append({
+            "sesion": sesion,
+            "claves": len(estado),
+            "bytes": sum(_bytes(v) for v in estado.values()),
+        })
+    return pd.DataFrame(filas, columns=columnas)
+
+
+def memoria_compartida():
+    """Bytes de las entradas de la caché de proceso, por origen y tabla."""
+    filas = [
+        {
+            "origen": clave[0],
+            "almacen": clave[2],
+            "entrada": " · ".join(str(c) for c in clave[3:] if c is not None),
+            "bytes": _bytes(valor),
+        }
+        for clave, valor in cache.entradas()
+    ]
+    return pd.DataFrame(filas, columns=["origen", "almacen", "entrada", "bytes"])
@@ -0,0 +1,67 @@
+"""Cálculo de coste de personal a partir de la estructura de puestos."""
+from oyken.esquemas import MESES
+
+SS_EMPRESA = 0.33
+
+ROLES_FIJOS = ["Estructural mínimo"]
+ROLES_VARIABLES = ["Estructural ampliable", "Refuerzo operativo"]
+
+
+def coste_puesto(bruto_anual, personas, ss=SS_EMPRESA):
+    # Escalares o arrays; personas = suma de los meses del período
+    return bruto_anual / 12 * personas * (1 + ss)
+
+
+def coste_puestos(df_puestos, anio, mes, roles=None, ss=SS_EMPRESA):
+    # mes = 0 → año completo (suma de personas de los 12 meses)
+    df = df_puestos[df_puestos["Año"] == int(anio)]
+    if roles is not None:
+        df = df[df["Rol_RRHH"].isin(roles)]
+
+    if df.empty:
+        return 0.0
+
+    if mes == 0:
+        personas = df[MESES].to_numpy(dtype=float).sum(axis=1)
+    else:
+        personas = df[MESES[mes - 1]].to_numpy(dtype=float)
+
+    bruto = df["Bruto anual (€)"].to_numpy(dtype=float)
+    return float(coste_puesto(bruto, personas, ss).sum())
+
+
+def coste_mensual(df_puestos, ss=SS_EMPRESA):
+    """Nómina, SS y coste empresa por (anio, mes) para todos los años."""
+    import pandas as pd
+
+    columnas = ["anio", "mes", "nomina_eur", "ss_eur", "rrhh_total_eur"]
+    if df_puestos.empty:
+        return pd.DataFrame(columns=columnas)
+
+    salario = df_puestos["Bruto anual (€)"].to_numpy(dtype=float)[:, None] / 12
+    nomina = salario * df_puestos[MESES].to_numpy(dtype=float)
+
+    por_anio = (
+        pd.DataFrame(nomina, columns=range(1, 13))
+        .assign(anio=df_puestos["Año"].to_numpy())
+        .groupby("anio")
+        .sum()
+    )
+
+    df = por_anio.stack().rename("nomina_eur").reset_index()
+    df.columns = ["anio", "mes", "nomina_eur"]
+    df["ss_eur"] = df["nomina_eur"] * ss
+    df["rrhh_total_eur"] = df["nomina_eur"] + df["ss_eur"]
+    return df[columnas]
+
+
+def nomina_anio(df_puestos, anio, ss=SS_EMPRESA):
+    """Los 12 meses de ``anio`` (mes, nomina_eur, ss_eur, rrhh_total_eur)."""
+    df = coste_mensual(df_puestos[df_puestos["Año"] == int(anio)], ss)
+    return (
+        df.drop(columns="anio")
+        .set_index("mes")
+        .reindex(range(1, 13), fill_value=0.0)
+        .rename_axis("mes")
+        .reset_index()
+    )
@@ -0,0 +1,344 @@
+"""Generador de datos sintéticos para todos los almacenes OYKEN.
+
+Uso (p. ej. para pruebas de rendimiento):
+
+    python -m oyken.sintetico DESTINO [--anios 5] [--locales 1]
+        [--registros-dia 3] [--backend csv] [--semilla 1]
+
+Produce ventas (turnos, comensales, tickets, observaciones), gastos
+(según ``MATRIZ_CATEGORIAS_OYKEN``), compras + proveedores, rrhh_puestos,
+inventario_mensual y mermas, con estacionalidad por día de la semana y por
+mes. Todo se escribe a través de ``oyken.storage``, igual que la app, y al
+final se reconstruyen los consolidados.
+
+Los años generados terminan hoy. Con varios locales cada uno es un almacén
+propio en ``DESTINO/local_NN``. ``--registros-dia`` es el nº medio de
+compras por día operado (las mermas escalan con él); las ventas son
+siempre un registro por día.
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from oyken.catalogos import (
+    CATEGORIAS, FAMILIAS_COMPRAS, FAMILIAS_MERMAS, MATRIZ_CATEGORIAS_OYKEN,
+    MOTIVOS,
+)
+from oyken.derivados import variacion_inventario
+from oyken.esquemas import MESES
+from oyken.storage import almacen
+
+# =========================
+# PARÁMETROS DEL MODELO
+# =========================
+# Lunes → Domingo
+FACTOR_DOW = np.array([0.75, 0.80, 0.85, 0.95, 1.25, 1.45, 1.10])
+
+# Enero → Diciembre
+FACTOR_MES = np.array([0.80, 0.85, 0.95, 1.00, 1.05, 1.10, 1.20, 1.25, 1.00, 0.95, 0.90, 1.15])
+
+CRECIMIENTO_ANUAL = 0.03
+PROB_CIERRE = 0.02
+
+# Mañana / tarde / noche
+REPARTO_TURNOS = np.array([0.30, 0.25, 0.45])
+GASTO_COMENSAL = 18.0
+
+COSTE_PRODUCTO = 0.30
+PESO_FAMILIAS_COMPRAS = [0.60, 0.25, 0.05, 0.10]
+
+OBSERVACIONES = [
+    "Lluvia", "Partido en la tele", "Terraza llena",
+    "Falta de personal en cocina", "Evento en la zona",
+    "Avería en cámara, se retira producto", "Grupo grande sin reserva",
+]
+
+PROVEEDORES = {
+    "Materia prima": ["Makro", "Pescados del Norte", "Cárnicas Levante", "Frutas Huerta"],
+    "Bebidas": ["Distribuciones Mahou", "Vinos Ribera"],
+    "Limpieza": ["Higiene Pro"],
+    "Otros": ["Suministros Hostelería"],
+}
+
+# Importe mensual de referencia (€); los gastos "Variable" escalan con las ventas
+GASTOS_MENSUALES = {
+    "Alquiler": 3200.0,
+    "Comunidad": 120.0,
+    "SGAE / Música": 60.0,
+    "Seguros obligatorios": 180.0,
+    "Asesoría fiscal": 150.0,
+    "Asesoría laboral": 120.0,
+    "PRL": 45.0,
+    "Electricidad": 950.0,
+    "Agua": 140.0,
+    "Gas": 380.0,
+    "Internet": 55.0,
+    "Telefonía": 40.0,
+    "Control de plagas": 50.0,
+    "Comisiones datáfonos": 420.0,
+    "Plataformas delivery": 600.0,
+    "Lavandería": 160.0,
+}
+
+# Resto de categorías: aparición esporádica
+PROB_GASTO_ESPORADICO = 0.08
+
+# Puesto, rol, bruto anual, personas base, refuerzo en temporada alta
+PUESTOS = [
+    ("Jefe de cocina", "Estructural mínimo", 30000.0, 1, 0),
+    ("Cocinero", "Estructural mínimo", 22000.0, 2, 0),
+    ("Ayudante de cocina", "Estructural ampliable", 18500.0, 1, 1),
+    ("Encargado de sala", "Estructural mínimo", 24000.0, 1, 0),
+    ("Camarero", "Estructural ampliable", 19500.0, 3, 1),
+    ("Extra fin de semana", "Refuerzo operativo", 16000.0, 1, 2),
+]
+MESES_TEMPORADA = {6, 7, 8, 12}
+SUBIDA_SALARIAL = 0.025
+
+PRODUCTOS_MERMA = {
+    "Matería Prima": (["Pan", "Tomate", "Lechuga", "Pollo", "Pescado"], "kg"),
+    "Bebidas": (["Cerveza barril", "Refresco", "Vino"], "l"),
+    "Limpieza": (["Desengrasante", "Bayetas"], "uds"),
+    "Otros": (["Vajilla", "Cristalería"], "uds"),
+}
+
+
+# =========================
+# FUENTES
+# =========================
+def _ventas(rng, fechas, base):
+    n = len(fechas)
+    anios = (fechas.year - fechas.year.min()).to_numpy()
+    factor = (
+        FACTOR_DOW[fechas.weekday.to_numpy()]
+        * FACTOR_MES[fechas.month.to_numpy() - 1]
+        * (1 + CRECIMIENTO_ANUAL) ** anios
+    )
+    total = base * factor * rng.lognormal(0.0, 0.12, n)
+
+    turnos = np.round(total[:, None] * rng.dirichlet(REPARTO_TURNOS * 40, n), 2)
+    comensales = np.rint(turnos / rng.normal(GASTO_COMENSAL, 2.0, (n, 3)).clip(8, None))
+    tickets = np.maximum(np.rint(comensales / rng.uniform(1.6, 2.8, (n, 3))), comensales > 0)
+    observaciones = np.where(rng.random(n) < 0.08, rng.choice(OBSERVACIONES, n), "")
+
+    df = pd.DataFrame({
+        "fecha": fechas,
+        "ventas_manana_eur": turnos[:, 0],
+        "ventas_tarde_eur": turnos[:, 1],
+        "ventas_noche_eur": turnos[:, 2],
+        "ventas_total_eur": turnos.sum(axis=1).round(2),
+        "comensales_manana": comensales[:, 0].astype("int64"),
+        "comensales_tarde": comensales[:, 1].astype("int64"),
+        "comensales_noche": comensales[:, 2].astype("int64"),
+        "tickets_manana": tickets[:, 0].astype("int64"),
+        "tickets_tarde": tickets[:, 1].astype("int64"),
+        "tickets_noche": tickets[:, 2].astype("int64"),
+        "observaciones": observaciones,
+    })
+    # Días cerrados: sin registro
+    return df[rng.random(n) >= PROB_CIERRE].reset_index(drop=True)
+
+
+def _gastos(rng, ventas, base):
+    ventas_mes = ventas.groupby(ventas["fecha"].dt.to_period("M"))["ventas_total_eur"].sum()
+    referencia = base * 30
+
+    filas = []
+    for periodo, total in ventas_mes.items():
+        anio, mes = periodo.year, periodo.month
+        dias = periodo.days_in_month
+        actividad = total / referencia
+
+        for categoria in CATEGORIAS:
+            tipo, rol, _ = MATRIZ_CATEGORIAS_OYKEN[categoria]
+            if categoria in GASTOS_MENSUALES:
+                importe = GASTOS_MENSUALES[categoria]
+                if tipo == "Variable":
+                    importe *= actividad * rng.lognormal(0.0, 0.10)
+                dia = rng.integers(1, 6) if tipo == "Fijo" else rng.integers(1, dias + 1)
+            elif rng.random() < PROB_GASTO_ESPORADICO:
+                importe = rng.uniform(40, 900)
+                dia = rng.integers(1, dias + 1)
+            else:
+                continue
+
+            filas.append({
+                "Fecha": f"{dia:02d}/{mes:02d}/{anio}",
+                "Mes": f"{anio}-{mes:02d}",
+                "Concepto": f"{categoria} {MESES[mes - 1].lower()} {anio}",
+                "Categoria": categoria,
+                "Tipo_Gasto": tipo,
+                "Rol_Gasto": rol,
+                "Coste (€)": round(float(importe), 2),
+            })
+    return pd.DataFrame(filas)
+
+
+def _compras(rng, ventas, registros_dia):
+    n = rng.poisson(registros_dia, len(ventas)).clip(1, None)
+    idx = np.repeat(np.arange(len(ventas)), n)
+
+    familias = rng.choice(FAMILIAS_COMPRAS, len(idx), p=PESO_FAMILIAS_COMPRAS)
+    proveedores = [rng.choice(PROVEEDORES[f]) for f in familias]
+    coste = (
+        ventas["ventas_total_eur"].to_numpy()[idx] * COSTE_PRODUCTO / n[idx]
+        * rng.lognormal(0.0, 0.25, len(idx))
+    )
+
+    return pd.DataFrame({
+        "Fecha": ventas["fecha"].dt.strftime("%d/%m/%Y").to_numpy()[idx],
+        "Proveedor": proveedores,
+        "Familia": familias,
+        "Coste (€)": coste.round(2),
+    })
+
+
+def _rrhh_puestos(anios):
+    filas = []
+    for i, anio in enumerate(anios):
+        subida = (1 + SUBIDA_SALARIAL) ** i
+        for puesto, rol, bruto, personas, refuerzo in PUESTOS:
+            filas.append({
+                "Año": anio,
+                "Puesto": puesto,
+                "Rol_RRHH": rol,
+                "Bruto anual (€)": round(bruto * subida, 2),
+                **{
+                    nombre: personas + (refuerzo if mes in MESES_TEMPORADA else 0)
+                    for mes, nombre in enumerate(MESES, start=1)
+                },
+            })
+    return pd.DataFrame(filas)
+
+
+def _inventario(rng, compras):
+    fechas = pd.to_datetime(compras["Fecha"], format="%d/%m/%Y")
+    compras_mes = compras.groupby(fechas.dt.to_period("M"))["Coste (€)"].sum()
+
+    # Solo meses cerrados
+    compras_mes = compras_mes[compras_mes.index < pd.Period(date.today(), "M")]
+    df = pd.DataFrame({
+        "anio": compras_mes.index.year,
+        "mes": compras_mes.index.month,
+        "inventario_cierre_eur": (
+            compras_mes.to_numpy() * 0.35 * rng.lognormal(0.0, 0.10, len(compras_mes))
+        ).round(2),
+        "variacion_inventario_eur": 0.0,
+        "fecha_actualizacion": date.today().isoformat(),
+    })
+    return variacion_inventario(df)
+
+
+def _mermas(rng, ventas, registros_dia):
+    n = rng.poisson(registros_dia * 0.3, len(ventas))
+    idx = np.repeat(np.arange(len(ventas)), n)
+    fechas = ventas["fecha"].to_numpy()[idx]
+
+    familias = rng.choice(FAMILIAS_MERMAS, len(idx))
+    productos, unidades = [], []
+    for familia in familias:
+        opciones, unidad = PRODUCTOS_MERMA[familia]
+        productos.append(rng.choice(opciones))
+        unidades.append(unidad)
+
+    fechas = pd.DatetimeIndex(fechas)
+    return pd.DataFrame({
+        "Fecha": fechas.strftime("%d/%m/%Y"),
+        "Mes": fechas.strftime("%Y-%m"),
+        "Familia": familias,
+        "Producto": productos,
+        "Unidad": unidades,
+        "Cantidad": rng.uniform(0.2, 5.0, len(idx)).round(2),
+        "Motivo": rng.choice(MOTIVOS, len(idx)),
+    })
+
+
+# =========================
+# GENERACIÓN
+# =========================
+def generar(a, anios=5, registros_dia=3, semilla=1, hasta=None):
+    """Escribe un almacén completo en ``a``; devuelve {tabla: filas}."""
+    rng = np.random.default_rng(semilla)
+    hasta = pd.Timestamp(hasta or date.today())
+    fechas = pd.date_range(pd.Timestamp(hasta.year - anios + 1, 1, 1), hasta, freq="D")
+
+    # Tamaño del local: venta diaria media de referencia
+    base = rng.uniform(2500, 4500)
+
+    ventas = _ventas(rng, fechas, base)
+    compras = _compras(rng, ventas, registros_dia)
+    tablas = {
+        "gastos": _gastos(rng, ventas, base),
+        "compras": compras,
+        "proveedores": pd.DataFrame({"Proveedor": sorted(sum(PROVEEDORES.values(), []))}),
+        "rrhh_puestos": _rrhh_puestos(sorted(set(fechas.year))),
+        "inventario_mensual": _inventario(rng, compras),
+        "mermas": _mermas(rng, ventas, registros_dia),
+    }
+
+    for anio, parte in ventas.groupby(ventas["fecha"].dt.year):
+        a.escribir_particion("ventas", anio, parte)
+    for nombre, df in tablas.items():
+        a.escribir(nombre, df)
+
+    return {"ventas": len(ventas), **{n: len(df) for n, df in tablas.items()}}
+
+
+def raices_locales(destino, locales):
+    destino = Path(destino)
+    if locales == 1:
+        return [destino]
+    return [destino / f"local_{i:02d}" for i in range(1, locales + 1)]
+
+
+def generar_locales(destino, anios=5, locales=1, registros_dia=3,
+                    backend="csv", semilla=1, consolidar=True):
+    """Un almacén por local bajo ``destino``; devuelve [(raiz, {tabla: filas})]."""
+    from oyken.reconstruir import reconstruir
+
+    generados = []
+    for i, raiz in enumerate(raices_locales(destino, locales)):
+        raiz.mkdir(parents=True, exist_ok=True)
+        a = almacen(backend, raiz)
+
+        filas = generar(a, anios, registros_dia, semilla + i)
+        if consolidar:
+            reconstruir(a, procesos=1)
+        generados.append((raiz, filas))
+    return generados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m oyken.sintetico",
+        description="Genera almacenes OYKEN sintéticos para pruebas de rendimiento."
+    )
+    parser.add_argument("destino", type=Path)
+    parser.add_argument("--anios", type=int, default=5)
+    parser.add_argument("--locales", type=int, default=1)
+    parser.add_argument("--registros-dia", type=float, default=3,
+                        help="compras medias por día operado")
+    parser.add_argument("--backend", default="csv", choices=["csv", "parquet", "sqlite"])
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--sin-consolidar", action="store_true",
+                        help="no reconstruir los consolidados al terminar")
+    args = parser.parse_args()
+
+    for raiz in raices_locales(args.destino, args.locales):
+        if raiz.exists() and any(raiz.iterdir()):
+            sys.exit(f"{raiz} no está vacío; elige otro destino.")
+
+    inicio = time.perf_counter()
+    generados = generar_locales(
+        args.destino, args.anios, args.locales, args.registros_dia,
+        args.backend, args.semilla, consolidar=not args.sin_consolidar
+    )
+    for raiz, filas in generados:
+        resumen = ", ".join(f"{nombre} {n}" for nombre, n in filas.items())
+        print(f"{raiz}: {resumen}")
+    print(f"tiempo: {time.perf_counter() - inicio:.2f} s")
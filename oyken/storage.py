@@ -0,0 +1,400 @@
+"""Almacén de datos OYKEN con backend intercambiable (CSV / Parquet / SQLite).
+
+El backend se elige con la variable OYKEN_STORAGE (``csv`` por defecto) y la
+carpeta de datos con OYKEN_DATA_DIR (directorio de trabajo por defecto); con
+varios locales, cada uno tiene su carpeta dentro (``oyken.locales``).
+Todas las lecturas devuelven DataFrames tipados según ``oyken.esquemas``.
+``leer(nombre, columnas)`` proyecta en el propio backend: las columnas no
+pedidas no llegan a parsearse.
+
+Las tablas grandes pueden guardarse particionadas por año: la partición
+``ventas__2025`` comparte el esquema de ``ventas``.
+
+Escrituras concurrentes: cada escritura toma el cerrojo de su tabla
+(``oyken.bloqueo``), escribe en un temporal propio y lo renombra sobre el
+original, así que un corte a mitad nunca deja una tabla truncada. Para
+leer-modificar-escribir sin perder filas de otro usuario se usa
+``actualizar``; ``escribir(..., version=...)`` rechaza con
+``ConflictoVersion`` la escritura si la tabla cambió desde que se leyó.
+
+Migración de un backend a otro:
+
+    python -m oyken.storage parquet
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from oyken.bloqueo import cerrojo, ruta_cerrojo
+from oyken.esquemas import DEFECTOS, ESQUEMAS
+from oyken.locales import locales, raiz_activa, raiz_local
+
+_NEUTROS = {"fecha": pd.NaT, "float": 0.0, "int": 0, "str": ""}
+
+SEPARADOR_PARTICION = "__"
+
+# Tablas con backend fijo, independiente de OYKEN_STORAGE (el registro de
+# tickets es siempre parquet): la migración entre backends no las toca
+BACKEND_FIJO = {"tickets"}
+
+
+class ConflictoVersion(RuntimeError):
+    """La tabla cambió entre la lectura y la escritura (otro usuario guardó)."""
+
+
+def nombre_base(nombre):
+    # "ventas__2025" → "ventas"
+    return nombre.split(SEPARADOR_PARTICION)[0]
+
+
+# =========================
+# TIPADO
+# =========================
+def tipar(nombre, df, columnas=None):
+    nombre = nombre_base(nombre)
+    esquema = ESQUEMAS.get(nombre)
+    if esquema is None:
+        return df
+
+    defectos = DEFECTOS.get(nombre, {})
+
+    for col, tipo in esquema.items():
+        if columnas is not None and col not in columnas:
+            continue
+        defecto = defectos.get(col, _NEUTROS[tipo])
+
+        if col not in df.columns:
+            df[col] = defecto
+
+        if tipo == "fecha":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif tipo == "float":
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(defecto).astype("float64")
+        elif tipo == "int":
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(defecto).astype("int64")
+        else:
+            df[col] = df[col].fillna(defecto).astype(str)
+
+    return df
+
+
+# =========================
+# BACKEND CSV
+# =========================
+class BackendCSV:
+
+    extension = ".csv"
+
+    def __init__(self, raiz):
+        self.raiz = Path(raiz)
+
+    def ruta(self, nombre):
+        return self.raiz / f"{nombre}{self.extension}"
+
+    def existe(self, nombre):
+        return self.ruta(nombre).exists()
+
+    def version(self, nombre):
+        try:
+            st = self.ruta(nombre).stat()
+        except FileNotFoundError:
+            return None
+        # El rename atómico cambia el inodo aunque mtime y tamaño coincidan
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def listar(self, prefijo):
+        return [
+            p.name[:-len(self.extension)]
+            for p in self.raiz.glob(f"{prefijo}*{self.extension}")
+        ]
+
+    def leer(self, nombre, columnas=None):
+        esquema = ESQUEMAS.get(nombre_base(nombre), {})
+        dtype = {col: str for col, tipo in esquema.items() if tipo == "str"}
+        usecols = None if columnas is None else set(columnas).__contains__
+        return pd.read_csv(self.ruta(nombre), dtype=dtype, usecols=usecols)
+
+    def _escribir_atomico(self, nombre, volcar):
+        # Temporal único en la misma carpeta + fsync + rename
+        ruta = self.ruta(nombre)
+        fd, tmp = tempfile.mkstemp(dir=ruta.parent, prefix=ruta.name + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                volcar(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, ruta)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def escribir(self, nombre, df):
+        self._escribir_atomico(
+            nombre,
+            lambda f: df.to_csv(f, index=False, date_format="%Y-%m-%d", encoding="utf-8")
+        )
+
+    def borrar(self, nombre):
+        self.ruta(nombre).unlink(missing_ok=True)
+
+
+# =========================
+# BACKEND PARQUET
+# =========================
+class BackendParquet(BackendCSV):
+
+    extension = ".parquet"
+
+    def __init__(self, raiz):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("El backend parquet requiere pyarrow instalado.") from e
+        super().__init__(raiz)
+
+    def leer(self, nombre, columnas=None):
+        ruta = self.ruta(nombre)
+        if columnas is None:
+            return pd.read_parquet(ruta)
+
+        import pyarrow.parquet as pq
+        fichero = pq.ParquetFile(ruta)
+        disponibles = set(fichero.schema_arrow.names)
+        return fichero.read(
+            columns=[col for col in columnas if col in disponibles]
+        ).to_pandas()
+
+    def escribir(self, nombre, df):
+        self._escribir_atomico(nombre, lambda f: df.to_parquet(f, index=False))
+
+
+# =========================
+# BACKEND SQLITE
+# =========================
+class BackendSQLite:
+
+    FICHERO = "oyken.sqlite"
+
+    def __init__(self, raiz):
+        self.raiz = Path(raiz)
+        self.ruta_db = self.raiz / self.FICHERO
+
+    def _conectar(self):
+        con = sqlite3.connect(self.ruta_db, timeout=30)
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS _oyken_versiones "
+            "(nombre TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        return con
+
+    def existe(self, nombre):
+        if not self.ruta_db.exists():
+            return False
+        with self._conectar() as con:
+            fila = con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (nombre,)
+            ).fetchone()
+        return fila is not None
+
+    def version(self, nombre):
+        if not self.ruta_db.exists():
+            return None
+        with self._conectar() as con:
+            fila = con.execute(
+                "SELECT version FROM _oyken_versiones WHERE nombre = ?",
+                (nombre,)
+            ).fetchone()
+        return fila[0] if fila else None
+
+    def listar(self, prefijo):
+        if not self.ruta_db.exists():
+            return []
+        with self._conectar() as con:
+            filas = con.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+        return [nombre for (nombre,) in filas if nombre.startswith(prefijo)]
+
+    def leer(self, nombre, columnas=None):
+        with self._conectar() as con:
+            seleccion = "*"
+            if columnas is not None:
+                disponibles = {
+                    fila[1] for fila in con.execute(f'PRAGMA table_info("{nombre}")')
+                }
+                pedidas = [f'"{col}"' for col in columnas if col in disponibles]
+                seleccion = ", ".join(pedidas) or "*"
+            return pd.read_sql_query(f'SELECT {seleccion} FROM "{nombre}"', con)
+
+    def escribir(self, nombre, df):
+        # Tabla temporal + rename en una transacción: nunca queda a medias
+        tmp = f"{nombre}__tmp_{os.getpid()}"
+        con = self._conectar()
+        try:
+            df.to_sql(tmp, con, if_exists="replace", index=False)
+            con.commit()
+            con.execute("BEGIN IMMEDIATE")
+            con.execute(f'DROP TABLE IF EXISTS "{nombre}"')
+            con.execute(f'ALTER TABLE "{tmp}" RENAME TO "{nombre}"')
+            con.execute(
+                "INSERT INTO _oyken_versiones (nombre, version) VALUES (?, 1) "
+                "ON CONFLICT(nombre) DO UPDATE SET version = version + 1",
+                (nombre,)
+            )
+            con.commit()
+        except BaseException:
+            con.rollback()
+            con.execute(f'DROP TABLE IF EXISTS "{tmp}"')
+            con.commit()
+            raise
+        finally:
+            con.close()
+
+    def borrar(self, nombre):
+        if not self.ruta_db.exists():
+            return
+        con = self._conectar()
+        try:
+            con.execute(f'DROP TABLE IF EXISTS "{nombre}"')
+            # La versión avanza también al borrar (invalida cachés)
+            con.execute(
+                "UPDATE _oyken_versiones SET version = version + 1 WHERE nombre = ?",
+                (nombre,)
+            )
+            con.commit()
+        finally:
+            con.close()
+
+
+BACKENDS = {
+    "csv": BackendCSV,
+    "parquet": BackendParquet,
+    "sqlite": BackendSQLite,
+}
+
+
+# =========================
+# ALMACÉN
+# =========================
+class Almacen:
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.raiz = backend.raiz
+
+    def existe(self, nombre):
+        return self.backend.existe(nombre)
+
+    def version(self, nombre):
+        return self.backend.version(nombre)
+
+    def leer(self, nombre, columnas=None):
+        """Tabla tipada; con ``columnas`` solo se leen (y tipan) esas columnas."""
+        if self.backend.existe(nombre):
+            df = self.backend.leer(nombre, columnas)
+        else:
+            esquema = ESQUEMAS.get(nombre_base(nombre), {})
+            df = pd.DataFrame(columns=list(columnas if columnas is not None else esquema))
+        return tipar(nombre, df, columnas)
+
+    def escribir(self, nombre, df, version=None):
+        """Escribe la tabla tipada y la devuelve (tal como se leerá).
+
+        Con ``version`` (la de ``version(nombre)`` al leer) la escritura se
+        rechaza con ``ConflictoVersion`` si otro escritor se adelantó.
+        """
+        df = tipar(nombre, df.copy())
+        with self.bloqueo(nombre):
+            if version is not None and self.backend.version(nombre) != version:
+                raise ConflictoVersion(
+                    f"La tabla {nombre!r} ha cambiado desde que se leyó."
+                )
+            self.backend.escribir(nombre, df)
+        return df
+
+    def actualizar(self, nombre, cambio):
+        """Leer-modificar-escribir bajo el cerrojo de la tabla.
+
+        ``cambio`` recibe la tabla vigente y devuelve la nueva, de modo que
+        dos usuarios que guardan a la vez no se pisan las filas.
+        """
+        with self.bloqueo(nombre):
+            return self.escribir(nombre, cambio(self.leer(nombre)))
+
+    @contextmanager
+    def bloqueo(self, nombre):
+        """Cerrojo exclusivo (entre procesos) sobre la tabla ``nombre``."""
+        with cerrojo(ruta_cerrojo(self.raiz, nombre)):
+            yield
+
+    def borrar(self, nombre):
+        self.backend.borrar(nombre)
+
+    # ---------- Particiones por año ----------
+    def tabla_particion(self, nombre, anio):
+        return f"{nombre}{SEPARADOR_PARTICION}{int(anio)}"
+
+    def particiones(self, nombre):
+        prefijo = nombre + SEPARADOR_PARTICION
+        sufijos = (t[len(prefijo):] for t in self.backend.listar(prefijo))
+        return sorted(int(s) for s in sufijos if s.isdigit())
+
+    def leer_particion(self, nombre, anio, columnas=None):
+        return self.leer(self.tabla_particion(nombre, anio), columnas)
+
+    def escribir_particion(self, nombre, anio, df):
+        self.escribir(self.tabla_particion(nombre, anio), df)
+
+
+def almacen(backend=None, raiz=None):
+    # Sin raíz: la del local activo (oyken.locales) o OYKEN_DATA_DIR
+    backend = backend or os.environ.get("OYKEN_STORAGE", "csv")
+    raiz = raiz or raiz_activa()
+
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Backend de almacenamiento desconocido: {backend!r} "
+            f"(opciones: {', '.join(BACKENDS)})"
+        )
+
+    return Almacen(BACKENDS[backend](raiz))
+
+
+# =========================
+# MIGRACIÓN ENTRE BACKENDS
+# =========================
+def migrar(destino, origen="csv", raiz=None):
+    a_origen = almacen(origen, raiz)
+    a_destino = almacen(destino, raiz)
+
+    migrados = []
+    for nombre in ESQUEMAS:
+        if nombre in BACKEND_FIJO:
+            continue
+        tablas = [nombre] + [
+            a_origen.tabla_particion(nombre, anio)
+            for anio in a_origen.particiones(nombre)
+        ]
+        for tabla in tablas:
+            if a_origen.existe(tabla):
+                a_destino.escribir(tabla, a_origen.leer(tabla))
+                migrados.append(tabla)
+    return migrados
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python -m oyken.storage <destino> [origen]")
+        sys.exit(2)
+
+    # Carpeta de grupo: se migra cada local
+    for local in locales() or [None]:
+        raiz = raiz_local(local) if local else None
+        for nombre in migrar(*sys.argv[1:], raiz=raiz):
+            print(f"migrado: {local + '/' if local else ''}{nombre}")
@@ -0,0 +1,414 @@
+"""Registro opcional de tickets del TPV (un ticket por fila).
+
+Formato columnar compacto: momento en segundos (hora local), importe en
+céntimos, comensales y canal. El registro se guarda siempre en parquet
+(cada columna comprimida por separado), sea cual sea el backend del resto
+del almacén (``OYKEN_STORAGE``), así que requiere pyarrow; los ficheros
+van en la misma carpeta. Las particiones son mensuales
+(``tickets__202503``) para que una importación solo reescriba los meses que
+toca.
+
+Las ventas diarias por turno y la serie intradía (``oyken.intradia``) se
+agregan desde aquí solo para los días afectados (``materializar``) y se
+guardan con el backend del almacén. Las franjas de los turnos viven en
+``turnos.json`` del almacén y se pueden cambiar sin reimportar:
+``fijar_turnos`` (o ``python -m oyken.tickets --turnos 6 16 20``) vuelve a
+repartir todos los días con tickets. Las páginas leen las distribuciones
+reales con ``cargar_tickets``.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from oyken import intradia, locales
+from oyken.cache import cacheado
+from oyken.derivados import marcar
+from oyken.storage import BackendParquet, almacen
+from oyken.ventas import (
+    COLUMNAS, TURNOS, descartar_ventas, registrar_ventas,
+)
+
+TABLA = "tickets"
+
+# Backend del registro de tickets, independiente del del almacén
+BACKEND = "parquet"
+COLUMNAS_TICKET = ["momento", "importe_cent", "comensales", "canal"]
+
+# Franjas de los turnos del almacén
+CONFIG_TURNOS = "turnos.json"
+
+# Hora de inicio de cada turno (en orden); la del primero abre el día de
+# negocio: la madrugada cuenta en la noche del día anterior
+INICIO_TURNOS = {"manana": 6, "tarde": 16, "noche": 20}
+
+SEGUNDOS_DIA = 86_400
+
+# Tickets en memoria durante una carga antes de escribir particiones
+MAX_PENDIENTES = 1_000_000
+
+
+def _clave(a, *resto):
+    return ("tickets", type(a.backend).__name__, str(a.raiz.resolve())) + resto
+
+
+def _registro(a):
+    """Almacén parquet del registro de tickets en la carpeta de ``a``."""
+    if isinstance(a.backend, BackendParquet):
+        return a
+    try:
+        return almacen(BACKEND, a.raiz)
+    except RuntimeError as e:
+        raise RuntimeError(
+            "El registro de tickets se guarda en parquet y requiere pyarrow instalado."
+        ) from e
+
+
+# =========================
+# TURNOS
+# =========================
+def inicio_turnos(a=None):
+    """Franjas vigentes del almacén ({turno: hora de inicio})."""
+    a = a or almacen()
+    ruta = a.raiz / CONFIG_TURNOS
+    if not ruta.exists():
+        return dict(INICIO_TURNOS)
+    with open(ruta, encoding="utf-8") as f:
+        return {t: float(h) for t, h in json.load(f).items()}
+
+
+def _validar_turnos(inicios):
+    horas = [inicios.get(t) for t in TURNOS]
+    if list(inicios) != list(TURNOS) or any(h is None for h in horas):
+        raise ValueError(f"Los turnos deben ser {', '.join(TURNOS)}, en ese orden.")
+    if not (0 <= horas[0] < 24 and all(a < b for a, b in zip(horas, horas[1:]))
+            and horas[-1] < horas[0] + 24):
+        raise ValueError("Las horas de inicio de los turnos deben ser crecientes dentro del día.")
+
+
+def turno_de_hora(horas, inicios=None):
+    """Turno (posición en ``TURNOS``) de cada hora decimal 0-24."""
+    inicios = np.asarray(list((inicios or INICIO_TURNOS).values()), dtype="float64")
+    # Horas relativas al inicio del día de negocio: la madrugada va al final
+    relativas = (np.asarray(horas, dtype="float64") - inicios[0]) % 24
+    return np.searchsorted(inicios - inicios[0], relativas, side="right") - 1
+
+
+def dia_negocio(momento, inicios):
+    # Días desde 1970-01-01 del día de negocio de cada momento (segundos)
+    corte = int(round(next(iter(inicios.values())) * 3600))
+    return (np.asarray(momento, dtype="int64") - corte) // SEGUNDOS_DIA
+
+
+# =========================
+# AGREGACIÓN
+# =========================
+def desde_momentos(momento, importe_eur, comensales=0, canal=""):
+    """Tickets con el esquema del registro a partir de momentos y euros."""
+    momento = pd.Series(momento)
+    return pd.DataFrame({
+        "momento": momento.to_numpy("datetime64[s]").astype("int64"),
+        "importe_cent": np.round(np.asarray(importe_eur, dtype="float64") * 100).astype("int64"),
+        "comensales": np.broadcast_to(np.asarray(comensales, dtype="int64"), len(momento)),
+        "canal": np.broadcast_to(np.asarray(canal, dtype=object), len(momento)),
+    })
+
+
+def agregar(tickets, inicios=None):
+    """(día de negocio, turno) → céntimos, comensales y tickets de ``tickets``.
+
+    Los abonos (importe negativo) restan ventas pero no cuentan tickets.
+    """
+    inicios = inicios or INICIO_TURNOS
+    momento = tickets["momento"].to_numpy()
+    importe = tickets["importe_cent"].to_numpy()
+    return pd.DataFrame({
+        "dia": dia_negocio(momento, inicios),
+        "turno": turno_de_hora(momento % SEGUNDOS_DIA / 3600, inicios),
+        "ventas": importe,
+        "comensales": tickets["comensales"].to_numpy(),
+        "tickets": (importe > 0).astype("int64"),
+    }).groupby(["dia", "turno"]).sum()
+
+
+def dias_ventas(agregado):
+    """Agregado de ``agregar`` → una fila por día con el esquema de ventas."""
+    ancho = agregado.unstack("turno", fill_value=0)
+    df = pd.DataFrame({"fecha": ancho.index.to_numpy().astype("datetime64[D]")})
+
+    for i, t in enumerate(TURNOS):
+        for campo, destino in (
+            ("ventas", f"ventas_{t}_eur"),
+            ("comensales", f"comensales_{t}"),
+            ("tickets", f"tickets_{t}"),
+        ):
+            df[destino] = ancho[(campo, i)].to_numpy() if (campo, i) in ancho else 0
+        df[f"ventas_{t}_eur"] = df[f"ventas_{t}_eur"] / 100
+
+    df["ventas_total_eur"] = sum(df[f"ventas_{t}_eur"] for t in TURNOS)
+    df["observaciones"] = ""
+    return df[COLUMNAS]
+
+
+# =========================
+# PARTICIONES
+# =========================
+def _mes(segundos):
+    # Partición (AAAAMM) de cada momento
+    m = np.asarray(segundos, dtype="int64").astype("datetime64[s]").astype("datetime64[M]").astype("int64")
+    return (m // 12 + 1970) * 100 + m % 12 + 1
+
+
+def _meses_dias(dias):
+    # Particiones que pueden tener tickets de esos días de negocio
+    # (la madrugada cae en el día natural siguiente)
+    dias = np.asarray(sorted(dias), dtype="int64")
+    return sorted(set(_mes(dias * SEGUNDOS_DIA)) | set(_mes((dias + 1) * SEGUNDOS_DIA)))
+
+
+class Carga:
+    """Alta de tickets por bloques con memoria acotada.
+
+    Los tickets se agrupan por mes y se escriben cuando hay demasiados
+    pendientes o al cerrar. Los días de negocio que llegan sustituyen a los
+    ya registrados (reimportar una exportación no duplica tickets).
+    """
+
+    def __init__(self, a=None, inicios=None):
+        self.a = a or almacen()
+        self.registro = _registro(self.a)
+        self.inicios = inicios or inicio_turnos(self.a)
+        self.pendientes = {}
+        self.filas = 0
+        self.dias = set()
+        # (partición, día) ya limpiados en esta carga
+        self.limpios = set()
+
+    def anadir(self, tickets):
+        tickets = tickets[COLUMNAS_TICKET]
+        self.dias.update(np.unique(dia_negocio(tickets["momento"], self.inicios)).tolist())
+        for mes, parte in tickets.groupby(_mes(tickets["momento"])):
+            self.pendientes.setdefault(int(mes), []).append(parte)
+        self.filas += len(tickets)
+
+        # Primero los meses con más tickets: menos reescrituras
+        while self.filas > MAX_PENDIENTES:
+            mes = max(self.pendientes, key=lambda m: sum(len(p) for p in self.pendientes[m]))
+            self._volcar(mes)
+
+    def _volcar(self, mes):
+        partes = self.pendientes.pop(mes)
+        self.filas -= sum(len(p) for p in partes)
+        nuevos = pd.concat(partes, ignore_index=True)
+
+        dias = set(np.unique(dia_negocio(nuevos["momento"], self.inicios)).tolist())
+        sustituir = {d for d in dias if (mes, d) not in self.limpios}
+        self.limpios.update((mes, d) for d in dias)
+
+        with self.registro.bloqueo(TABLA):
+            previa = self.registro.leer_particion(TABLA, mes)
+            if sustituir:
+                previa = previa[~np.isin(dia_negocio(previa["momento"], self.inicios), list(sustituir))]
+            df = pd.concat([previa, nuevos], ignore_index=True).sort_values("momento", kind="stable")
+            self.registro.escribir_particion(TABLA, mes, df[COLUMNAS_TICKET])
+
+    def cerrar(self):
+        """Escribe lo pendiente y devuelve los días de negocio cargados."""
+        for mes in list(self.pendientes):
+            self._volcar(mes)
+
+        # Días cargados con tickets previos en una partición sin tickets
+        # nuevos de ese día (p. ej. la madrugada del día 1 del mes siguiente)
+        for mes in _meses_dias(self.dias):
+            sustituir = {d for d in self.dias if (mes, d) not in self.limpios}
+            if sustituir and self.registro.existe(self.registro.tabla_particion(TABLA, mes)):
+                self._limpiar(mes, sustituir)
+
+        return sorted(self.dias)
+
+    def _limpiar(self, mes, dias):
+        self.limpios.update((mes, d) for d in dias)
+        with self.registro.bloqueo(TABLA):
+            previa = self.registro.leer_particion(TABLA, mes)
+            quedan = previa[~np.isin(dia_negocio(previa["momento"], self.inicios), list(dias))]
+            if len(quedan) != len(previa):
+                self.registro.escribir_particion(TABLA, mes, quedan)
+
+
+# =========================
+# MATERIALIZACIÓN
+# =========================
+def materializar(dias=None, a=None):
+    """Ventas por turno y serie intradía de ``dias`` (de negocio, todos por defecto).
+
+    Lee solo las particiones que pueden contener esos días y conserva las
+    observaciones ya escritas. Devuelve los días guardados.
+    """
+    a = a or almacen()
+    registro = _registro(a)
+    inicios = inicio_turnos(a)
+    meses = registro.particiones(TABLA) if dias is None else _meses_dias(dias)
+
+    acumulado, serie = None, None
+    for mes in meses:
+        if not registro.existe(registro.tabla_particion(TABLA, mes)):
+            continue
+        tickets = registro.leer_particion(TABLA, mes)
+        parte = agregar(tickets, inicios)
+        franjas = intradia.franjas(tickets, dia_negocio(tickets["momento"], inicios))
+        if dias is not None:
+            parte = parte[parte.index.get_level_values("dia").isin(list(dias))]
+            franjas = franjas[franjas.index.isin(list(dias))]
+        acumulado = parte if acumulado is None else acumulado.add(parte, fill_value=0)
+        serie = franjas if serie is None else serie.add(franjas, fill_value=0)
+
+    if acumulado is None or acumulado.empty:
+        return 0
+
+    # registrar_ventas conserva las observaciones ya escritas
+    df = dias_ventas(acumulado)
+    registrar_ventas(df, a)
+    intradia.registrar(serie.astype("int64"), a)
+    marcar("ventas", set(zip(df["fecha"].dt.year, df["fecha"].dt.month)), a)
+    return len(df)
+
+
+def _dias_con_tickets(a, inicios):
+    registro = _registro(a)
+    dias = set()
+    for mes in registro.particiones(TABLA):
+        momento = registro.leer_particion(TABLA, mes, ["momento"])["momento"]
+        dias.update(np.unique(dia_negocio(momento, inicios)).tolist())
+    return dias
+
+
+def fijar_turnos(inicios, a=None):
+    """Cambia las franjas de los turnos y reparte de nuevo todos los días con tickets."""
+    a = a or almacen()
+    inicios = {t: float(inicios[t]) for t in inicios}
+    _validar_turnos(inicios)
+    previos = _dias_con_tickets(a, inicio_turnos(a))
+
+    with a.bloqueo(CONFIG_TURNOS):
+        ruta = a.raiz / CONFIG_TURNOS
+        tmp = ruta.with_name(ruta.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(inicios, f)
+        os.replace(tmp, ruta)
+
+    escritos = materializar(None, a)
+    # Al mover el inicio del día, un extremo puede quedarse sin tickets
+    sobran = previos - _dias_con_tickets(a, inicios)
+    if sobran:
+        fechas = np.asarray(sorted(sobran), dtype="int64").astype("datetime64[D]")
+        descartar_ventas(fechas, a)
+        intradia.descartar(fechas, a)
+        marcar("ventas", {(f.year, f.month) for f in pd.DatetimeIndex(fechas)}, a)
+    return escritos
+
+
+# =========================
+# LECTURA
+# =========================
+def hay_tickets(a=None):
+    if a is None and locales.es_grupo():
+        return any(locales.en_paralelo(hay_tickets).values())
+    a = a or almacen()
+    try:
+        registro = _registro(a)
+    except RuntimeError:
+        # Sin pyarrow no puede haber registro de tickets
+        return False
+    return bool(registro.particiones(TABLA))
+
+
+def _particion(a, mes, inicios):
+    # Tickets del mes con su día de negocio, hora y turno (una vez por versión);
+    # ``a`` es el almacén del registro (``_registro``)
+    tabla = a.tabla_particion(TABLA, mes)
+
+    def cargar():
+        df = a.leer(tabla)
+        momento = df["momento"].to_numpy()
+        horas = momento % SEGUNDOS_DIA / 3600
+        return pd.DataFrame({
+            "fecha": dia_negocio(momento, inicios).astype("datetime64[D]").astype("datetime64[s]"),
+            "hora": horas,
+            "turno": np.asarray(TURNOS, dtype=object)[turno_de_hora(horas, inicios)],
+            "importe_eur": df["importe_cent"].to_numpy() / 100,
+            "comensales": df["comensales"].to_numpy(),
+            "canal": df["canal"].to_numpy(),
+        })
+
+    return cacheado(
+        _clave(a, mes, tuple(inicios.items())), a.version(tabla), cargar
+    )
+
+
+def cargar_tickets(a=None, desde=None, hasta=None):
+    """Tickets de los días de negocio [desde, hasta]: fecha, hora, turno, importe, comensales y canal.
+
+    En la vista de grupo, los de todos los locales juntos.
+    """
+    if a is None and locales.es_grupo():
+        partes = list(locales.en_paralelo(lambda a: cargar_tickets(a, desde, hasta)).values())
+        return pd.concat(partes, ignore_index=True)
+    a = a or almacen()
+    inicios = inicio_turnos(a)
+    if not hay_tickets(a):
+        return _particion_vacia()
+    registro = _registro(a)
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+
+    meses = registro.particiones(TABLA)
+    if desde is not None:
+        meses = [m for m in meses if m >= desde.year * 100 + desde.month]
+    if hasta is not None:
+        # La madrugada del último día cae en el día natural siguiente
+        siguiente = hasta + pd.Timedelta(days=1)
+        meses = [m for m in meses if m <= siguiente.year * 100 + siguiente.month]
+
+    partes = [_particion(registro, mes, inicios) for mes in meses]
+    if not partes:
+        return _particion_vacia()
+
+    df = pd.concat(partes, ignore_index=True)
+    if desde is not None:
+        df = df[df["fecha"] >= desde]
+    if hasta is not None:
+        df = df[df["fecha"] <= hasta]
+    return df.reset_index(drop=True)
+
+
+def _particion_vacia():
+    return pd.DataFrame({
+        "fecha": pd.Series(dtype="datetime64[s]"),
+        "hora": pd.Series(dtype="float64"),
+        "turno": pd.Series(dtype=object),
+        "importe_eur": pd.Series(dtype="float64"),
+        "comensales": pd.Series(dtype="int64"),
+        "canal": pd.Series(dtype=object),
+    })
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        prog="python -m oyken.tickets",
+        description="Cambia las franjas de los turnos y reagrega las ventas desde los tickets."
+    )
+    parser.add_argument("--turnos", type=float, nargs=len(TURNOS), metavar="HORA",
+                        help=f"hora de inicio de {', '.join(TURNOS)} (p. ej. 6 16 20)")
+    args = parser.parse_args()
+
+    if args.turnos is None:
+        print(f"turnos: {inicio_turnos()}")
+        sys.exit(0)
+
+    dias = fijar_turnos(dict(zip(TURNOS, args.turnos)))
+    print(f"turnos: {inicio_turnos()} · {dias} días reagregados")
+    sys.exit(0)
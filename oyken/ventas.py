@@ -0,0 +1,545 @@
+"""Almacén de ventas diarias (particiones anuales + journal de guardados).
+
+Las ventas se guardan en una tabla por año (``ventas__2025``...). Los
+cargadores aceptan un rango de fechas y solo leen las particiones que lo
+solapan, de modo que el coste de una vista no crece con el histórico.
+También aceptan ``columnas``: cada página declara las que usa y el resto
+(p. ej. ``observaciones``, texto libre) no se parsea.
+
+Los KPIs de cada día (tickets y comensales totales, ticket medio, € y
+tickets por comensal, por turno) se materializan en ``ventas_kpi_diario``,
+con las mismas particiones anuales, cada vez que se escriben las ventas.
+``python -m oyken.reconstruir`` los rellena para el histórico existente.
+
+Sin almacén explícito y en la vista de grupo (``oyken.locales``), los
+cargadores leen cada local en paralelo y suman sus ventas por día; los
+KPIs del grupo se recalculan sobre esa suma.
+"""
+import pandas as pd
+
+from oyken import locales
+from oyken.cache import cacheado
+from oyken.calendario import CAMPOS, atributos, derivar_calendario
+from oyken.esquemas import ESQUEMAS
+from oyken.journal import Journal
+from oyken.kpi_series import ratio_serie, ticket_medio_serie
+from oyken.storage import almacen, tipar
+
+TABLA = "ventas"
+JOURNAL = "ventas.journal.jsonl"
+
+# Nº de guardados acumulados antes de volcar el journal al almacén
+UMBRAL_COMPACTACION = 200
+
+COLUMNAS = list(ESQUEMAS["ventas"])
+
+TABLA_KPI = "ventas_kpi_diario"
+COLUMNAS_KPI = list(ESQUEMAS[TABLA_KPI])
+
+TURNOS = ("manana", "tarde", "noche")
+
+# Semanas de histórico del perfil de turnos (``perfil_turnos``)
+SEMANAS_PERFIL = 12
+
+# Columnas de ventas de las que salen los KPIs diarios
+COLUMNAS_BASE_KPI = [
+    "ventas_total_eur",
+    *(f"ventas_{t}_eur" for t in TURNOS),
+    *(f"{campo}_{t}" for campo in ("comensales", "tickets") for t in TURNOS),
+]
+
+
+def _journal(a=None):
+    return Journal((a or almacen()).raiz / JOURNAL)
+
+
+def _aplicar(df, registros):
+    # Last-write-wins por fecha
+    if registros:
+        df = pd.concat([df, tipar("ventas", pd.DataFrame(registros))], ignore_index=True)
+        df = df.drop_duplicates(subset=["fecha"], keep="last")
+    return df
+
+
+def _proyeccion(columnas):
+    # "fecha" siempre: el calendario y el rango dependen de ella
+    if columnas is None:
+        return None
+    return tuple(dict.fromkeys(["fecha", *columnas]))
+
+
+def _clave(a, *resto):
+    return ("ventas", type(a.backend).__name__, str(a.raiz.resolve())) + resto
+
+
+# =========================
+# PARTICIONES
+# =========================
+def _migrar_tabla_unica(a):
+    # Almacenes anteriores: una sola tabla "ventas" → particiones anuales
+    if not a.existe(TABLA):
+        return
+
+    with a.bloqueo(TABLA):
+        if not a.existe(TABLA):
+            return
+        df = a.leer(TABLA)
+        for anio, parte in df.groupby(df["fecha"].dt.year):
+            previa = a.leer_particion(TABLA, anio)
+            parte = pd.concat([previa, parte], ignore_index=True)
+            parte = parte.drop_duplicates(subset=["fecha"], keep="last")
+            _escribir_anio(a, anio, parte.sort_values("fecha")[COLUMNAS])
+        a.borrar(TABLA)
+
+
+def _escribir_anio(a, anio, df):
+    # Ventas del año y sus KPIs diarios, siempre juntos
+    a.escribir_particion(TABLA, anio, df)
+    a.escribir_particion(TABLA_KPI, anio, kpi_diario(df))
+
+
+def _particion(a, anio, columnas=None):
+    # Parseo + calendario una vez por versión de la partición y proyección
+    tabla = a.tabla_particion(TABLA, anio)
+    return cacheado(
+        _clave(a, anio, columnas),
+        a.version(tabla),
+        lambda: derivar_calendario(a.leer(tabla, columnas))
+    )
+
+
+def _vacio(columnas=None):
+    df = pd.DataFrame(columns=list(columnas or COLUMNAS))
+    return derivar_calendario(tipar("ventas", df, columnas))
+
+
+def _registros_journal(a):
+    journal = _journal(a)
+
+    def cargar():
+        registros = journal.leer()
+        if not registros:
+            return _vacio()
+        df = tipar("ventas", pd.DataFrame(registros))
+        return derivar_calendario(df.drop_duplicates(subset=["fecha"], keep="last"))
+
+    return cacheado(_clave(a, "journal"), journal.version(), cargar)
+
+
+def anios_ventas(a=None):
+    """Años con ventas, sin leer las particiones."""
+    if a is None and locales.es_grupo():
+        return sorted(set().union(*_por_local(anios_ventas)))
+    a = a or almacen()
+    _migrar_tabla_unica(a)
+    anios = set(a.particiones(TABLA))
+    anios.update(int(x) for x in _registros_journal(a)["anio"].unique())
+    return sorted(anios)
+
+
+def _unir(partes, desde, hasta):
+    # Partición + journal: last-write-wins por fecha, recorte y orden
+    df = pd.concat(partes, ignore_index=True)
+    df = df.drop_duplicates(subset=["fecha"], keep="last")
+
+    if desde is not None:
+        df = df[df["fecha"] >= desde]
+    if hasta is not None:
+        df = df[df["fecha"] <= hasta]
+
+    return df.sort_values("fecha").reset_index(drop=True)
+
+
+def _rango(desde, hasta):
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+    return desde, hasta
+
+
+def _anios_rango(a, desde, hasta):
+    return [
+        anio for anio in anios_ventas(a)
+        if (desde is None or anio >= desde.year)
+        and (hasta is None or anio <= hasta.year)
+    ]
+
+
+# =========================
+# VISTA DE GRUPO
+# =========================
+def _por_local(funcion):
+    # Una lectura por local, en paralelo (cada una con su caché)
+    return list(locales.en_paralelo(funcion).values())
+
+
+def _sumar_por_dia(partes):
+    # Locales → grupo: suma de las columnas numéricas de cada día
+    df = pd.concat(partes, ignore_index=True)
+    if df.empty:
+        return partes[0]
+
+    claves = [c for c in ("fecha", "fecha_comparable") if c in df.columns]
+    sumables = [
+        c for c in df.columns
+        if c not in claves and c not in CAMPOS and c != "observaciones"
+    ]
+    dias = df.groupby(claves, dropna=False)
+    grupo = dias[sumables].sum(min_count=1).reset_index()
+    if "observaciones" in df.columns:
+        grupo["observaciones"] = dias["observaciones"].agg(
+            lambda s: " · ".join(t for t in s if t)
+        ).to_numpy()
+
+    return derivar_calendario(grupo)[list(partes[0].columns)]
+
+
+# =========================
+# LECTURA
+# =========================
+def cargar_ventas(a=None, desde=None, hasta=None, columnas=None):
+    """Ventas diarias con calendario derivado, limitadas a [desde, hasta].
+
+    Solo se leen las particiones anuales que solapan el rango y, si se
+    indican, las ``columnas`` pedidas; cada llamada recibe su propia copia.
+    """
+    if a is None and locales.es_grupo():
+        return _sumar_por_dia(_por_local(
+            lambda a: cargar_ventas(a, desde, hasta, columnas)
+        ))
+    a = a or almacen()
+    columnas = _proyeccion(columnas)
+    desde, hasta = _rango(desde, hasta)
+
+    partes = [_particion(a, anio, columnas) for anio in _anios_rango(a, desde, hasta)]
+    journal = _registros_journal(a)
+    if not journal.empty:
+        if columnas is not None:
+            journal = journal.drop(columns=[c for c in COLUMNAS if c not in columnas])
+        partes.append(journal)
+    if not partes:
+        return _vacio(columnas)
+
+    return _unir(partes, desde, hasta)
+
+
+def ultimas_ventas(n, a=None, columnas=None):
+    """Los ``n`` últimos días registrados, leyendo de la partición más reciente hacia atrás."""
+    if a is None and locales.es_grupo():
+        df = _sumar_por_dia(_por_local(lambda a: ultimas_ventas(n, a, columnas)))
+        return df.tail(n).reset_index(drop=True)
+    a = a or almacen()
+    partes, filas = [], 0
+
+    for anio in reversed(anios_ventas(a)):
+        parte = cargar_ventas(a, f"{anio}-01-01", f"{anio}-12-31", columnas)
+        partes.insert(0, parte)
+        filas += len(parte)
+        if filas >= n:
+            break
+
+    if not partes:
+        return cargar_ventas(a, columnas=columnas)
+    return pd.concat(partes, ignore_index=True).tail(n).reset_index(drop=True)
+
+
+# =========================
+# KPIs DIARIOS
+# =========================
+def kpi_diario(df):
+    """KPIs de cada día a partir de sus ventas (una fila por fecha)."""
+    kpi = pd.DataFrame({
+        "fecha": df["fecha"],
+        "ventas_total_eur": df["ventas_total_eur"],
+        "comensales_total": sum(df[f"comensales_{t}"] for t in TURNOS),
+        "tickets_total": sum(df[f"tickets_{t}"] for t in TURNOS),
+    })
+
+    for t in (*TURNOS, "total"):
+        if t == "total":
+            ventas, comensales, tickets = (
+                kpi["ventas_total_eur"], kpi["comensales_total"], kpi["tickets_total"]
+            )
+        else:
+            ventas, comensales, tickets = (
+                df[f"ventas_{t}_eur"], df[f"comensales_{t}"], df[f"tickets_{t}"]
+            )
+        kpi[f"ticket_medio_{t}_eur"] = ticket_medio_serie(ventas, tickets)
+        kpi[f"eur_comensal_{t}"] = ratio_serie(ventas, comensales)
+        kpi[f"tickets_comensal_{t}"] = ratio_serie(tickets, comensales)
+
+    return tipar(TABLA_KPI, kpi)[COLUMNAS_KPI]
+
+
+def _particion_kpi(a, anio, columnas=None):
+    tabla = a.tabla_particion(TABLA_KPI, anio)
+    if a.existe(tabla):
+        return cacheado(
+            _clave(a, "kpi", anio, columnas),
+            a.version(tabla),
+            lambda: a.leer(tabla, columnas)
+        )
+
+    # Año aún sin materializar (histórico anterior): se deriva al leer, una
+    # vez por versión de las ventas, hasta pasar ``python -m oyken.reconstruir``
+    base = _proyeccion(COLUMNAS_BASE_KPI)
+    df = cacheado(
+        _clave(a, "kpi", anio, "derivado"),
+        a.version(a.tabla_particion(TABLA, anio)),
+        lambda: kpi_diario(_particion(a, anio, base))
+    )
+    return df[list(columnas or COLUMNAS_KPI)]
+
+
+def _kpi_journal(a):
+    # Días aún en el journal: se calculan una vez por versión del journal
+    return cacheado(
+        _clave(a, "kpi", "journal"),
+        _journal(a).version(),
+        lambda: kpi_diario(_registros_journal(a))
+    )
+
+
+def cargar_kpi_diario(a=None, desde=None, hasta=None, columnas=None):
+    """KPIs diarios materializados (``ventas_kpi_diario``) en [desde, hasta].
+
+    Mismas reglas que ``cargar_ventas``: particiones que solapan el rango,
+    proyección de ``columnas`` y los días pendientes del journal.
+    """
+    if a is None and locales.es_grupo():
+        # Los ratios no se suman: se recalculan sobre las ventas del grupo
+        kpi = kpi_diario(cargar_ventas(None, desde, hasta, COLUMNAS_BASE_KPI))
+        return kpi[list(_proyeccion(columnas) or COLUMNAS_KPI)]
+    a = a or almacen()
+    columnas = _proyeccion(columnas)
+    desde, hasta = _rango(desde, hasta)
+
+    partes = [_particion_kpi(a, anio, columnas) for anio in _anios_rango(a, desde, hasta)]
+    journal = _kpi_journal(a)
+    if not journal.empty:
+        partes.append(journal[list(columnas or COLUMNAS_KPI)])
+    if not partes:
+        return tipar(TABLA_KPI, pd.DataFrame(columns=list(columnas or COLUMNAS_KPI)), columnas)
+
+    return _unir(partes, desde, hasta)
+
+
+def materializar_kpi(a=None, anios=None):
+    """Recalcula ``ventas_kpi_diario`` desde las particiones de ventas.
+
+    Relleno del histórico (``python -m oyken.reconstruir``); devuelve las
+    filas escritas.
+    """
+    a = a or almacen()
+    _migrar_tabla_unica(a)
+    filas = 0
+
+    with a.bloqueo(TABLA):
+        for anio in a.particiones(TABLA):
+            if anios is not None and anio not in anios:
+                continue
+            kpi = kpi_diario(a.leer_particion(TABLA, anio))
+            a.escribir_particion(TABLA_KPI, anio, kpi)
+            filas += len(kpi)
+
+    return filas
+
+
+# =========================
+# COMPARABLES
+# =========================
+def _version_anios(a, anios):
+    return tuple(
+        a.version(a.tabla_particion(TABLA, anio)) for anio in anios
+    ) + (_journal(a).version(),)
+
+
+def comparar_ventas(a=None, desde=None, hasta=None, columnas=None, completar=False):
+    """Ventas de [desde, hasta] junto a las de su día comparable.
+
+    Comparable: mismo día de la misma semana ISO del año anterior
+    (``fecha_comparable`` de la dimensión de calendario). Sus columnas llevan
+    el sufijo ``_comp`` y quedan a NaN si ese día no tiene ventas. Con
+    ``completar`` (requiere ``desde`` y ``hasta``) hay una fila por día del
+    rango aunque no tenga ventas, con sus columnas a cero. Un solo cruce por
+    rango, columnas y versión de las particiones implicadas.
+    """
+    if a is None and locales.es_grupo():
+        return _sumar_por_dia(_por_local(
+            lambda a: comparar_ventas(a, desde, hasta, columnas, completar)
+        ))
+    a = a or almacen()
+    campos = [c for c in (columnas or COLUMNAS) if c != "fecha"]
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+
+    # El comparable puede caer en el año anterior al del rango
+    anios = [
+        anio for anio in anios_ventas(a)
+        if (desde is None or anio >= desde.year - 1)
+        and (hasta is None or anio <= hasta.year)
+    ]
+
+    def cruzar():
+        actual = cargar_ventas(a, desde, hasta, campos)
+        if completar:
+            dias = pd.DataFrame({"fecha": pd.date_range(desde, hasta, freq="D")})
+            dias["fecha"] = dias["fecha"].astype(actual["fecha"].dtype)
+            actual = derivar_calendario(tipar(
+                "ventas",
+                dias.merge(actual[["fecha", *campos]], on="fecha", how="left"),
+                _proyeccion(campos)
+            ))
+        actual["fecha_comparable"] = (
+            atributos(actual["fecha"], ["fecha_comparable"])["fecha_comparable"]
+            .astype(actual["fecha"].dtype)
+            .to_numpy()
+        )
+
+        fechas = actual["fecha_comparable"].dropna()
+        if fechas.empty:
+            previo = _vacio(_proyeccion(campos))
+        else:
+            previo = cargar_ventas(a, fechas.min(), fechas.max(), campos)
+        previo = previo[["fecha", *campos]].rename(
+            columns={"fecha": "fecha_comparable", **{c: f"{c}_comp" for c in campos}}
+        )
+        return actual.merge(previo, on="fecha_comparable", how="left")
+
+    df = cacheado(
+        _clave(a, "comparables", desde, hasta, tuple(campos), completar),
+        _version_anios(a, anios),
+        cruzar
+    )
+    return df.copy(deep=False)
+
+
+# =========================
+# PERFIL DE TURNOS
+# =========================
+def _ventas_dia_semana(a, desde, hasta):
+    # € por día de la semana (0 = lunes) y turno, días con ventas de [desde, hasta]
+    columnas = [f"ventas_{t}_eur" for t in TURNOS]
+    anios = [anio for anio in anios_ventas(a) if desde.year <= anio <= hasta.year]
+
+    def sumar():
+        df = cargar_ventas(a, desde, hasta, [*columnas, "ventas_total_eur"])
+        df = df[df["ventas_total_eur"] > 0]
+        return (
+            df.groupby(df["fecha"].dt.weekday)[columnas].sum()
+            .reindex(range(7), fill_value=0.0)
+            .to_numpy(dtype="float64")
+        )
+
+    return cacheado(
+        _clave(a, "dia_semana", desde, hasta),
+        _version_anios(a, anios),
+        sumar
+    )
+
+
+def perfil_turnos(fecha, a=None, semanas=SEMANAS_PERFIL):
+    """Peso de cada turno (``TURNOS``) en el día de la semana de ``fecha``.
+
+    Sale de las ventas de las ``semanas`` anteriores a ``fecha`` (el propio
+    día no cuenta) y se calcula una vez por versión de las ventas. Sin
+    histórico de ese día de la semana se usa el de toda la semana; sin
+    ninguno, None. En la vista de grupo, el perfil de la suma de locales.
+    """
+    fecha = pd.Timestamp(fecha).normalize()
+    desde = fecha - pd.Timedelta(weeks=semanas)
+    hasta = fecha - pd.Timedelta(days=1)
+
+    if a is None and locales.es_grupo():
+        # Las sumas son aditivas: el grupo suma las de cada local
+        partes = _por_local(lambda a: _ventas_dia_semana(a, desde, hasta))
+        sumas = sum(partes) if partes else None
+    else:
+        sumas = _ventas_dia_semana(a or almacen(), desde, hasta)
+
+    if sumas is None:
+        return None
+    for ventas in (sumas[fecha.weekday()], sumas.sum(axis=0)):
+        if ventas.sum() > 0:
+            return tuple(float(v) for v in ventas / ventas.sum())
+    return None
+
+
+# =========================
+# ESCRITURA
+# =========================
+def registrar_venta(registro: dict, a=None):
+    a = a or almacen()
+    registro = dict(registro)
+    registro["fecha"] = pd.Timestamp(registro["fecha"]).date().isoformat()
+
+    journal = _journal(a)
+    journal.append(registro)
+
+    if len(journal) >= UMBRAL_COMPACTACION:
+        compactar(a)
+
+
+def registrar_ventas(df, a=None):
+    """Alta por lotes (importaciones): una escritura por partición anual.
+
+    Los días de ``df`` sustituyen a los ya guardados (último valor por
+    fecha), salvo sus observaciones: si ``df`` no trae ninguna para un día
+    se conservan las que ya tenía (notas tecleadas en el formulario). Antes
+    se compacta el journal para que no los pise al leer. Devuelve los años
+    escritos.
+    """
+    a = a or almacen()
+    nuevos = tipar("ventas", df)[COLUMNAS]
+
+    with a.bloqueo(TABLA):
+        compactar(a)
+        for anio, parte in nuevos.groupby(nuevos["fecha"].dt.year):
+            previa = a.leer_particion(TABLA, anio)
+            notas = parte["fecha"].map(
+                previa.drop_duplicates(subset=["fecha"], keep="last")
+                .set_index("fecha")["observaciones"]
+            )
+            sin_nota = parte["observaciones"].fillna("").str.strip().eq("")
+            parte = parte.assign(
+                observaciones=parte["observaciones"].mask(sin_nota, notas).fillna("")
+            )
+            df_anio = pd.concat([previa, parte], ignore_index=True)
+            df_anio = df_anio.drop_duplicates(subset=["fecha"], keep="last")
+            _escribir_anio(a, anio, df_anio.sort_values("fecha")[COLUMNAS])
+
+    return sorted(int(anio) for anio in nuevos["fecha"].dt.year.unique())
+
+
+def descartar_ventas(fechas, a=None):
+    """Quita los días ``fechas`` de las ventas guardadas (una escritura por año)."""
+    a = a or almacen()
+    fechas = pd.DatetimeIndex(fechas)
+
+    with a.bloqueo(TABLA):
+        compactar(a)
+        for anio in sorted(set(fechas.year)):
+            df = a.leer_particion(TABLA, anio)
+            quedan = df[~df["fecha"].isin(fechas)]
+            if len(quedan) != len(df):
+                _escribir_anio(a, anio, quedan[COLUMNAS])
+
+
+def compactar(a=None):
+    a = a or almacen()
+    _migrar_tabla_unica(a)
+
+    # Una sola compactación a la vez (también entre procesos)
+    with a.bloqueo(TABLA):
+        journal = _journal(a)
+        registros = journal.congelar()
+
+        if registros:
+            nuevos = tipar("ventas", pd.DataFrame(registros))
+            for anio, parte in nuevos.groupby(nuevos["fecha"].dt.year):
+                df = _aplicar(
+                    a.leer_particion(TABLA, anio),
+                    parte.to_dict("records")
+                ).sort_values("fecha")
+                _escribir_anio(a, anio, df[COLUMNAS])
+
+        journal.descartar_congelado()
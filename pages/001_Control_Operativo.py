@@ -1,50 +1,54 @@
 import streamlit as st
 import pandas as pd
-from pathlib import Path
 from datetime import date
 
+from oyken import locales, rendimiento
+from oyken.kpi import diff_pct, proyeccion_cierre, ticket_medio
+from oyken.kpi_series import diff_pct_serie, ticket_medio_serie
+from oyken.derivados import leer_fresco, notificar_cambio, particion
+from oyken.importar import CAMPOS_TPV, ImportacionInvalida, importar
+from oyken.ventas import (
+    anios_ventas, cargar_kpi_diario, cargar_ventas, comparar_ventas, perfil_turnos,
+    registrar_venta,
+)
+
+traza = rendimiento.pagina(__file__)
+
 # =========================
 # CONFIGURACIÓN
 # =========================
+traza.bloque("CONFIGURACIÓN")
 st.set_page_config(page_title="OYKEN · Control Operativo", layout="centered")
 
 st.title("OYKEN · Control Operativo")
 st.markdown("**Entra en Oyken. En 30 segundos entiendes mejor tu negocio.**")
 st.caption("Sistema automático basado en criterio operativo")
 
-DATA_FILE = Path("ventas.csv")
+# Local activo (barra lateral); la vista de grupo suma todos los locales
+vista_grupo = locales.selector(grupo=True) == locales.GRUPO
 
-DOW_ES = {
-    0: "Lunes", 1: "Martes", 2: "Miércoles",
-    3: "Jueves", 4: "Viernes", 5: "Sábado", 6: "Domingo"
-
-}
+# =========================
+# CARGA DE DATOS
+# =========================
+traza.bloque("CARGA DE DATOS")
+# Particiones anuales: cada bloque carga solo su rango de fechas.
+# Incluyen iso_year / iso_week / weekday / dow (REGLA ISO GRANDES CADENAS)
+anios = anios_ventas()
 
-COLUMNAS = [
-    "fecha",
+# Bloques sin texto libre: se omite observaciones al leer
+COLUMNAS_NUMERICAS = [
     "ventas_manana_eur", "ventas_tarde_eur", "ventas_noche_eur", "ventas_total_eur",
     "comensales_manana", "comensales_tarde", "comensales_noche",
     "tickets_manana", "tickets_tarde", "tickets_noche",
-    "observaciones"
 ]
 
-# =========================
-# CARGA DE DATOS
-# =========================
-if DATA_FILE.exists():
-    df = pd.read_csv(DATA_FILE, parse_dates=["fecha"])
-else:
-    df = pd.DataFrame(columns=COLUMNAS)
-
-for col in COLUMNAS:
-    if col not in df.columns:
-        df[col] = 0 if col not in ["fecha", "observaciones"] else ""
-
-df["observaciones"] = df["observaciones"].fillna("")
+# Separadores de campo de las exportaciones del TPV
+SEPARADORES_TPV = {",": "Coma (,)", ";": "Punto y coma (;)", "\t": "Tabulador"}
 
 # =========================
 # REGISTRO DIARIO
 # =========================
+traza.bloque("REGISTRO DIARIO")
 st.subheader("Registro diario")
 
 with st.form("form_ventas", clear_on_submit=True):
@@ -83,13 +87,15 @@ with st.form("form_ventas", clear_on_submit=True):
         height=100
     )
 
-    guardar = st.form_submit_button("Guardar venta")
+    if vista_grupo:
+        st.caption("Vista de grupo: elige un local para registrar ventas.")
+    guardar = st.form_submit_button("Guardar venta", disabled=vista_grupo)
 
 if guardar:
     total = vm + vt + vn
 
-    nueva = pd.DataFrame([{
-        "fecha": pd.to_datetime(fecha),
+    registrar_venta({
+        "fecha": fecha,
         "ventas_manana_eur": vm,
         "ventas_tarde_eur": vt,
         "ventas_noche_eur": vn,
@@ -101,117 +107,209 @@ if guardar:
         "tickets_tarde": tt,
         "tickets_noche": tn,
         "observaciones": observaciones.strip()
-    }])
+    })
+    notificar_cambio("ventas", [particion(fecha)])
 
-    df = pd.concat([df, nueva], ignore_index=True)
-    df = df.drop_duplicates(subset=["fecha"], keep="last")
-    df.to_csv(DATA_FILE, index=False)
     st.success("Venta guardada correctamente")
     st.rerun()
 
-if df.empty:
-    st.info("Aún no hay ventas registradas.")
-    st.stop()
+# Histórico desde el TPV: un ticket por fila, una sola escritura por año
+with st.expander("Importar ventas del TPV"):
+    st.caption(
+        "Exportación con un ticket por fila (fecha_hora, importe, comensales) "
+        "en CSV o JSON lines. Los días importados sustituyen a los ya guardados."
+    )
+    exportacion = st.file_uploader(
+        "Exportación del TPV", type=["csv", "jsonl", "json"], disabled=vista_grupo
+    )
 
-# =========================
-# PREPARACIÓN ISO (REGLA CORRECTA GRANDES CADENAS)
-# =========================
-df = df.sort_values("fecha")
-iso = df["fecha"].dt.isocalendar()
-df["iso_year"] = iso.year
-df["iso_week"] = iso.week
-df["weekday"] = df["fecha"].dt.weekday
-df["dow"] = df["weekday"].map(DOW_ES)
+    # Formato del CSV (los TPV españoles suelen exportar ";" y coma decimal)
+    f1, f2, f3 = st.columns(3)
+    with f1:
+        sep = st.selectbox("Separador", SEPARADORES_TPV, format_func=SEPARADORES_TPV.get)
+    with f2:
+        decimal = st.selectbox("Separador decimal", [".", ","])
+    with f3:
+        dayfirst = st.checkbox("Fechas DD/MM/AAAA")
+
+    # Columnas del TPV (hora solo si viene separada de la fecha)
+    campos = {}
+    columnas_tpv = st.columns(len(CAMPOS_TPV))
+    for col, (campo, defecto) in zip(columnas_tpv, CAMPOS_TPV.items()):
+        with col:
+            campos[campo] = st.text_input(f"Columna {campo}", value=defecto or "").strip() or None
+
+    if exportacion is not None and st.button("Importar", disabled=vista_grupo):
+        exportacion.seek(0)
+        try:
+            resumen = importar(
+                exportacion, campos=campos, sep=sep, decimal=decimal, dayfirst=dayfirst
+            )
+        except ImportacionInvalida as e:
+            st.error(f"{e}. Revisa las columnas del TPV.")
+        except ValueError as e:
+            st.error(f"No se pudo leer la exportación ({e}). Revisa el separador y el decimal.")
+        else:
+            anios = anios_ventas()
+            st.success(
+                f"Importados {resumen['dias']} días de {resumen['tickets']} tickets "
+                f"({resumen['rechazadas']} filas rechazadas)"
+            )
+
+if not anios:
+    st.info("Aún no hay ventas registradas.")
+    traza.parar()
 
 # =========================
 # BLOQUE HOY
 # =========================
+traza.bloque("HOY")
 st.divider()
 st.subheader("HOY")
 
 fecha_hoy = pd.to_datetime(date.today())
-iso_hoy = fecha_hoy.isocalendar()
 
 inicio_dia = fecha_hoy.normalize()
-fin_dia = inicio_dia + pd.Timedelta(days=1)
 
-venta_hoy = df[
-    (df["fecha"] >= inicio_dia) &
-    (df["fecha"] < fin_dia)
-]
+# Día o rango a revisar (por defecto, hoy); con el rango a medio elegir
+# llega una sola fecha
+seleccion = st.date_input(
+    "Día o rango",
+    value=(date.today(), date.today()),
+    format="DD/MM/YYYY",
+    key="rango_hoy"
+)
+desde_sel = pd.Timestamp(seleccion[0])
+hasta_sel = pd.Timestamp(seleccion[-1])
+un_dia = desde_sel == hasta_sel
+
+if not un_dia:
+    etiqueta = "RANGO"
+elif desde_sel == inicio_dia:
+    etiqueta = "HOY"
+else:
+    etiqueta = "DÍA"
+
+# Cada día del rango frente a su comparable (mismo día de la misma semana
+# ISO del año anterior) en un solo cruce; días sin ventas a cero
+panel = comparar_ventas(
+    desde=desde_sel,
+    hasta=hasta_sel,
+    columnas=COLUMNAS_NUMERICAS,
+    completar=True
+)
+traza.filas(len(panel))
 
-def fila_o_cero(col):
-    return fila[col] if not venta_hoy.empty else 0
+hay_comp = panel["ventas_total_eur_comp"].notna()
+for col in COLUMNAS_NUMERICAS:
+    panel[f"{col}_comp"] = panel[f"{col}_comp"].fillna(0).astype(panel[col].dtype)
 
-if not venta_hoy.empty:
-    fila = venta_hoy.iloc[0]
+# Totales del rango (un día: sus propios valores)
+sel = {col: panel[col].sum() for col in COLUMNAS_NUMERICAS}
+ant = {col: panel[f"{col}_comp"].sum() for col in COLUMNAS_NUMERICAS}
+
+if un_dia:
+    fecha_sel_txt = f"{panel['dow'].iloc[0]} · {desde_sel.strftime('%d/%m/%Y')}"
+else:
+    fecha_sel_txt = (
+        f"{desde_sel.strftime('%d/%m/%Y')} → {hasta_sel.strftime('%d/%m/%Y')}"
+        f" · {len(panel)} días"
+    )
 
 # --- HOY ---
-vm_h = fila_o_cero("ventas_manana_eur")
-vt_h = fila_o_cero("ventas_tarde_eur")
-vn_h = fila_o_cero("ventas_noche_eur")
-total_h = fila_o_cero("ventas_total_eur")
+vm_h = sel["ventas_manana_eur"]
+vt_h = sel["ventas_tarde_eur"]
+vn_h = sel["ventas_noche_eur"]
+total_h = sel["ventas_total_eur"]
 
-cm_h = fila_o_cero("comensales_manana")
-ct_h = fila_o_cero("comensales_tarde")
-cn_h = fila_o_cero("comensales_noche")
+cm_h = sel["comensales_manana"]
+ct_h = sel["comensales_tarde"]
+cn_h = sel["comensales_noche"]
 
-tm_h = fila_o_cero("tickets_manana")
-tt_h = fila_o_cero("tickets_tarde")
-tn_h = fila_o_cero("tickets_noche")
+tm_h = sel["tickets_manana"]
+tt_h = sel["tickets_tarde"]
+tn_h = sel["tickets_noche"]
 
 # Ticket medio HOY
-tmed_m_h = vm_h / tm_h if tm_h > 0 else 0
-tmed_t_h = vt_h / tt_h if tt_h > 0 else 0
-tmed_n_h = vn_h / tn_h if tn_h > 0 else 0
-tmed_tot_h = total_h / (tm_h + tt_h + tn_h) if (tm_h + tt_h + tn_h) > 0 else 0
+tmed_m_h = ticket_medio(vm_h, tm_h)
+tmed_t_h = ticket_medio(vt_h, tt_h)
+tmed_n_h = ticket_medio(vn_h, tn_h)
+tmed_tot_h = ticket_medio(total_h, tm_h + tt_h + tn_h)
 
 # =========================
-# DOW AÑO ANTERIOR (MISMA SEMANA ISO)
+# PROYECCIÓN DEL CIERRE
 # =========================
-dow_ant = df[
-    (df["iso_year"] == iso_hoy.year - 1) &
-    (df["iso_week"] == iso_hoy.week) &
-    (df["weekday"] == fecha_hoy.weekday())
-]
+traza.bloque("PROYECCIÓN DEL CIERRE")
+# Día a medio registrar (p. ej. solo la mañana): los turnos pendientes se
+# estiman con el peso de cada turno en ese día de la semana (perfil de las
+# últimas semanas, cacheado por versión de las ventas). Solo hoy: un día
+# pasado ya está cerrado aunque algún turno quedara a 0.
+proyeccion = None
+if un_dia and desde_sel == inicio_dia:
+    proyeccion = proyeccion_cierre(
+        [vm_h, vt_h, vn_h],
+        perfil_turnos(desde_sel)
+    )
 
-if dow_ant.empty:
-    fecha_dow_txt = "Sin histórico comparable"
+proyectar = False
+if proyeccion is not None:
+    proyectar = st.toggle(
+        "Proyectar el cierre del día",
+        value=True,
+        help="Estima los turnos pendientes con su peso habitual en este día de la semana."
+    )
 
-    vm_a = vt_a = vn_a = total_a = 0.0
-    cm_a = ct_a = cn_a = 0
-    tm_a = tt_a = tn_a = 0
+# Ventas con las que se compara: las registradas o, proyectando, las estimadas
+if proyectar:
+    (vm_p, vt_p, vn_p), total_p, estimados = proyeccion
+    pendiente = dict(zip(("manana", "tarde", "noche"), estimados))
 else:
-    comp = dow_ant.iloc[0]
-    fecha_dow_txt = f"{DOW_ES[comp['weekday']]} · {comp['fecha'].strftime('%d/%m/%Y')}"
+    vm_p, vt_p, vn_p, total_p = vm_h, vt_h, vn_h, total_h
+    pendiente = {"manana": False, "tarde": False, "noche": False}
 
-    vm_a = comp["ventas_manana_eur"]
-    vt_a = comp["ventas_tarde_eur"]
-    vn_a = comp["ventas_noche_eur"]
-    total_a = comp["ventas_total_eur"]
+# Solo se proyectan ventas: en los turnos estimados, comensales y tickets
+# son los registrados hasta ahora
+parcial = {t: " (parcial, turno sin cerrar)" if p else "" for t, p in pendiente.items()}
 
-    cm_a = comp["comensales_manana"]
-    ct_a = comp["comensales_tarde"]
-    cn_a = comp["comensales_noche"]
+# =========================
+# DOW AÑO ANTERIOR (MISMA SEMANA ISO)
+# =========================
+traza.bloque("DOW AÑO ANTERIOR")
+if not hay_comp.any():
+    fecha_dow_txt = "Sin histórico comparable"
+elif un_dia:
+    comp = panel.iloc[0]
+    fecha_dow_txt = f"{comp['dow']} · {comp['fecha_comparable'].strftime('%d/%m/%Y')}"
+else:
+    fechas_comp = panel.loc[hay_comp, "fecha_comparable"]
+    fecha_dow_txt = (
+        f"{fechas_comp.min().strftime('%d/%m/%Y')} → {fechas_comp.max().strftime('%d/%m/%Y')}"
+        f" · {hay_comp.sum()} días"
+    )
+
+vm_a = ant["ventas_manana_eur"]
+vt_a = ant["ventas_tarde_eur"]
+vn_a = ant["ventas_noche_eur"]
+total_a = ant["ventas_total_eur"]
+
+cm_a = ant["comensales_manana"]
+ct_a = ant["comensales_tarde"]
+cn_a = ant["comensales_noche"]
 
-    tm_a = comp["tickets_manana"]
-    tt_a = comp["tickets_tarde"]
-    tn_a = comp["tickets_noche"]
+tm_a = ant["tickets_manana"]
+tt_a = ant["tickets_tarde"]
+tn_a = ant["tickets_noche"]
 
 # Ticket medio DOW
-tmed_m_a = vm_a / tm_a if tm_a > 0 else 0
-tmed_t_a = vt_a / tt_a if tt_a > 0 else 0
-tmed_n_a = vn_a / tn_a if tn_a > 0 else 0
-tmed_tot_a = total_a / (tm_a + tt_a + tn_a) if (tm_a + tt_a + tn_a) > 0 else 0
+tmed_m_a = ticket_medio(vm_a, tm_a)
+tmed_t_a = ticket_medio(vt_a, tt_a)
+tmed_n_a = ticket_medio(vn_a, tn_a)
+tmed_tot_a = ticket_medio(total_a, tm_a + tt_a + tn_a)
 
 # =========================
-# FUNCIONES VARIACIÓN
+# FUNCIONES VARIACIÓN (diff_pct en oyken.kpi)
 # =========================
-def diff_pct(actual, base):
-    d = actual - base
-    p = (d / base * 100) if base > 0 else (100.0 if actual > 0 else 0.0)
-    return d, p
-
+traza.bloque("FUNCIONES VARIACIÓN")
 def color(v):
     return "green" if v > 0 else "red" if v < 0 else "gray"
 
@@ -231,11 +329,12 @@ def icono(p):
 # =========================
 # CÁLCULOS VARIACIÓN
 # =========================
-# Ventas
-d_vm, p_vm = diff_pct(vm_h, vm_a)
-d_vt, p_vt = diff_pct(vt_h, vt_a)
-d_vn, p_vn = diff_pct(vn_h, vn_a)
-d_tot, p_tot = diff_pct(total_h, total_a)
+traza.bloque("CÁLCULOS VARIACIÓN")
+# Ventas (proyectadas si está activa la proyección del cierre)
+d_vm, p_vm = diff_pct(vm_p, vm_a)
+d_vt, p_vt = diff_pct(vt_p, vt_a)
+d_vn, p_vn = diff_pct(vn_p, vn_a)
+d_tot, p_tot = diff_pct(total_p, total_a)
 
 # Comensales
 d_cm = cm_h - cm_a
@@ -256,31 +355,40 @@ d_tmed_tot, p_tmed_tot = diff_pct(tmed_tot_h, tmed_tot_a)
 # =========================
 # DISPOSICIÓN VISUAL
 # =========================
+traza.bloque("DISPOSICIÓN VISUAL")
 c1, c2, c3 = st.columns(3)
 
 # HOY
 with c1:
-    st.markdown("**HOY**")
-    st.caption(f"{DOW_ES[fecha_hoy.weekday()]} · {fecha_hoy.strftime('%d/%m/%Y')}")
+    st.markdown(f"**{etiqueta}**")
+    st.caption(fecha_sel_txt)
 
     st.write("**Mañana**")
     st.write(f"{vm_h:,.2f} €")
+    if pendiente["manana"]:
+        st.caption(f"Proyección: {vm_p:,.2f} €")
     st.caption(f"{cm_h} comensales · {tm_h} tickets")
     st.caption(f"Ticket medio: {tmed_m_h:,.2f} €")
 
     st.write("**Tarde**")
     st.write(f"{vt_h:,.2f} €")
+    if pendiente["tarde"]:
+        st.caption(f"Proyección: {vt_p:,.2f} €")
     st.caption(f"{ct_h} comensales · {tt_h} tickets")
     st.caption(f"Ticket medio: {tmed_t_h:,.2f} €")
 
     st.write("**Noche**")
     st.write(f"{vn_h:,.2f} €")
+    if pendiente["noche"]:
+        st.caption(f"Proyección: {vn_p:,.2f} €")
     st.caption(f"{cn_h} comensales · {tn_h} tickets")
     st.caption(f"Ticket medio: {tmed_n_h:,.2f} €")
 
     st.markdown("---")
-    st.markdown(f"### TOTAL HOY\n{total_h:,.2f} €")
+    st.markdown(f"### TOTAL {etiqueta}\n{total_h:,.2f} €")
     st.caption(f"Ticket medio: {tmed_tot_h:,.2f} €")
+    if proyectar:
+        st.markdown(f"**Cierre proyectado:** {total_p:,.2f} €")
 
 # DOW
 with c2:
@@ -309,14 +417,16 @@ with c2:
 # VARIACIÓN
 with c3:
     st.markdown("**VARIACIÓN**")
-    st.caption("Vs. DOW año anterior")
+    st.caption(
+        "Proyección de ventas vs. DOW año anterior" if proyectar else "Vs. DOW año anterior"
+    )
 
     st.write("**Mañana**")
     st.markdown(
         f"<span style='color:{color(d_vm)}'>{d_vm:+,.2f} € ({p_vm:+.1f}%) {icono(p_vm)}</span>",
         unsafe_allow_html=True
     )
-    st.caption(f"{d_cm:+} comensales · {d_tm:+} tickets")
+    st.caption(f"{d_cm:+} comensales · {d_tm:+} tickets{parcial['manana']}")
     st.caption(
         f"Ticket medio: {d_tmed_m:+.2f} € ({p_tmed_m:+.1f}%) {icono(p_tmed_m)}"
     )
@@ -326,7 +436,7 @@ with c3:
         f"<span style='color:{color(d_vt)}'>{d_vt:+,.2f} € ({p_vt:+.1f}%) {icono(p_vt)}</span>",
         unsafe_allow_html=True
     )
-    st.caption(f"{d_ct:+} comensales · {d_tt:+} tickets")
+    st.caption(f"{d_ct:+} comensales · {d_tt:+} tickets{parcial['tarde']}")
     st.caption(
         f"Ticket medio: {d_tmed_t:+.2f} € ({p_tmed_t:+.1f}%) {icono(p_tmed_t)}"
     )
@@ -336,7 +446,7 @@ with c3:
         f"<span style='color:{color(d_vn)}'>{d_vn:+,.2f} € ({p_vn:+.1f}%) {icono(p_vn)}</span>",
         unsafe_allow_html=True
     )
-    st.caption(f"{d_cn:+} comensales · {d_tn:+} tickets")
+    st.caption(f"{d_cn:+} comensales · {d_tn:+} tickets{parcial['noche']}")
     st.caption(
         f"Ticket medio: {d_tmed_n:+.2f} € ({p_tmed_n:+.1f}%) {icono(p_tmed_n)}"
     )
@@ -344,7 +454,7 @@ with c3:
     st.markdown("---")
     st.markdown(
         f"<span style='color:{color(d_tot)}'>"
-        f" TOTAL {d_tot:+,.2f} € ({p_tot:+.1f}%)"
+        f" TOTAL{' PROYECTADO' if proyectar else ''} {d_tot:+,.2f} € ({p_tot:+.1f}%)"
         f"</span>",
         unsafe_allow_html=True
     )
@@ -352,38 +462,153 @@ with c3:
         f"Ticket medio: {d_tmed_tot:+.2f} € ({p_tmed_tot:+.1f}%) {icono(p_tmed_tot)}"
     )
 
+# =========================
+# DETALLE POR DÍA
+# =========================
+traza.bloque("DETALLE POR DÍA")
+# El mismo panel, un día por fila (vectorizado sobre el cruce)
+TURNOS = {"manana": "Mañana", "tarde": "Tarde", "noche": "Noche", "total": "Total"}
+
+for sufijo in ("", "_comp"):
+    for campo in ("comensales", "tickets"):
+        panel[f"{campo}_total{sufijo}"] = sum(
+            panel[f"{campo}_{t}{sufijo}"] for t in ("manana", "tarde", "noche")
+        )
+
+detalle = pd.DataFrame({
+    "fecha": panel["fecha"].dt.date,
+    "dia": panel["dow"],
+    "fecha_dow": panel["fecha_comparable"].where(hay_comp).dt.date,
+})
+for t in TURNOS:
+    ventas_t, ventas_dow = panel[f"ventas_{t}_eur"], panel[f"ventas_{t}_eur_comp"]
+    tickets_t, tickets_dow = panel[f"tickets_{t}"], panel[f"tickets_{t}_comp"]
+    tmed_t = ticket_medio_serie(ventas_t, tickets_t)
+    tmed_dow = ticket_medio_serie(ventas_dow, tickets_dow)
+
+    d_v, p_v = diff_pct_serie(ventas_t, ventas_dow)
+    d_tmed, p_tmed = diff_pct_serie(tmed_t, tmed_dow)
+
+    detalle[f"ventas_{t}_eur"] = ventas_t
+    detalle[f"ventas_{t}_eur_dow"] = ventas_dow
+    detalle[f"var_ventas_{t}_eur"] = d_v
+    detalle[f"var_ventas_{t}_pct"] = p_v
+    detalle[f"comensales_{t}"] = panel[f"comensales_{t}"]
+    detalle[f"comensales_{t}_dow"] = panel[f"comensales_{t}_comp"]
+    detalle[f"tickets_{t}"] = tickets_t
+    detalle[f"tickets_{t}_dow"] = tickets_dow
+    detalle[f"ticket_medio_{t}_eur"] = tmed_t
+    detalle[f"ticket_medio_{t}_eur_dow"] = tmed_dow
+    detalle[f"var_ticket_medio_{t}_pct"] = p_tmed
+
+if not un_dia:
+    with st.expander(f"Detalle por día · {len(detalle)} días"):
+        st.dataframe(
+            detalle[[
+                "fecha", "dia", "fecha_dow",
+                "ventas_total_eur", "ventas_total_eur_dow",
+                "var_ventas_total_eur", "var_ventas_total_pct",
+                "ticket_medio_total_eur", "var_ticket_medio_total_pct",
+            ]],
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "fecha": st.column_config.DateColumn("Fecha", format="DD/MM/YYYY"),
+                "dia": "Día",
+                "fecha_dow": st.column_config.DateColumn("DOW año anterior", format="DD/MM/YYYY"),
+                "ventas_total_eur": st.column_config.NumberColumn("Ventas (€)", format="%.2f"),
+                "ventas_total_eur_dow": st.column_config.NumberColumn("Ventas DOW (€)", format="%.2f"),
+                "var_ventas_total_eur": st.column_config.NumberColumn("Variación (€)", format="%+.2f"),
+                "var_ventas_total_pct": st.column_config.NumberColumn("Variación (%)", format="%+.1f"),
+                "ticket_medio_total_eur": st.column_config.NumberColumn("Ticket medio (€)", format="%.2f"),
+                "var_ticket_medio_total_pct": st.column_config.NumberColumn("Ticket medio (%)", format="%+.1f"),
+            }
+        )
+
+st.download_button(
+    "Descargar detalle (CSV)",
+    # El CSV se genera solo al pulsar (no en cada rerun)
+    data=lambda detalle=detalle: detalle.to_csv(index=False).encode("utf-8"),
+    file_name=(
+        f"oyken_hoy_vs_dow_{desde_sel.strftime('%Y%m%d')}_{hasta_sel.strftime('%Y%m%d')}.csv"
+    ),
+    mime="text/csv"
+)
+
 # =========================
 # BITÁCORA DEL MES
 # =========================
+traza.bloque("BITÁCORA")
 st.divider()
 st.subheader("Ventas del mes (bitácora viva)")
 
-df_mes = df[
-    (df["fecha"].dt.month == fecha_hoy.month) &
-    (df["fecha"].dt.year == fecha_hoy.year)
-].copy()
+# Filas por página: solo la página visible se formatea y se envía al navegador
+FILAS_BITACORA = (15, 31, 62, 100)
 
-df_mes["fecha_display"] = df_mes["fecha"].dt.strftime("%d-%m-%Y")
-df_mes["fecha_display"] = df_mes.apply(
-    lambda r: f"{r['fecha_display']} 👁️" if r["observaciones"].strip() else r["fecha_display"],
-    axis=1
+COLUMNAS_BITACORA = [
+    "ventas_manana_eur", "ventas_tarde_eur", "ventas_noche_eur", "ventas_total_eur",
+    "comensales_manana", "comensales_tarde", "comensales_noche",
+    "tickets_manana", "tickets_tarde", "tickets_noche",
+    "observaciones",
+]
+
+# Por defecto, el mes en curso; admite cualquier rango
+rango_bitacora = st.date_input(
+    "Rango de la bitácora",
+    value=(inicio_dia.replace(day=1).date(), (inicio_dia + pd.offsets.MonthEnd(0)).date()),
+    format="DD/MM/YYYY",
+    key="rango_bitacora"
 )
+df_mes = cargar_ventas(
+    desde=pd.Timestamp(rango_bitacora[0]),
+    hasta=pd.Timestamp(rango_bitacora[-1]),
+    columnas=COLUMNAS_BITACORA
+)
+traza.filas(len(df_mes))
+
+b1, b2, b3 = st.columns([1, 1, 2])
+with b1:
+    filas_pagina = st.selectbox("Filas por página", FILAS_BITACORA, index=1, key="filas_bitacora")
+paginas = max(1, -(-len(df_mes) // filas_pagina))
+# Un rango más corto puede dejar la página guardada fuera de rango
+if st.session_state.get("pagina_bitacora", 1) > paginas:
+    st.session_state["pagina_bitacora"] = paginas
+with b2:
+    pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key="pagina_bitacora")
+with b3:
+    st.caption(f"{len(df_mes)} días · página {pagina} de {paginas}")
+
+# Formato vectorizado, solo de la página visible: 👁️ en los días con observaciones
+visible = df_mes.iloc[(pagina - 1) * filas_pagina:pagina * filas_pagina]
+fecha_txt = visible["fecha"].dt.strftime("%d-%m-%Y")
+con_nota = visible["observaciones"].fillna("").str.strip().ne("")
+bitacora = visible[["dow", *COLUMNAS_BITACORA]].copy()
+bitacora.insert(0, "fecha", fecha_txt.where(~con_nota, fecha_txt + " 👁️"))
 
 st.dataframe(
-    df_mes[[
-        "fecha_display", "dow",
-        "ventas_manana_eur", "ventas_tarde_eur", "ventas_noche_eur",
-        "ventas_total_eur",
-        "comensales_manana", "comensales_tarde", "comensales_noche",
-        "tickets_manana", "tickets_tarde", "tickets_noche",
-        "observaciones"
-    ]].rename(columns={"fecha_display": "fecha"}),
+    bitacora,
     hide_index=True,
-    use_container_width=True
+    use_container_width=True,
+    column_config={
+        "fecha": "Fecha",
+        "dow": "Día",
+        "ventas_manana_eur": st.column_config.NumberColumn("Ventas mañana (€)", format="%.2f"),
+        "ventas_tarde_eur": st.column_config.NumberColumn("Ventas tarde (€)", format="%.2f"),
+        "ventas_noche_eur": st.column_config.NumberColumn("Ventas noche (€)", format="%.2f"),
+        "ventas_total_eur": st.column_config.NumberColumn("Ventas total (€)", format="%.2f"),
+        "comensales_manana": "Comensales mañana",
+        "comensales_tarde": "Comensales tarde",
+        "comensales_noche": "Comensales noche",
+        "tickets_manana": "Tickets mañana",
+        "tickets_tarde": "Tickets tarde",
+        "tickets_noche": "Tickets noche",
+        "observaciones": st.column_config.TextColumn("Observaciones", width="large"),
+    }
 )
 # =========================
 # CIERRE MENSUAL · VENTAS
 # =========================
+traza.bloque("CIERRE MENSUAL · VENTAS")
 st.divider()
 st.subheader("Cierre mensual · Ventas")
 
@@ -401,24 +626,24 @@ with c_mes:
 with c_ano:
     ano_sel = st.selectbox(
         "Año",
-        options=sorted(df["fecha"].dt.year.unique()),
-        index=len(sorted(df["fecha"].dt.year.unique())) - 1,
+        options=anios,
+        index=len(anios) - 1,
         key="anio_cierre_mensual"
     )
 
 
-df_cierre = df[
-    (df["fecha"].dt.month == mes_sel) &
-    (df["fecha"].dt.year == ano_sel)
-]
+inicio_cierre = pd.Timestamp(int(ano_sel), mes_sel, 1)
+# Totales por día materializados al guardar (ventas_kpi_diario)
+df_cierre = cargar_kpi_diario(
+    desde=inicio_cierre,
+    hasta=inicio_cierre + pd.offsets.MonthEnd(0),
+    columnas=["ventas_total_eur", "tickets_total"]
+)
+traza.filas(len(df_cierre))
 
 ventas_mes = df_cierre["ventas_total_eur"].sum()
 dias_operados = df_cierre["fecha"].nunique()
-ticket_medio_mes = (
-    ventas_mes / df_cierre[["tickets_manana", "tickets_tarde", "tickets_noche"]].sum().sum()
-    if df_cierre[["tickets_manana", "tickets_tarde", "tickets_noche"]].sum().sum() > 0
-    else 0
-)
+ticket_medio_mes = ticket_medio(ventas_mes, df_cierre["tickets_total"].sum())
 
 c1, c2, c3 = st.columns(3)
 
@@ -434,20 +659,11 @@ with c3:
 # =========================
 # TABLA DE VENTAS POR MES
 # =========================
+traza.bloque("TABLA DE VENTAS POR MES")
 
 st.divider()
 st.subheader("Ventas mensuales")
 
-from datetime import datetime
-
-VENTAS_MENSUALES_FILE = Path("ventas_mensuales.csv")
-
-# Crear CSV mensual si no existe (OUTPUT consolidado)
-if not VENTAS_MENSUALES_FILE.exists():
-    pd.DataFrame(
-        columns=["anio", "mes", "ventas_total_eur", "fecha_actualizacion"]
-    ).to_csv(VENTAS_MENSUALES_FILE, index=False)
-
 # Mapa meses español (NO locale)
 MESES_ES = {
     1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
@@ -462,7 +678,7 @@ MESES_ES = {
 col1, col2 = st.columns(2)
 
 with col1:
-    anios_disponibles = sorted(df["fecha"].dt.year.unique())
+    anios_disponibles = anios
     anio_sel = st.selectbox(
         "Año",
         anios_disponibles,
@@ -479,70 +695,22 @@ with col2:
     )
 
 # -------------------------
-# FILTRADO (BASE OPERATIVA)
-# -------------------------
-
-df_base = df.copy()
-df_base["fecha"] = pd.to_datetime(df_base["fecha"])
-df_base["ventas_total_eur"] = pd.to_numeric(
-    df_base["ventas_total_eur"],
-    errors="coerce"
-).fillna(0)
-
-df_filtrado = df_base[df_base["fecha"].dt.year == anio_sel]
-
-if mes_sel != 0:
-    df_filtrado = df_filtrado[df_filtrado["fecha"].dt.month == mes_sel]
-
-# -------------------------
-# CONSOLIDACIÓN Y GUARDADO
-# -------------------------
-
-df_vm = pd.read_csv(VENTAS_MENSUALES_FILE)
-
-df_vm["anio"] = pd.to_numeric(df_vm.get("anio"), errors="coerce")
-df_vm["mes"] = pd.to_numeric(df_vm.get("mes"), errors="coerce")
-
-for mes in range(1, 13):
-    if mes_sel != 0 and mes != mes_sel:
-        continue
-
-    ventas_mes = df_filtrado[
-        df_filtrado["fecha"].dt.month == mes
-    ]["ventas_total_eur"].sum()
-
-    # Overwrite por año + mes
-    df_vm = df_vm[~(
-        (df_vm["anio"] == anio_sel) &
-        (df_vm["mes"] == mes)
-    )]
-
-    df_vm = pd.concat(
-        [
-            df_vm,
-            pd.DataFrame([{
-                "anio": int(anio_sel),
-                "mes": int(mes),
-                "ventas_total_eur": float(ventas_mes),
-                "fecha_actualizacion": datetime.now()
-            }])
-        ],
-        ignore_index=True
-    )
-
-df_vm = df_vm.sort_values(["anio", "mes"])
-df_vm.to_csv(VENTAS_MENSUALES_FILE, index=False)
-
-# -------------------------
-# LECTURA CANÓNICA (CSV)
+# LECTURA CANÓNICA
 # -------------------------
+# ventas_mensuales se consolida al guardar ventas; aquí solo se lee.
 
-df_vm = pd.read_csv(VENTAS_MENSUALES_FILE)
+df_vm = leer_fresco("ventas_mensuales")
+traza.filas(len(df_vm))
 
-df_vm = df_vm[df_vm["anio"] == anio_sel]
+meses_tabla = list(MESES_ES) if mes_sel == 0 else [mes_sel]
 
-if mes_sel != 0:
-    df_vm = df_vm[df_vm["mes"] == mes_sel]
+df_vm = (
+    df_vm[df_vm["anio"] == anio_sel]
+    .set_index("mes")["ventas_total_eur"]
+    .reindex(meses_tabla, fill_value=0.0)
+    .rename_axis("mes")
+    .reset_index()
+)
 
 df_vm["Mes"] = df_vm["mes"].map(MESES_ES)
 df_vm["Ventas del mes (€)"] = df_vm["ventas_total_eur"].round(2)
@@ -559,3 +727,5 @@ st.metric(
     "Total ventas período",
     f"{tabla_meses['Ventas del mes (€)'].sum():,.2f} €"
 )
+
+traza.fin()
@@ -1,59 +1,55 @@
 import streamlit as st
 import pandas as pd
-from pathlib import Path
 from datetime import date
 
+from oyken import compartido, locales, rendimiento
+from oyken.catalogos import FAMILIAS_COMPRAS
+from oyken.derivados import asegurar_consolidados, notificar_cambio, particion
+from oyken.storage import ConflictoVersion, almacen
+
+traza = rendimiento.pagina(__file__)
+
 # =========================
 # CONFIGURACIÓN
 # =========================
+traza.bloque("CONFIGURACIÓN")
 
 st.title("OYKEN · Compras")
 st.divider()
 
 # =========================
-# ARCHIVOS
+# ALMACÉN
 # =========================
-COMPRAS_FILE = Path("compras.csv")
-PROVEEDORES_FILE = Path("proveedores.csv")
+traza.bloque("ALMACÉN")
+# Local activo (barra lateral): esta página trabaja sobre un solo local
+locales.selector(grupo=False)
+ALMACEN = almacen()
 
 # =========================
 # ESTADO: PROVEEDORES (MAESTRO)
 # =========================
-if "proveedores" not in st.session_state:
-    if PROVEEDORES_FILE.exists():
-        st.session_state.proveedores = (
-            pd.read_csv(PROVEEDORES_FILE)["Proveedor"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .unique()
-            .tolist()
-        )
-    else:
-        st.session_state.proveedores = []
+traza.bloque("ESTADO · PROVEEDORES")
+# Maestro y compras: una copia por proceso (oyken.compartido), no una por sesión
+proveedores = [
+    p for p in
+    compartido.tabla("proveedores", ALMACEN)["Proveedor"].str.strip().unique().tolist()
+    if p
+]
 
 # Normalizar y ordenar siempre
-st.session_state.proveedores = sorted(
-    set(st.session_state.proveedores),
-    key=lambda x: x.upper()
-)
+proveedores = sorted(set(proveedores), key=lambda x: x.upper())
 
 # =========================
 # ESTADO: COMPRAS
 # =========================
-if "compras" not in st.session_state:
-    if COMPRAS_FILE.exists():
-        st.session_state.compras = pd.read_csv(COMPRAS_FILE)
-    else:
-        st.session_state.compras = pd.DataFrame(
-            columns=["Fecha", "Proveedor", "Familia", "Coste (€)"]
-        )
-
-FAMILIAS = ["Materia prima", "Bebidas", "Limpieza", "Otros"]
+traza.bloque("ESTADO · COMPRAS")
+compras, version_compras = compartido.tabla_versionada("compras", ALMACEN)
+traza.filas(len(compras))
 
 # =========================================================
 # REGISTRAR COMPRA
 # =========================================================
+traza.bloque("REGISTRAR COMPRA")
 st.subheader("Registrar compra")
 
 with st.container(border=True):
@@ -71,12 +67,12 @@ with st.container(border=True):
         with c2:
             proveedor = st.selectbox(
                 "Proveedor",
-                st.session_state.proveedores,
+                proveedores,
                 placeholder="Seleccionar proveedor"
             )
 
         with c3:
-            familia = st.selectbox("Familia", FAMILIAS)
+            familia = st.selectbox("Familia", FAMILIAS_COMPRAS)
 
         coste = st.number_input(
             "Coste total (€)",
@@ -92,7 +88,7 @@ with st.container(border=True):
 
         if registrar:
             if not proveedor or coste <= 0:
-                st.stop()
+                traza.parar()
 
             nueva_compra = {
                 "Fecha": fecha.strftime("%d/%m/%Y"),
@@ -101,17 +97,16 @@ with st.container(border=True):
                 "Coste (€)": round(coste, 2)
             }
 
-            st.session_state.compras = pd.concat(
-                [st.session_state.compras, pd.DataFrame([nueva_compra])],
-                ignore_index=True
-            )
-
-            st.session_state.compras.to_csv(COMPRAS_FILE, index=False)
+            # Escritura diferida: journal ahora, volcado por lotes (oyken.compartido)
+            compartido.anotar("compras", nueva_compra, ALMACEN)
+            compras, version_compras = compartido.tabla_versionada("compras", ALMACEN)
+            notificar_cambio("compras", [particion(fecha)], ALMACEN)
             st.success("Compra registrada")
 
 # =========================================================
 # GESTIÓN DE PROVEEDORES
 # =========================================================
+traza.bloque("GESTIÓN DE PROVEEDORES")
 st.divider()
 st.subheader("Gestión de proveedores")
 
@@ -127,32 +122,33 @@ with st.container(border=True):
         nombre = nuevo_proveedor.strip()
 
         if not nombre:
-            st.stop()
+            traza.parar()
 
-        existentes_upper = [p.upper() for p in st.session_state.proveedores]
+        existentes_upper = [p.upper() for p in proveedores]
 
         if nombre.upper() in existentes_upper:
             st.warning("Este proveedor ya existe. No se ha guardado.")
-            st.stop()
+            traza.parar()
 
-        st.session_state.proveedores.append(nombre)
+        proveedores.append(nombre)
 
-        # Normalizar, ordenar y persistir
-        st.session_state.proveedores = sorted(
-            set(st.session_state.proveedores),
-            key=lambda x: x.upper()
-        )
+        # Normalizar, ordenar y persistir (sobre el maestro vigente)
+        proveedores = sorted(set(proveedores), key=lambda x: x.upper())
 
-        pd.DataFrame(
-            {"Proveedor": st.session_state.proveedores}
-        ).to_csv(PROVEEDORES_FILE, index=False)
+        compartido.actualizar(
+            "proveedores",
+            lambda df: pd.DataFrame({"Proveedor": sorted(
+                set(df["Proveedor"].str.strip()) - {""} | {nombre},
+                key=lambda x: x.upper()
+            )}),
+            ALMACEN
+        )
 
         st.success("Proveedor guardado")
 
-if st.session_state.proveedores:
+if proveedores:
     st.markdown("**Proveedores existentes**")
 
-    proveedores = st.session_state.proveedores
     filas = [proveedores[i:i+3] for i in range(0, len(proveedores), 3)]
 
     for fila in filas:
@@ -179,14 +175,15 @@ if st.session_state.proveedores:
 # =========================================================
 # RESUMEN
 # =========================================================
+traza.bloque("RESUMEN")
 st.divider()
 st.subheader("Resumen")
 
 total = (
-    st.session_state.compras["Coste (€)"].sum()
-    if not st.session_state.compras.empty else 0
+    compras["Coste (€)"].sum()
+    if not compras.empty else 0
 )
-num_compras = len(st.session_state.compras)
+num_compras = len(compras)
 
 c1, c2 = st.columns(2)
 c1.metric("Total registrado (€)", f"{total:.2f}")
@@ -195,12 +192,13 @@ c2.metric("Nº de compras", num_compras)
 # =========================================================
 # HISTÓRICO
 # =========================================================
+traza.bloque("HISTÓRICO")
 st.divider()
 st.subheader("Histórico de compras")
 
-if not st.session_state.compras.empty:
+if not compras.empty:
     st.dataframe(
-        st.session_state.compras,
+        compras,
         hide_index=True,
         use_container_width=True
     )
@@ -208,46 +206,46 @@ if not st.session_state.compras.empty:
 # =========================================================
 # CORRECCIÓN DE ERRORES
 # =========================================================
+traza.bloque("CORRECCIÓN DE ERRORES")
 st.divider()
 st.subheader("Corrección de errores")
 
 with st.container(border=True):
 
-    if not st.session_state.compras.empty:
+    if not compras.empty:
 
         idx = st.selectbox(
             "Selecciona una compra",
-            st.session_state.compras.index,
-            format_func=lambda i: (
-                f'{st.session_state.compras.loc[i,"Fecha"]} · '
-                f'{st.session_state.compras.loc[i,"Proveedor"]} · '
-                f'{st.session_state.compras.loc[i,"Coste (€)"]:.2f} €'
+            compras.index,
+            # Etiquetas ligadas a la tabla mostrada
+            format_func=lambda i, df=compras: (
+                f'{df.loc[i,"Fecha"]} · '
+                f'{df.loc[i,"Proveedor"]} · '
+                f'{df.loc[i,"Coste (€)"]:.2f} €'
             )
         )
 
         if st.button("Eliminar compra", use_container_width=True):
 
-            st.session_state.compras = (
-                st.session_state.compras
-                .drop(idx)
-                .reset_index(drop=True)
-            )
-
-            st.session_state.compras.to_csv(COMPRAS_FILE, index=False)
+            fecha_eliminada = compras.loc[idx, "Fecha"]
+            try:
+                compras = compartido.publicar(
+                    "compras", compras.drop(idx), ALMACEN, version=version_compras
+                )
+            except ConflictoVersion:
+                st.warning("Otro usuario ha modificado las compras. Revisa la selección y vuelve a intentarlo.")
+                traza.parar()
+            notificar_cambio("compras", [particion(fecha_eliminada)], ALMACEN)
             st.success("Compra eliminada")
 
 # =========================================================
 # COMPRAS MENSUALES · CONSOLIDADO (FASE 1)
 # =========================================================
+traza.bloque("COMPRAS MENSUALES")
 
 st.divider()
 st.subheader("Compras mensuales")
 
-from pathlib import Path
-from datetime import datetime
-
-COMPRAS_MENSUALES_FILE = Path("compras_mensuales.csv")
-
 # -------------------------
 # MAPA MESES ESPAÑOL
 # -------------------------
@@ -260,7 +258,7 @@ MESES_ES = {
 # -------------------------
 # PREPARAR DATOS OPERATIVOS
 # -------------------------
-df_compras = st.session_state.compras.copy()
+df_compras = compras.copy()
 
 df_compras["Fecha"] = pd.to_datetime(
     df_compras["Fecha"],
@@ -268,11 +266,6 @@ df_compras["Fecha"] = pd.to_datetime(
     errors="coerce"
 )
 
-df_compras["Coste (€)"] = pd.to_numeric(
-    df_compras["Coste (€)"],
-    errors="coerce"
-).fillna(0)
-
 # -------------------------
 # SELECTORES
 # -------------------------
@@ -343,6 +336,7 @@ st.metric(
 # =========================================================
 # COSTE DE PRODUCTO SOBRE VENTAS · BLOQUE ESTRUCTURAL OYKEN
 # =========================================================
+traza.bloque("COSTE DE PRODUCTO")
 
 st.divider()
 st.subheader("Coste de producto sobre ventas")
@@ -352,11 +346,6 @@ st.caption(
     "Este valor se utiliza como referencia de margen bruto en OYKEN."
 )
 
-# -------------------------
-# ARCHIVO CANÓNICO DEL PORCENTAJE
-# -------------------------
-COSTE_PRODUCTO_FILE = Path("coste_producto.csv")
-
 # -------------------------
 # LECTURA DE COMPRAS DEL PERIODO
 # -------------------------
@@ -365,21 +354,17 @@ compras_periodo = tabla_compras_mensuales["Compras del mes (€)"].sum()
 # -------------------------
 # LECTURA DE VENTAS MENSUALES (FUENTE CANÓNICA)
 # -------------------------
-VENTAS_MENSUALES_FILE = Path("ventas_mensuales.csv")
+asegurar_consolidados(ALMACEN, ["ventas_mensuales"])
 
-if not VENTAS_MENSUALES_FILE.exists():
+if not ALMACEN.existe("ventas_mensuales"):
     st.warning(
         "No existen ventas mensuales consolidadas. "
         "No se puede calcular el coste de producto."
     )
-    st.stop()
+    traza.parar()
 
-df_ventas = pd.read_csv(VENTAS_MENSUALES_FILE)
-
-required_cols = {"anio", "mes", "ventas_total_eur"}
-if not required_cols.issubset(df_ventas.columns):
-    st.error("El archivo de ventas mensuales no tiene el formato esperado.")
-    st.stop()
+df_ventas = ALMACEN.leer("ventas_mensuales")
+traza.filas(len(df_ventas))
 
 ventas_filtradas = df_ventas[
     (df_ventas["anio"] == anio_sel) &
@@ -393,18 +378,19 @@ ventas_periodo = ventas_filtradas["ventas_total_eur"].sum()
 
 if ventas_periodo <= 0:
     st.warning("Las ventas del período son cero. No se puede calcular el porcentaje.")
-    st.stop()
+    traza.parar()
 
 # -------------------------
 # VALIDACIÓN
 # -------------------------
 if ventas_periodo <= 0:
     st.warning("Las ventas del período son cero. No se puede calcular el porcentaje.")
-    st.stop()
+    traza.parar()
 
 # =========================================================
-# COSTE DE PRODUCTO SOBRE VENTAS · BLOQUE ESTRUCTURAL OYKEN
+# COSTE DE PRODUCTO SOBRE VENTAS · CÁLCULO
 # =========================================================
+traza.bloque("COSTE DE PRODUCTO · CÁLCULO")
 
 # ---------------------------------------------------------
 # SUBBLOQUE 1 · CÁLCULO INTERNO (NO VISIBLE)
@@ -438,86 +424,10 @@ st.metric(
     f"{porcentaje_coste:.2%}"
 )
 
-
 # ---------------------------------------------------------
-# SUBBLOQUE 3 · GUARDADO AUTOMÁTICO (CCV CANÓNICO)
+# SUBBLOQUE 3 · CONSOLIDADO CANÓNICO
 # ---------------------------------------------------------
-# Este bloque persiste el dato automáticamente
-# para que pueda ser leído por Breakeven y otros módulos.
-
-COSTE_PRODUCTO_FILE = Path("coste_producto.csv")
-
-# Crear CSV si no existe
-if not COSTE_PRODUCTO_FILE.exists():
-    pd.DataFrame(
-        columns=[
-            "anio",
-            "mes",
-            "coste_producto_pct",
-            "fecha_actualizacion"
-        ]
-    ).to_csv(COSTE_PRODUCTO_FILE, index=False)
-
-# Cargar histórico
-df_hist = pd.read_csv(COSTE_PRODUCTO_FILE)
-
-# Overwrite limpio por año + mes
-df_hist = df_hist[
-    ~(
-        (df_hist["anio"] == anio_sel) &
-        (df_hist["mes"] == mes_sel)
-    )
-]
-
-# Nuevo registro
-nuevo_registro = pd.DataFrame([{
-    "anio": anio_sel,
-    "mes": mes_sel,
-    "coste_producto_pct": round(porcentaje_coste, 4),
-    "fecha_actualizacion": datetime.now()
-}])
-
-# Guardado final
-df_final = pd.concat([df_hist, nuevo_registro], ignore_index=True)
-df_final = df_final.sort_values(["anio", "mes"])
-df_final.to_csv(COSTE_PRODUCTO_FILE, index=False)
-
-# -------------------------
-# GUARDAR CSV MENSUAL (CANÓNICO)
-# -------------------------
-
-# Crear CSV si no existe
-if not COMPRAS_MENSUALES_FILE.exists():
-    pd.DataFrame(
-        columns=["anio", "mes", "compras_total_eur", "fecha_actualizacion"]
-    ).to_csv(COMPRAS_MENSUALES_FILE, index=False)
-
-# Preparar datos a guardar (desde la tabla visible)
-df_csv = tabla_compras_mensuales.copy()
-
-df_csv["mes"] = df_csv["Mes"].map(
-    {v: k for k, v in MESES_ES.items()}
-)
-df_csv["anio"] = anio_sel
-df_csv["compras_total_eur"] = df_csv["Compras del mes (€)"]
-
-df_csv = df_csv[["anio", "mes", "compras_total_eur"]]
-
-# Cargar histórico
-df_hist = pd.read_csv(COMPRAS_MENSUALES_FILE)
-
-# Eliminar meses existentes del mismo año (overwrite limpio)
-df_hist = df_hist[
-    ~(
-        (df_hist["anio"] == anio_sel) &
-        (df_hist["mes"].isin(df_csv["mes"]))
-    )
-]
-
-# Añadir timestamp
-df_csv["fecha_actualizacion"] = datetime.now()
+# compras_mensuales y coste_producto se consolidan al registrar
+# o eliminar compras (oyken.derivados); la vista no escribe.
 
-# Guardar final
-df_final = pd.concat([df_hist, df_csv], ignore_index=True)
-df_final = df_final.sort_values(["anio", "mes"])
-df_final.to_csv(COMPRAS_MENSUALES_FILE, index=False)
+traza.fin()
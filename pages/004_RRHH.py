@@ -1,12 +1,18 @@
 import streamlit as st
 import pandas as pd
-from pathlib import Path
 from datetime import date
 
+from oyken import locales, rendimiento, rrhh
+from oyken.catalogos import ROLES_RRHH
+from oyken.derivados import notificar_cambio, particiones_anio
+from oyken.storage import ConflictoVersion, almacen
+
+traza = rendimiento.pagina(__file__)
 
 # =====================================================
 # CONFIGURACIÓN
 # =====================================================
+traza.bloque("CONFIGURACIÓN")
 
 st.title("OYKEN · RRHH")
 st.caption("Planificación estructural de personal")
@@ -14,41 +20,47 @@ st.caption("Planificación estructural de personal")
 # =====================================================
 # CONSTANTES
 # =====================================================
+traza.bloque("CONSTANTES")
 
 MESES = [
     "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
     "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
 ]
 
-SS_EMPRESA = 0.33
-PUESTOS_FILE = Path("rrhh_puestos.csv")
+# Local activo (barra lateral): esta página trabaja sobre un solo local
+locales.selector(grupo=False)
+ALMACEN = almacen()
 
 # =====================================================
 # UTILIDADES DE PERSISTENCIA
 # =====================================================
+traza.bloque("PERSISTENCIA")
 
 def cargar_puestos():
-    if PUESTOS_FILE.exists():
-        df = pd.read_csv(PUESTOS_FILE)
-
-        # Compatibilidad retroactiva OYKEN
-        if "Rol_RRHH" not in df.columns:
-            df["Rol_RRHH"] = "Estructural mínimo"
-
-        return df
-
-    return pd.DataFrame(
-        columns=["Año", "Puesto", "Rol_RRHH", "Bruto anual (€)", *MESES]
-    )
+    # Rol_RRHH ausente → "Estructural mínimo" (ver oyken.esquemas.DEFECTOS)
+    return ALMACEN.leer("rrhh_puestos")
 
 def guardar_puesto(registro: dict):
-    df = cargar_puestos()
-    df = pd.concat([df, pd.DataFrame([registro])], ignore_index=True)
-    df.to_csv(PUESTOS_FILE, index=False)
+    # Sobre la tabla vigente: no se pierden puestos guardados a la vez
+    ALMACEN.actualizar(
+        "rrhh_puestos",
+        lambda df: pd.concat([df, pd.DataFrame([registro])], ignore_index=True)
+    )
+    notificar_cambio("rrhh_puestos", particiones_anio(registro["Año"]), ALMACEN)
+
+def formatear_nomina(df):
+    # Cálculo en oyken.rrhh; aquí solo nombres de columna y redondeo
+    return pd.DataFrame({
+        "Mes": df["mes"].map(lambda m: MESES[m - 1]),
+        "Nómina (€)": df["nomina_eur"].round(2),
+        "Seguridad Social (€)": df["ss_eur"].round(2),
+        "Coste Empresa (€)": df["rrhh_total_eur"].round(2)
+    })
 
 # =====================================================
 # CONTEXTO DE PLANIFICACIÓN
 # =====================================================
+traza.bloque("CONTEXTO DE PLANIFICACIÓN")
 
 anio_activo = st.selectbox(
     "Año activo",
@@ -57,6 +69,8 @@ anio_activo = st.selectbox(
   
 )
 
+# Versión vista: la baja por posición se rechaza si otro usuario guardó antes
+version_puestos = ALMACEN.version("rrhh_puestos")
 df_puestos = cargar_puestos()
 df_puestos_anio = df_puestos[df_puestos["Año"] == anio_activo]
 
@@ -65,6 +79,7 @@ st.divider()
 # =====================================================
 # BLOQUE 1 · ALTA DE PUESTOS
 # =====================================================
+traza.bloque("BLOQUE 1 · ALTA DE PUESTOS")
 
 st.subheader("Alta de puestos")
 
@@ -79,11 +94,7 @@ with st.form("alta_puesto", clear_on_submit=True):
     )
     rol_rrhh = st.selectbox(
     "Rol del puesto (OYKEN)",
-    [
-        "Estructural mínimo",
-        "Estructural ampliable",
-        "Refuerzo operativo"
-    ]
+    ROLES_RRHH
 )
 
     st.markdown("**Necesidad mensual del puesto (personas)**")
@@ -116,6 +127,7 @@ with st.form("alta_puesto", clear_on_submit=True):
 # =====================================================
 # TABLA · ESTRUCTURA DE PUESTOS
 # =====================================================
+traza.bloque("ESTRUCTURA DE PUESTOS")
 
 st.subheader(f"Estructura de puestos — {anio_activo}")
 
@@ -133,6 +145,7 @@ st.divider()
 # =====================================================
 # CORRECCIÓN DE ERRORES · ESTRUCTURA DE PUESTOS
 # =====================================================
+traza.bloque("CORRECCIÓN DE ERRORES")
 
 st.divider()
 st.subheader("Corrección de errores · Estructura de puestos")
@@ -152,6 +165,7 @@ if not df_puestos_anio.empty:
     if st.button("Eliminar estructura de puesto"):
 
         df_todos = cargar_puestos()
+        anio_eliminado = df_todos.loc[idx, "Año"]
 
         df_todos = (
             df_todos
@@ -159,7 +173,12 @@ if not df_puestos_anio.empty:
             .reset_index(drop=True)
         )
 
-        df_todos.to_csv(PUESTOS_FILE, index=False)
+        try:
+            ALMACEN.escribir("rrhh_puestos", df_todos, version=version_puestos)
+        except ConflictoVersion:
+            st.warning("Otro usuario ha modificado los puestos. Revisa la selección y vuelve a intentarlo.")
+            traza.parar()
+        notificar_cambio("rrhh_puestos", particiones_anio(anio_eliminado), ALMACEN)
 
         st.success("Estructura de puesto eliminada correctamente.")
         st.rerun()
@@ -170,6 +189,7 @@ else:
 # =====================================================
 # SELECTOR DE PERIODO · TOTALIZACIÓN ESTRUCTURAL RRHH
 # =====================================================
+traza.bloque("SELECTOR DE PERIODO")
 
 st.divider()
 st.subheader("Estructura RRHH · Totalización por rol")
@@ -192,29 +212,11 @@ periodo_sel = st.selectbox(
 
 if not df_puestos_anio.empty:
 
-    def coste_puesto(row, periodo):
-        salario_mensual = row["Bruto anual (€)"] / 12
-
-        if periodo == "Año completo":
-            total_personas = sum(row[mes] for mes in MESES)
-            return salario_mensual * total_personas * (1 + SS_EMPRESA)
-        else:
-            return salario_mensual * row[periodo] * (1 + SS_EMPRESA)
-
-    df_calc = df_puestos_anio.copy()
-    df_calc["Coste"] = df_calc.apply(
-        lambda r: coste_puesto(r, periodo_sel),
-        axis=1
-    )
+    mes_periodo = 0 if periodo_sel == "Año completo" else MESES.index(periodo_sel) + 1
 
-    total_minimo = (
-        df_calc[df_calc["Rol_RRHH"] == "Estructural mínimo"]["Coste"].sum()
-    )
-    total_ampliable = (
-        df_calc[df_calc["Rol_RRHH"] == "Estructural ampliable"]["Coste"].sum()
-    )
-    total_refuerzo = (
-        df_calc[df_calc["Rol_RRHH"] == "Refuerzo operativo"]["Coste"].sum()
+    total_minimo, total_ampliable, total_refuerzo = (
+        rrhh.coste_puestos(df_puestos_anio, anio_activo, mes_periodo, [rol])
+        for rol in ["Estructural mínimo", "Estructural ampliable", "Refuerzo operativo"]
     )
 
     # -----------------------------
@@ -248,39 +250,15 @@ else:
 # =====================================================
 # BLOQUE 2 · COSTE DE PERSONAL (NÓMINA)
 # =====================================================
+traza.bloque("BLOQUE 2 · COSTE DE PERSONAL (NÓMINA)")
 
 st.subheader("Coste de personal — Nómina (económico)")
 st.caption("Cálculo económico aislado de la planificación.")
 
-SS_EMPRESA = 0.33
-
 if df_puestos_anio.empty:
     st.info("No hay estructura de puestos para calcular nómina.")
 else:
-    datos_nomina = []
-
-    for mes in MESES:
-        total_nomina = 0.0
-        total_ss = 0.0
-
-        for _, row in df_puestos_anio.iterrows():
-            salario_mensual = row["Bruto anual (€)"] / 12
-            personas = row.get(mes, 0)
-
-            nomina = salario_mensual * personas
-            ss = nomina * SS_EMPRESA
-
-            total_nomina += nomina
-            total_ss += ss
-
-        datos_nomina.append({
-            "Mes": mes,
-            "Nómina (€)": round(total_nomina, 2),
-            "Seguridad Social (€)": round(total_ss, 2),
-            "Coste Empresa (€)": round(total_nomina + total_ss, 2)
-        })
-
-    df_nomina = pd.DataFrame(datos_nomina)
+    df_nomina = formatear_nomina(rrhh.nomina_anio(df_puestos, anio_activo))
 
     st.dataframe(
         df_nomina,
@@ -296,6 +274,7 @@ else:
 # =====================================================
 # BLOQUE 2B · MAPA DE MESES
 # =====================================================
+traza.bloque("BLOQUE 2B · MAPA DE MESES")
 
 MESES_ES = [
     "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
@@ -305,6 +284,7 @@ MESES_ES = [
 # =====================================================
 # BLOQUE 2C · SELECTORES ECONÓMICOS
 # =====================================================
+traza.bloque("BLOQUE 2C · SELECTORES ECONÓMICOS")
 
 st.divider()
 st.subheader("Selector temporal económico")
@@ -316,7 +296,7 @@ with c1:
 
     if not anios_disponibles:
         st.info("No hay estructura de RRHH disponible.")
-        st.stop()
+        traza.parar()
 
     anio_economico = st.selectbox(
         "Año económico",
@@ -336,6 +316,7 @@ with c2:
 # =====================================================
 # BLOQUE 2D · ORIGEN ECONÓMICO (AISLADO)
 # =====================================================
+traza.bloque("BLOQUE 2D · ORIGEN ECONÓMICO")
 
 df_puestos_econ = df_puestos[
     df_puestos["Año"] == anio_economico
@@ -343,40 +324,27 @@ df_puestos_econ = df_puestos[
 
 if df_puestos_econ.empty:
     st.warning("No hay puestos definidos para este año económico.")
-    st.stop()
+    traza.parar()
 
 # =====================================================
 # BLOQUE 3 · CÁLCULO ROBUSTO MENSUAL
 # =====================================================
+traza.bloque("BLOQUE 3 · CÁLCULO MENSUAL")
 
-datos_meses = []
-
-for i, mes_nombre in enumerate(MESES_ES, start=1):
-
-    if mes_economico != 0 and i != mes_economico:
-        continue
-
-    total_mes = 0.0
-
-    for _, row in df_puestos_econ.iterrows():
-        salario_mensual = row["Bruto anual (€)"] / 12
-        personas = row[mes_nombre]
+df_nomina_econ = rrhh.nomina_anio(df_puestos_econ, anio_economico)
 
-        nomina = salario_mensual * personas
-        ss = nomina * SS_EMPRESA
+if mes_economico != 0:
+    df_nomina_econ = df_nomina_econ[df_nomina_econ["mes"] == mes_economico]
 
-        total_mes += nomina + ss
-
-    datos_meses.append({
-        "Mes": mes_nombre,
-        "Coste RRHH (€)": round(total_mes, 2)
-    })
-
-df_totales = pd.DataFrame(datos_meses)
+df_totales = pd.DataFrame({
+    "Mes": df_nomina_econ["mes"].map(lambda m: MESES_ES[m - 1]),
+    "Coste RRHH (€)": df_nomina_econ["rrhh_total_eur"].round(2)
+})
 
 # =====================================================
 # BLOQUE 4 · TABLA VISIBLE
 # =====================================================
+traza.bloque("BLOQUE 4 · TABLA VISIBLE")
 
 st.divider()
 st.subheader("Totales mensuales RRHH (económico)")
@@ -395,39 +363,13 @@ st.metric(
 # =====================================================
 # BLOQUE 4B · DESGLOSE ECONÓMICO RRHH
 # =====================================================
+traza.bloque("BLOQUE 4B · DESGLOSE ECONÓMICO RRHH")
 
 st.divider()
 st.subheader("Desglose económico RRHH")
 st.caption("Detalle de nómina, Seguridad Social y coste empresa.")
 
-desglose = []
-
-for i, mes_nombre in enumerate(MESES_ES, start=1):
-
-    if mes_economico != 0 and i != mes_economico:
-        continue
-
-    total_nomina = 0.0
-    total_ss = 0.0
-
-    for _, row in df_puestos_econ.iterrows():
-        salario_mensual = row["Bruto anual (€)"] / 12
-        personas = row[mes_nombre]
-
-        nomina = salario_mensual * personas
-        ss = nomina * SS_EMPRESA
-
-        total_nomina += nomina
-        total_ss += ss
-
-    desglose.append({
-        "Mes": mes_nombre,
-        "Nómina (€)": round(total_nomina, 2),
-        "Seguridad Social (€)": round(total_ss, 2),
-        "Coste Empresa (€)": round(total_nomina + total_ss, 2)
-    })
-
-df_desglose = pd.DataFrame(desglose)
+df_desglose = formatear_nomina(df_nomina_econ)
 
 st.dataframe(
     df_desglose,
@@ -436,44 +378,10 @@ st.dataframe(
 )
 
 # =====================================================
-# BLOQUE 5 · CSV CANÓNICO MENSUAL
+# BLOQUE 5 · CONSOLIDADO CANÓNICO MENSUAL
 # =====================================================
+traza.bloque("BLOQUE 5 · CONSOLIDADO MENSUAL")
+# rrhh_mensual se consolida al guardar o eliminar puestos
+# (oyken.derivados); la vista no escribe.
 
-from datetime import datetime
-
-RRHH_MENSUAL_FILE = Path("rrhh_mensual.csv")
-
-# Crear CSV si no existe
-if not RRHH_MENSUAL_FILE.exists():
-    pd.DataFrame(
-        columns=["anio", "mes", "rrhh_total_eur", "fecha_actualizacion"]
-    ).to_csv(RRHH_MENSUAL_FILE, index=False)
-
-# Preparar datos a guardar
-df_csv = df_totales.copy()
-df_csv["mes"] = df_csv["Mes"].map(
-    {v: i + 1 for i, v in enumerate(MESES_ES)}
-)
-df_csv["anio"] = anio_economico
-df_csv["rrhh_total_eur"] = df_csv["Coste RRHH (€)"]
-df_csv = df_csv[["anio", "mes", "rrhh_total_eur"]]
-
-# Cargar histórico
-df_hist = pd.read_csv(RRHH_MENSUAL_FILE)
-
-# Overwrite limpio por (anio, mes)
-df_hist = df_hist[
-    ~(
-        (df_hist["anio"] == anio_economico) &
-        (df_hist["mes"].isin(df_csv["mes"]))
-    )
-]
-
-df_csv["fecha_actualizacion"] = datetime.now()
-
-df_final = pd.concat([df_hist, df_csv], ignore_index=True)
-df_final = df_final.sort_values(["anio", "mes"])
-df_final.to_csv(RRHH_MENSUAL_FILE, index=False)
-
-st.success("RRHH económico consolidado correctamente.")
-
+traza.fin()
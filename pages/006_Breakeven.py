@@ -1,28 +1,33 @@
 import streamlit as st
 import pandas as pd
-from pathlib import Path
-import calendar
+from oyken import breakeven, compartido, locales, rendimiento
+from oyken.derivados import asegurar_consolidados
+from oyken.storage import almacen
+
+traza = rendimiento.pagina(__file__)
 
 # =====================================================
 # CABECERA
 # =====================================================
+traza.bloque("CABECERA")
 
 st.subheader("OYKEN · Breakeven Operativo")
 st.caption("Punto de equilibrio estructural del negocio")
 st.divider()
 
 # =====================================================
-# ARCHIVOS CANÓNICOS
+# ALMACÉN CANÓNICO
 # =====================================================
+traza.bloque("ALMACÉN")
 
-COSTE_PRODUCTO_FILE = Path("coste_producto.csv")
-RRHH_FILE = Path("rrhh_mensual.csv")
-RRHH_PUESTOS_FILE = Path("rrhh_puestos.csv")
-GASTOS_FILE = Path("gastos.csv")
+# Local activo (barra lateral): esta página trabaja sobre un solo local
+locales.selector(grupo=False)
+ALMACEN = almacen()
 
 # =====================================================
 # SELECTOR TEMPORAL (AUTÓNOMO)
 # =====================================================
+traza.bloque("SELECTOR TEMPORAL")
 
 MESES_ES = {
     1: "Enero",
@@ -62,72 +67,56 @@ st.divider()
 # =====================================================
 # MARGEN BRUTO (DESDE COMPRAS + VENTAS)
 # =====================================================
+traza.bloque("MARGEN BRUTO")
 
-COMPRAS_MENSUALES_FILE = Path("compras_mensuales.csv")
-VENTAS_MENSUALES_FILE = Path("ventas_mensuales.csv")
+asegurar_consolidados(ALMACEN, ["compras_mensuales", "ventas_mensuales"])
 
 # ---------- Validaciones ----------
-if not COMPRAS_MENSUALES_FILE.exists():
+if not ALMACEN.existe("compras_mensuales"):
     st.error("No existen datos de Compras mensuales.")
-    st.stop()
+    traza.parar()
 
-if not VENTAS_MENSUALES_FILE.exists():
+if not ALMACEN.existe("ventas_mensuales"):
     st.error("No existen datos de Ventas mensuales.")
-    st.stop()
-
-# ---------- Cargar datos ----------
-df_compras = pd.read_csv(COMPRAS_MENSUALES_FILE)
-df_ventas = pd.read_csv(VENTAS_MENSUALES_FILE)
-
-# ---------- Normalizar tipos (CRÍTICO) ----------
-for df in (df_compras, df_ventas):
-    df["anio"] = df["anio"].astype(int)
-    df["mes"] = df["mes"].astype(int)
-
-df_compras["compras_total_eur"] = pd.to_numeric(
-    df_compras["compras_total_eur"], errors="coerce"
-).fillna(0)
+    traza.parar()
 
-df_ventas["ventas_total_eur"] = pd.to_numeric(
-    df_ventas["ventas_total_eur"], errors="coerce"
-).fillna(0)
+if not ALMACEN.existe("rrhh_puestos"):
+    st.error("No existe la estructura de RRHH.")
+    traza.parar()
 
-# ---------- Filtrar período ----------
-if mes_sel == 0:
-    row_compras = df_compras[
-        df_compras["anio"] == int(anio_sel)
-    ]
-    row_ventas = df_ventas[
-        df_ventas["anio"] == int(anio_sel)
-    ]
-else:
-    row_compras = df_compras[
-        (df_compras["anio"] == int(anio_sel)) &
-        (df_compras["mes"] == mes_sel)
-    ]
-    row_ventas = df_ventas[
-        (df_ventas["anio"] == int(anio_sel)) &
-        (df_ventas["mes"] == mes_sel)
-    ]
+if not compartido.existe("gastos", ALMACEN):
+    st.error("No existen gastos registrados.")
+    traza.parar()
+
+# ---------- Cargar datos (tipados por el almacén) ----------
+entradas = breakeven.entradas_periodo(
+    ALMACEN.leer("compras_mensuales"),
+    ALMACEN.leer("ventas_mensuales"),
+    ALMACEN.leer("rrhh_puestos"),
+    compartido.tabla("gastos", ALMACEN)[list(breakeven.COLUMNAS_GASTOS)],
+    int(anio_sel),
+    mes_sel
+)
 
 # ---------- Validación semántica ----------
-if row_compras.empty or row_ventas.empty:
+if entradas is None:
     st.warning(
         "No hay datos suficientes de Compras o Ventas "
         "para el período seleccionado."
     )
-    st.stop()
+    traza.parar()
 
-compras = float(row_compras.iloc[0]["compras_total_eur"])
-ventas = float(row_ventas.iloc[0]["ventas_total_eur"])
-
-if ventas <= 0:
+if entradas["ventas"] <= 0:
     st.warning("Las ventas del período son 0 €. No se puede calcular margen.")
-    st.stop()
+    traza.parar()
+
+# ---------- Cálculo estructural (oyken.breakeven) ----------
+r = breakeven.calcular(**entradas)
 
-# ---------- Cálculo estructural ----------
-coste_producto_pct = compras / ventas
-margen_bruto = 1 - coste_producto_pct
+compras = entradas["compras"]
+margen_bruto = r["margen_bruto"]
+costes_fijos_totales = r["costes_fijos_totales"]
+dias_mes = entradas["dias_periodo"]
 
 # ---------- Visualización ----------
 st.markdown("### Margen bruto estructural")
@@ -143,73 +132,10 @@ st.divider()
 # =====================================================
 # COSTES FIJOS ESTRUCTURALES
 # =====================================================
+traza.bloque("COSTES FIJOS ESTRUCTURALES")
 
 st.markdown("### Costes fijos estructurales")
 
-
-# ---------- RRHH ESTRUCTURAL MÍNIMO ----------
-if not RRHH_PUESTOS_FILE.exists():
-    st.error("No existe la estructura de RRHH.")
-    st.stop()
-
-df_rrhh = pd.read_csv(RRHH_PUESTOS_FILE)
-
-# Filtrar año
-df_rrhh = df_rrhh[df_rrhh["Año"] == int(anio_sel)]
-
-# Filtrar solo estructura mínima
-df_rrhh = df_rrhh[
-    df_rrhh["Rol_RRHH"] == "Estructural mínimo"
-]
-
-if df_rrhh.empty:
-    coste_rrhh = 0.0
-else:
-    coste_rrhh = 0.0
-
-    for _, row in df_rrhh.iterrows():
-        salario_mensual = row["Bruto anual (€)"] / 12
-
-        if mes_sel == 0:
-            personas = sum(row[mes] for mes in MESES_ES.values())
-        else:
-            personas = row[MESES_ES[mes_sel]]
-
-        nomina = salario_mensual * personas
-        ss = nomina * 0.33
-
-        coste_rrhh += nomina + ss
-
-# ---------- GASTOS FIJOS ----------
-if not GASTOS_FILE.exists():
-    st.error("No existen gastos registrados.")
-    st.stop()
-
-df_gastos = pd.read_csv(GASTOS_FILE)
-
-df_gastos["Coste (€)"] = pd.to_numeric(
-    df_gastos["Coste (€)"], errors="coerce"
-).fillna(0)
-
-# Solo gastos fijos estructurales
-gastos_fijos = df_gastos[
-    (df_gastos["Tipo_Gasto"] == "Fijo") &
-    (df_gastos["Rol_Gasto"] == "Estructural")
-]
-
-gastos_por_categoria = (
-    gastos_fijos
-    .groupby("Categoria", as_index=False)["Coste (€)"]
-    .sum()
-)
-
-total_gastos_fijos = gastos_por_categoria["Coste (€)"].sum()
-
-# ---------- TOTAL COSTES FIJOS ----------
-costes_fijos_totales = coste_rrhh + total_gastos_fijos
-
-# ---------- VISUAL RESUMEN ----------
-
 st.metric(
     "Costes fijos totales (€)",
     f"{costes_fijos_totales:,.2f}"
@@ -227,9 +153,9 @@ st.dataframe(
     pd.concat([
         pd.DataFrame([{
             "Concepto": "Recursos Humanos",
-            "Coste (€)": coste_rrhh
+            "Coste (€)": entradas["coste_rrhh_fijo"]
         }]),
-        gastos_por_categoria.rename(
+        entradas["gastos_por_categoria"].rename(
             columns={"Categoria": "Concepto"}
         )
     ]),
@@ -242,6 +168,7 @@ st.divider()
 # =====================================================
 # BREAKEVEN OPERATIVO
 # =====================================================
+traza.bloque("BREAKEVEN OPERATIVO")
 
 st.subheader("Breakeven operativo")
 st.caption(
@@ -249,23 +176,23 @@ st.caption(
     "con el margen bruto actual."
 )
 
-if margen_bruto <= 0:
+if r["breakeven_operativo"] is None:
     st.error("El margen bruto es ≤ 0. No se puede calcular el breakeven.")
-else:
-    breakeven_eur = costes_fijos_totales / margen_bruto
+    traza.parar()
 
-    st.metric(
-        "Ventas necesarias para cubrir estructura",
-        f"{breakeven_eur:,.2f} €"
-    )
+st.metric(
+    "Ventas necesarias para cubrir estructura",
+    f"{r['breakeven_operativo']:,.2f} €"
+)
 
-    st.caption(
-        "Fórmula: Costes fijos estructurales / Margen bruto estructural"
-    )
+st.caption(
+    "Fórmula: Costes fijos estructurales / Margen bruto estructural"
+)
 
 # =====================================================
 # BREAKEVEN OPERATIVO DIARIO
 # =====================================================
+traza.bloque("BREAKEVEN OPERATIVO DIARIO")
 
 st.divider()
 st.subheader("Breakeven operativo diario")
@@ -276,15 +203,11 @@ if mes_sel == 0:
         "un mes concreto."
     )
 else:
-    dias_mes = calendar.monthrange(int(anio_sel), int(mes_sel))[1]
-
-    breakeven_diario = breakeven_eur / dias_mes
-
     c1, c2 = st.columns(2)
     with c1:
         st.metric(
             "Breakeven diario",
-            f"{breakeven_diario:,.2f} € / día"
+            f"{r['breakeven_operativo_diario']:,.2f} € / día"
         )
     with c2:
         st.metric(
@@ -300,6 +223,7 @@ else:
 # =====================================================
 # MARGEN DE CONTRIBUCIÓN REAL (OYKEN)
 # =====================================================
+traza.bloque("MARGEN DE CONTRIBUCIÓN REAL")
 
 st.divider()
 st.subheader("Margen de contribución real")
@@ -309,114 +233,32 @@ st.caption(
     "(coste de producto + gastos variables + RRHH variable)."
 )
 
-# =====================================================
-# 1. GASTOS VARIABLES (NO RRHH)
-# =====================================================
-
-gastos_variables = df_gastos[
-    (df_gastos["Tipo_Gasto"] == "Variable") &
-    (df_gastos["Rol_Gasto"] == "Estructural")
-]
-
-if mes_sel == 0:
-    gastos_variables_periodo = gastos_variables[
-        gastos_variables["Mes"].str.startswith(str(anio_sel))
-    ]
-else:
-    mes_clave = f"{anio_sel}-{mes_sel:02d}"
-    gastos_variables_periodo = gastos_variables[
-        gastos_variables["Mes"] == mes_clave
-    ]
-
-gastos_variables_total = gastos_variables_periodo["Coste (€)"].sum()
-
-# =====================================================
-# 2. RRHH VARIABLE (DESDE ESTRUCTURA RRHH)
-#    = Estructural ampliable + Refuerzo operativo
-# =====================================================
-
-if not RRHH_PUESTOS_FILE.exists():
-    st.error("No existe la estructura de RRHH.")
-    st.stop()
-
-df_rrhh_full = pd.read_csv(RRHH_PUESTOS_FILE)
-
-# Filtrar año
-df_rrhh_full = df_rrhh_full[df_rrhh_full["Año"] == int(anio_sel)]
-
-# Solo RRHH variable
-df_rrhh_variable = df_rrhh_full[
-    df_rrhh_full["Rol_RRHH"].isin([
-        "Estructural ampliable",
-        "Refuerzo operativo"
-    ])
-]
-
-rrhh_variable_total = 0.0
-
-if not df_rrhh_variable.empty:
-
-    for _, row in df_rrhh_variable.iterrows():
-        salario_mensual = row["Bruto anual (€)"] / 12
-
-        if mes_sel == 0:
-            personas = sum(row[mes] for mes in MESES_ES.values())
-        else:
-            personas = row[MESES_ES[mes_sel]]
+margen_contribucion = r["margen_contribucion"]
 
-        nomina = salario_mensual * personas
-        ss = nomina * 0.33
-
-        rrhh_variable_total += nomina + ss
-
-# =====================================================
-# 3. COSTES VARIABLES REALES
-# =====================================================
-
-costes_variables_reales = (
-    compras +
-    gastos_variables_total +
-    rrhh_variable_total
+st.metric(
+    "Margen de contribución real",
+    f"{margen_contribucion:.2%}"
 )
 
-# =====================================================
-# 4. CONTRIBUCIÓN
-# =====================================================
-
-contribucion_eur = ventas - costes_variables_reales
-
-if ventas <= 0:
-    st.warning("Las ventas del período son 0 €. No se puede calcular la contribución.")
-else:
-    margen_contribucion = contribucion_eur / ventas
-
-    st.metric(
-        "Margen de contribución real",
-        f"{margen_contribucion:.2%}"
-    )
+st.caption(
+    f"Contribución absoluta del período: {r['contribucion']:,.2f} € · "
+    "Fórmula: Ventas − (Coste de producto + Gastos variables + RRHH variable)"
+)
 
-    st.caption(
-        f"Contribución absoluta del período: {contribucion_eur:,.2f} € · "
-        "Fórmula: Ventas − (Coste de producto + Gastos variables + RRHH variable)"
+if margen_contribucion <= 0:
+    st.warning(
+        "El margen de contribución es ≤ 0. "
+        "La estructura no se sostiene con el nivel actual de costes variables."
     )
 
-    if margen_contribucion <= 0:
-        st.warning(
-            "El margen de contribución es ≤ 0. "
-            "La estructura no se sostiene con el nivel actual de costes variables."
-        )
-
-# =====================================================
-# 5. DESGLOSE AUDITABLE
-# =====================================================
-
+# ---------- DESGLOSE AUDITABLE ----------
 st.markdown("#### Desglose de costes variables")
 
 st.dataframe(
     pd.DataFrame([
         {"Concepto": "Coste de producto", "Coste (€)": compras},
-        {"Concepto": "Gastos variables", "Coste (€)": gastos_variables_total},
-        {"Concepto": "RRHH variable", "Coste (€)": rrhh_variable_total},
+        {"Concepto": "Gastos variables", "Coste (€)": entradas["gastos_variables"]},
+        {"Concepto": "RRHH variable", "Coste (€)": entradas["rrhh_variable"]},
     ]),
     hide_index=True,
     use_container_width=True
@@ -424,6 +266,7 @@ st.dataframe(
 # =====================================================
 # BREAKEVEN REAL (OYKEN)
 # =====================================================
+traza.bloque("BREAKEVEN REAL")
 
 st.divider()
 st.subheader("Breakeven real")
@@ -432,26 +275,26 @@ st.caption(
     "utilizando el margen de contribución real del negocio."
 )
 
-if margen_contribucion <= 0:
+if r["breakeven_real"] is None:
     st.error(
         "El margen de contribución real es ≤ 0. "
         "No existe un breakeven sostenible con la estructura actual."
     )
-else:
-    breakeven_real = costes_fijos_totales / margen_contribucion
+    traza.parar()
 
-    st.metric(
-        "Ventas necesarias (breakeven real)",
-        f"{breakeven_real:,.2f} €"
-    )
+st.metric(
+    "Ventas necesarias (breakeven real)",
+    f"{r['breakeven_real']:,.2f} €"
+)
 
-    st.caption(
-        "Fórmula: Costes fijos estructurales ÷ Margen de contribución real"
-    )
+st.caption(
+    "Fórmula: Costes fijos estructurales ÷ Margen de contribución real"
+)
 
 # =====================================================
 # BREAKEVEN REAL DIARIO
 # =====================================================
+traza.bloque("BREAKEVEN REAL DIARIO")
 
 st.divider()
 st.subheader("Breakeven real diario")
@@ -462,16 +305,12 @@ if mes_sel == 0:
         "un mes concreto."
     )
 else:
-    dias_mes = calendar.monthrange(int(anio_sel), int(mes_sel))[1]
-
-    breakeven_real_diario = breakeven_real / dias_mes
-
     c1, c2 = st.columns(2)
 
     with c1:
         st.metric(
             "Breakeven real diario",
-            f"{breakeven_real_diario:,.2f} € / día"
+            f"{r['breakeven_real_diario']:,.2f} € / día"
         )
 
     with c2:
@@ -488,15 +327,13 @@ else:
 # =====================================================
 # VALIDACIÓN · RESULTADO EN BREAKEVEN REAL
 # =====================================================
+traza.bloque("VALIDACIÓN")
 
 st.markdown("#### Validación del punto de equilibrio")
 
-costes_variables_impl = breakeven_real * (1 - margen_contribucion)
-resultado_check = breakeven_real - costes_variables_impl - costes_fijos_totales
-
 st.metric(
     "Resultado en breakeven real",
-    f"{resultado_check:,.2f} €"
+    f"{r['resultado_check']:,.2f} €"
 )
 
 st.caption(
@@ -506,6 +343,7 @@ st.caption(
 # =====================================================
 # BREAKEVEN · OPERATIVO vs REAL (BRECHA OPERATIVA)
 # =====================================================
+traza.bloque("BRECHA OPERATIVA")
 
 st.divider()
 st.subheader("Breakeven · Operativo vs Real")
@@ -517,6 +355,7 @@ st.caption(
 # =========================
 # BLOQUE MENSUAL
 # =========================
+traza.bloque("BLOQUE MENSUAL")
 
 st.markdown("### Comparativa mensual")
 
@@ -525,23 +364,21 @@ c1, c2, c3 = st.columns(3)
 with c1:
     st.metric(
         "Breakeven operativo",
-        f"{breakeven_eur:,.2f} €",
+        f"{r['breakeven_operativo']:,.2f} €",
         help="Cubre únicamente estructura fija con margen bruto."
     )
 
 with c2:
     st.metric(
         "Breakeven real",
-        f"{breakeven_real:,.2f} €",
+        f"{r['breakeven_real']:,.2f} €",
         help="Cubre estructura fija con margen de contribución real."
     )
 
 with c3:
-    brecha_mensual = breakeven_real - breakeven_eur
-
     st.metric(
         "Brecha operativa",
-        f"{brecha_mensual:,.2f} €",
+        f"{r['brecha_operativa']:,.2f} €",
         help="Impacto económico de la operación real sobre el modelo teórico."
     )
 
@@ -553,6 +390,7 @@ st.caption(
 # =========================
 # BLOQUE DIARIO
 # =========================
+traza.bloque("BLOQUE DIARIO")
 
 st.divider()
 st.markdown("### Comparativa diaria")
@@ -568,21 +406,19 @@ else:
     with c1:
         st.metric(
             "Breakeven operativo diario",
-            f"{breakeven_diario:,.2f} € / día"
+            f"{r['breakeven_operativo_diario']:,.2f} € / día"
         )
 
     with c2:
         st.metric(
             "Breakeven real diario",
-            f"{breakeven_real_diario:,.2f} € / día"
+            f"{r['breakeven_real_diario']:,.2f} € / día"
         )
 
     with c3:
-        brecha_diaria = breakeven_real_diario - breakeven_diario
-
         st.metric(
             "Brecha operativa diaria",
-            f"{brecha_diaria:,.2f} € / día"
+            f"{r['brecha_operativa_diaria']:,.2f} € / día"
         )
 
     st.caption(
@@ -593,80 +429,8 @@ else:
 # =====================================================
 # PERSISTENCIA · BREAKEVEN RESUMEN (CANÓNICO)
 # =====================================================
+traza.bloque("PERSISTENCIA")
+# breakeven_resumen se consolida en oyken.derivados cuando cambian
+# ventas, compras, gastos o RRHH; esta página solo lo muestra.
 
-from datetime import datetime
-
-BREAKEVEN_RESUMEN_FILE = Path("breakeven_resumen.csv")
-
-# 1) Crear archivo si no existe
-if not BREAKEVEN_RESUMEN_FILE.exists():
-    pd.DataFrame(columns=[
-        "anio",
-        "mes",
-        "costes_fijos_totales_eur",
-        "costes_variables_reales_eur",
-        "margen_bruto_pct",
-        "margen_contribucion_real_pct",
-        "breakeven_operativo_eur",
-        "breakeven_real_eur",
-        "brecha_operativa_eur",
-        "dias_periodo",
-        "breakeven_operativo_diario_eur",
-        "breakeven_real_diario_eur",
-        "brecha_operativa_diaria_eur",
-        "resultado_check_eur",
-        "fecha_calculo",
-        "version_modelo"
-    ]).to_csv(BREAKEVEN_RESUMEN_FILE, index=False)
-
-# 2) Preparar valores diarios (solo si hay mes concreto)
-if mes_sel != 0:
-    dias_periodo = calendar.monthrange(int(anio_sel), int(mes_sel))[1]
-    be_op_diario = breakeven_diario
-    be_real_diario = breakeven_real_diario
-    brecha_diaria_val = brecha_diaria
-else:
-    dias_periodo = 0
-    be_op_diario = 0.0
-    be_real_diario = 0.0
-    brecha_diaria_val = 0.0
-
-# 3) Construir fila de resumen
-row_resumen = {
-    "anio": int(anio_sel),
-    "mes": int(mes_sel),
-    "costes_fijos_totales_eur": float(costes_fijos_totales),
-    "costes_variables_reales_eur": float(costes_variables_reales),
-    "margen_bruto_pct": float(margen_bruto),
-    "margen_contribucion_real_pct": float(margen_contribucion),
-    "breakeven_operativo_eur": float(breakeven_eur),
-    "breakeven_real_eur": float(breakeven_real),
-    "brecha_operativa_eur": float(brecha_mensual),
-    "dias_periodo": int(dias_periodo),
-    "breakeven_operativo_diario_eur": float(be_op_diario),
-    "breakeven_real_diario_eur": float(be_real_diario),
-    "brecha_operativa_diaria_eur": float(brecha_diaria_val),
-    "resultado_check_eur": float(resultado_check),
-    "fecha_calculo": datetime.now(),
-    "version_modelo": "OYKEN_BE_v1"
-}
-
-df_row = pd.DataFrame([row_resumen])
-
-# 4) Cargar histórico y hacer overwrite por (anio, mes)
-df_hist = pd.read_csv(BREAKEVEN_RESUMEN_FILE)
-
-df_hist = df_hist[
-    ~(
-        (df_hist["anio"] == int(anio_sel)) &
-        (df_hist["mes"] == int(mes_sel))
-    )
-]
-
-df_final = pd.concat([df_hist, df_row], ignore_index=True)
-df_final = df_final.sort_values(["anio", "mes"])
-
-# 5) Guardar
-df_final.to_csv(BREAKEVEN_RESUMEN_FILE, index=False)
-
-st.success("Breakeven resumen consolidado correctamente.")
+traza.fin()
@@ -1,18 +1,29 @@
 import streamlit as st
+import pandas as pd
 from datetime import date
 
+from oyken import cobertura, intradia, locales, rendimiento
+from oyken.tickets import INICIO_TURNOS, inicio_turnos
+
+traza = rendimiento.pagina(__file__)
+
 # ======================================================
 # CONFIGURACIÓN GENERAL
 # ======================================================
+traza.bloque("CONFIGURACIÓN GENERAL")
 st.set_page_config(
     page_title="OIKEN · RRHH Core",
     layout="centered",
     initial_sidebar_state="expanded"
 )
 
+# Local activo (barra lateral); la vista de grupo suma todos los locales
+locales.selector(grupo=True)
+
 # ======================================================
 # SESSION STATE · MODELO RRHH CORE
 # ======================================================
+traza.bloque("ESTADO DE SESIÓN")
 if "rrhh_core" not in st.session_state:
     st.session_state.rrhh_core = {
         "configuracion": {
@@ -30,6 +41,7 @@ if "rrhh_core" not in st.session_state:
 # ======================================================
 # HEADER
 # ======================================================
+traza.bloque("HEADER")
 st.title("RRHH Core · Estructura Operativa")
 st.caption(
     "Definición de la estructura humana mínima del negocio "
@@ -52,6 +64,7 @@ st.divider()
 # ======================================================
 # BLOQUE 1 · CONFIGURACIÓN OPERATIVA
 # ======================================================
+traza.bloque("BLOQUE 1 · CONFIGURACIÓN OPERATIVA")
 st.subheader("Configuración operativa del negocio")
 st.caption("Define cómo funciona tu negocio en el tiempo. No hablamos de personas ni de costes.")
 
@@ -81,6 +94,7 @@ st.divider()
 # ======================================================
 # BLOQUE 1B · TRAMOS OPERATIVOS
 # ======================================================
+traza.bloque("BLOQUE 1B · TRAMOS OPERATIVOS")
 st.subheader("Tramos operativos")
 st.caption("Un tramo es un periodo donde la lógica del servicio no cambia.")
 
@@ -110,9 +124,45 @@ for i, tramo in enumerate(st.session_state.rrhh_core["configuracion"]["tramos"])
 
 st.divider()
 
+# ======================================================
+# BLOQUE 1C · VENTAS POR TRAMO
+# ======================================================
+traza.bloque("BLOQUE 1C · VENTAS POR TRAMO")
+# Serie intradía de 15 minutos (tickets del TPV) del último año
+fechas_intradia, matriz_intradia = intradia.cargar_serie(
+    desde=pd.Timestamp(date.today()) - pd.Timedelta(days=365)
+)
+
+if len(fechas_intradia):
+    st.subheader("Ventas por tramo")
+    st.caption(
+        f"Venta media diaria de los últimos {len(fechas_intradia)} días con tickets "
+        "del TPV, repartida por los tramos definidos (o por turnos si no hay tramos)."
+    )
+
+    bandas = intradia.bandas_tramos(st.session_state.rrhh_core["configuracion"]["tramos"])
+    if not bandas:
+        bandas = intradia.bandas_turnos(INICIO_TURNOS if locales.es_grupo() else inicio_turnos())
+
+    por_banda = intradia.remuestrear(fechas_intradia, matriz_intradia, bandas).mean()
+    total_dia = matriz_intradia.sum(axis=1).mean() / 100
+    st.dataframe(
+        pd.DataFrame({
+            "Venta media (€)": por_banda.round(2),
+            "% del día": (por_banda / total_dia * 100 if total_dia else por_banda * 0).round(1),
+        }),
+        use_container_width=True
+    )
+
+    st.caption("Venta media por hora del día (€)")
+    st.bar_chart(intradia.curva_media(fechas_intradia, matriz_intradia, horas=True))
+
+    st.divider()
+
 # ======================================================
 # BLOQUE 2 · GUÍA DE POSICIONAMIENTO
 # ======================================================
+traza.bloque("BLOQUE 2 · GUÍA DE POSICIONAMIENTO")
 st.subheader("Guía de posicionamiento por tramo")
 st.caption("Indica qué funciones existen realmente en cada tramo. No personas. No puestos.")
 
@@ -161,21 +211,13 @@ st.divider()
 # ======================================================
 # BLOQUE 3 · MOTOR DE ESTRUCTURALIDAD
 # ======================================================
+traza.bloque("BLOQUE 3 · MOTOR DE ESTRUCTURALIDAD")
 st.subheader("Estructura operativa mínima detectada")
 st.caption("OIKEN determina qué funciones son estructurales para sostener la operación.")
 
-FUNCIONES_NO_ESTRUCTURALES = ["Runner comida", "Runner bebida", "Refuerzo"]
-
-estructura_detectada = []
-
-for tramo, funciones in st.session_state.rrhh_core["posicionamiento"].items():
-    for funcion, existe in funciones.items():
-        if not existe:
-            continue
-        if funcion in FUNCIONES_NO_ESTRUCTURALES:
-            estructura_detectada.append((tramo, funcion, False))
-        else:
-            estructura_detectada.append((tramo, funcion, True))
+estructura_detectada = cobertura.estructura(
+    st.session_state.rrhh_core["posicionamiento"]
+)
 
 if estructura_detectada:
     for tramo in sorted(set(t[0] for t in estructura_detectada)):
@@ -196,6 +238,7 @@ st.divider()
 # ======================================================
 # BLOQUE 4 · HORAS ESTRUCTURALES
 # ======================================================
+traza.bloque("BLOQUE 4 · HORAS ESTRUCTURALES")
 st.subheader("Cobertura estructural por función")
 st.caption("Define durante cuántas horas cada función estructural debe estar cubierta.")
 
@@ -219,10 +262,8 @@ for tramo, funcion, es in estructura_detectada:
         horas = 0
         try:
             if inicio and fin:
-                hi, mi = map(int, inicio.split(":"))
-                hf, mf = map(int, fin.split(":"))
-                horas = max((hf + mf/60) - (hi + mi/60), 0)
-        except:
+                horas = cobertura.horas_entre(inicio, fin)
+        except ValueError:
             st.warning("Formato HH:MM")
 
         st.session_state.rrhh_core["horas_estructurales"][clave] = {
@@ -239,26 +280,14 @@ for tramo, funcion, es in estructura_detectada:
 # ======================================================
 # BLOQUE 5 · HUELLA HUMANA ESTRUCTURAL
 # ======================================================
+traza.bloque("BLOQUE 5 · HUELLA HUMANA ESTRUCTURAL")
 st.subheader("Huella Humana Estructural")
 st.caption("Define el suelo humano real del negocio.")
 
-intervalos = []
-for datos in st.session_state.rrhh_core["horas_estructurales"].values():
-    try:
-        hi, mi = map(int, datos["inicio"].split(":"))
-        hf, mf = map(int, datos["fin"].split(":"))
-        intervalos.append((hi*60 + mi, hf*60 + mf))
-    except:
-        continue
+intervalos = cobertura.intervalos(st.session_state.rrhh_core["horas_estructurales"])
 
 if intervalos:
-    conteos = []
-    for minuto in range(0, 24*60, 15):
-        activos = sum(1 for i, f in intervalos if i <= minuto < f)
-        conteos.append(activos)
-
-    pico = max(conteos)
-    total_horas = sum((f - i) for i, f in intervalos) / 60
+    pico, total_horas = cobertura.huella(intervalos)
 
     st.metric("Pico estructural simultáneo", f"{pico} funciones")
     st.metric("Horas estructurales totales", f"{total_horas:.1f} h / día")
@@ -279,6 +308,7 @@ else:
 # ======================================================
 # BLOQUE FINAL · SALIDA ESTRUCTURAL
 # ======================================================
+traza.bloque("BLOQUE FINAL · SALIDA ESTRUCTURAL")
 st.divider()
 st.subheader("Salida estructural RRHH Core")
 
@@ -290,3 +320,5 @@ if st.session_state.rrhh_core["salida"]:
     )
 else:
     st.info("Todavía no hay salida estructural disponible.")
+
+traza.fin()
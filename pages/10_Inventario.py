@@ -1,14 +1,22 @@
 import streamlit as st
 import pandas as pd
-from pathlib import Path
 from datetime import date
 
+from oyken import locales, rendimiento
+from oyken.derivados import variacion_inventario
+from oyken.storage import almacen
+
+traza = rendimiento.pagina(__file__)
+
 # =====================================================
 # CONFIGURACIÓN
 # =====================================================
+traza.bloque("CONFIGURACIÓN")
 st.title("OYKEN · Inventario")
 
-INVENTARIO_FILE = Path("inventario_mensual.csv")
+# Local activo (barra lateral): esta página trabaja sobre un solo local
+locales.selector(grupo=False)
+ALMACEN = almacen()
 
 MESES_ES = {
     1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
@@ -17,31 +25,15 @@ MESES_ES = {
 }
 
 # =====================================================
-# CARGA / INICIALIZACIÓN CSV
+# CARGA (TIPADA POR EL ALMACÉN)
 # =====================================================
-if INVENTARIO_FILE.exists():
-    df_inv = pd.read_csv(INVENTARIO_FILE)
-else:
-    df_inv = pd.DataFrame(
-        columns=[
-            "anio",
-            "mes",
-            "inventario_cierre_eur",
-            "variacion_inventario_eur",
-            "fecha_actualizacion"
-        ]
-    )
-
-# Asegurar tipos
-df_inv["anio"] = pd.to_numeric(df_inv["anio"], errors="coerce")
-df_inv["mes"] = pd.to_numeric(df_inv["mes"], errors="coerce")
-df_inv["inventario_cierre_eur"] = pd.to_numeric(
-    df_inv["inventario_cierre_eur"], errors="coerce"
-).fillna(0)
+traza.bloque("CARGA")
+df_inv = ALMACEN.leer("inventario_mensual")
 
 # =====================================================
 # BLOQUE 1 — REGISTRO DE INVENTARIO MENSUAL
 # =====================================================
+traza.bloque("BLOQUE 1 — REGISTRO DE INVENTARIO MENSUAL")
 st.divider()
 st.subheader("Registro de inventario mensual")
 
@@ -51,7 +43,7 @@ with st.form("form_inventario_mensual", clear_on_submit=True):
 
     with c1:
         anios_disponibles = sorted(
-            set(df_inv["anio"].dropna().astype(int).tolist())
+            set(df_inv["anio"].tolist())
             | {date.today().year}
         )
         anio_sel = st.selectbox("Año", anios_disponibles)
@@ -73,21 +65,24 @@ with st.form("form_inventario_mensual", clear_on_submit=True):
     guardar = st.form_submit_button("Guardar inventario")
 
     if guardar:
-        # Eliminar posible registro previo del mismo año/mes
-        df_inv = df_inv[
-            ~((df_inv["anio"] == anio_sel) & (df_inv["mes"] == mes_sel))
-        ]
-
         nuevo = pd.DataFrame([{
             "anio": anio_sel,
             "mes": mes_sel,
             "inventario_cierre_eur": round(inventario_valor, 2),
-            "variacion_inventario_eur": 0,  # se recalcula luego
+            "variacion_inventario_eur": 0,  # se recalcula al guardar
             "fecha_actualizacion": date.today().isoformat()
         }])
 
-        df_inv = pd.concat([df_inv, nuevo], ignore_index=True)
-        df_inv.to_csv(INVENTARIO_FILE, index=False)
+        def con_inventario(df_inv):
+            # Eliminar posible registro previo del mismo año/mes
+            df_inv = df_inv[
+                ~((df_inv["anio"] == anio_sel) & (df_inv["mes"] == mes_sel))
+            ]
+            df_inv = pd.concat([df_inv, nuevo], ignore_index=True)
+            return variacion_inventario(df_inv)
+
+        # Sobre la tabla vigente (cerrojo del almacén)
+        df_inv = ALMACEN.actualizar("inventario_mensual", con_inventario)
 
         st.success("Inventario mensual guardado correctamente")
         st.rerun()
@@ -95,6 +90,7 @@ with st.form("form_inventario_mensual", clear_on_submit=True):
 # =====================================================
 # BLOQUE 2 — HISTÓRICO DE INVENTARIOS MENSUALES
 # =====================================================
+traza.bloque("BLOQUE 2 — HISTÓRICO DE INVENTARIOS MENSUALES")
 st.divider()
 st.subheader("Histórico de inventarios mensuales")
 
@@ -120,25 +116,15 @@ else:
 # =====================================================
 # BLOQUE 3 — VARIACIÓN DE INVENTARIO MENSUAL
 # =====================================================
+traza.bloque("BLOQUE 3 — VARIACIÓN DE INVENTARIO MENSUAL")
 st.divider()
 st.subheader("Variación de inventario mensual")
 
 if not df_inv.empty:
 
+    # Variación recalculada y persistida al guardar; aquí solo se lee
     df_var = df_inv.sort_values(["anio", "mes"]).copy()
 
-    df_var["variacion_inventario_eur"] = (
-        df_var["inventario_cierre_eur"]
-        - df_var["inventario_cierre_eur"].shift(1)
-    )
-
-    # Primer registro sin variación
-    df_var.loc[df_var.index[0], "variacion_inventario_eur"] = 0
-
-    # Persistir variación recalculada
-    df_inv.update(df_var)
-    df_inv.to_csv(INVENTARIO_FILE, index=False)
-
     df_var["Mes"] = df_var["mes"].map(MESES_ES)
 
     st.dataframe(
@@ -157,8 +143,9 @@ if not df_inv.empty:
     )
 
 # =====================================================
-# BLOQUE 4 — INVENTARIO MENSUAL (CSV CANÓNICO)
+# BLOQUE 4 — INVENTARIO MENSUAL (CANÓNICO)
 # =====================================================
+traza.bloque("BLOQUE 4 — INVENTARIO MENSUAL")
 st.divider()
 st.subheader("Inventario mensual (estructura de cálculo)")
 
@@ -188,3 +175,5 @@ if not df_inv.empty:
         hide_index=True,
         use_container_width=True
     )
+
+traza.fin()
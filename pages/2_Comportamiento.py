@@ -1,88 +1,90 @@
 import streamlit as st
 import pandas as pd
-from pathlib import Path
 from datetime import date
 
+from oyken import locales, rendimiento
+from oyken.calendario import dia
+from oyken.kpi import peso_pct, ratio
+from oyken.tickets import cargar_tickets, hay_tickets
+from oyken.ventas import TURNOS, anios_ventas, cargar_kpi_diario, cargar_ventas
+
+traza = rendimiento.pagina(__file__)
+
 # =========================
 # CONFIGURACIÓN
 # =========================
+traza.bloque("CONFIGURACIÓN")
 
 st.title("OYKEN · Comportamiento del cliente")
 st.caption("Cómo compra el cliente · Semana en curso")
 
-DATA_FILE = Path("ventas.csv")
-
-DOW_ES = {
-    0: "Lunes", 1: "Martes", 2: "Miércoles",
-    3: "Jueves", 4: "Viernes", 5: "Sábado", 6: "Domingo"
-}
+# Local activo (barra lateral); la vista de grupo suma todos los locales
+locales.selector(grupo=True)
 
 # =========================
 # CARGA DE DATOS
 # =========================
-if not DATA_FILE.exists():
-    st.warning("No hay datos suficientes.")
-    st.stop()
-
-df = pd.read_csv(DATA_FILE, parse_dates=["fecha"])
-df = df.sort_values("fecha")
+traza.bloque("CARGA DE DATOS")
+# Solo las columnas que usa la página (sin observaciones)
+COLUMNAS = [
+    "ventas_manana_eur", "ventas_tarde_eur", "ventas_noche_eur", "ventas_total_eur",
+    "comensales_manana", "comensales_tarde", "comensales_noche",
+    "tickets_manana", "tickets_tarde", "tickets_noche",
+]
 
-# =========================
-# PREPARACIÓN TEMPORAL
-# =========================
-df["weekday"] = df["fecha"].dt.weekday
-df["dow"] = df["weekday"].map(DOW_ES)
+# weekday / dow / iso_week / iso_year llegan derivados desde la carga
+hoy = pd.to_datetime(date.today())
+cal_hoy = dia(hoy)
+week_actual = cal_hoy["iso_week"]
+year_actual = cal_hoy["iso_year"]
 
-df["week"] = df["fecha"].dt.isocalendar().week
-df["year"] = df["fecha"].dt.isocalendar().year
+# Solo la semana ISO en curso
+lunes = hoy - pd.Timedelta(days=hoy.weekday())
+df = cargar_ventas(desde=lunes, hasta=lunes + pd.Timedelta(days=6), columnas=COLUMNAS)
+traza.filas(len(df))
 
-hoy = pd.to_datetime(date.today())
-week_actual = hoy.isocalendar().week
-year_actual = hoy.isocalendar().year
-dow_hoy = hoy.weekday()
+if df.empty and not anios_ventas():
+    st.warning("No hay datos suficientes.")
+    traza.parar()
 
 # =========================
 # FILTROS DE PERIODO
 # =========================
+traza.bloque("FILTROS DE PERIODO")
 df_semana = df[
-    (df["week"] == week_actual) &
-    (df["year"] == year_actual)
-]
-
-df_patron = df[
-    (df["weekday"] == dow_hoy) &
-    (df["fecha"] < hoy)
+    (df["iso_week"] == week_actual) &
+    (df["iso_year"] == year_actual)
 ]
 
 if df_semana.empty:
     st.info("Aún no hay datos en la semana actual.")
-    st.stop()
+    traza.parar()
 
 # =========================
 # AGREGADOS SEMANA
 # =========================
-ventas_total = df_semana["ventas_total_eur"].sum()
-comensales_total = (
-    df_semana["comensales_manana"].sum() +
-    df_semana["comensales_tarde"].sum() +
-    df_semana["comensales_noche"].sum()
+traza.bloque("AGREGADOS SEMANA")
+# Totales por día materializados al guardar (ventas_kpi_diario)
+kpi_semana = cargar_kpi_diario(
+    desde=lunes,
+    hasta=lunes + pd.Timedelta(days=6),
+    columnas=["ventas_total_eur", "comensales_total", "tickets_total"]
 )
 
-tickets_total = (
-    df_semana["tickets_manana"].sum() +
-    df_semana["tickets_tarde"].sum() +
-    df_semana["tickets_noche"].sum()
-)
+ventas_total = kpi_semana["ventas_total_eur"].sum()
+comensales_total = kpi_semana["comensales_total"].sum()
+tickets_total = kpi_semana["tickets_total"].sum()
 
 # Métricas comportamiento
-tickets_por_comensal = tickets_total / comensales_total if comensales_total > 0 else 0
-eur_por_comensal = ventas_total / comensales_total if comensales_total > 0 else 0
+tickets_por_comensal = ratio(tickets_total, comensales_total)
+eur_por_comensal = ratio(ventas_total, comensales_total)
 
 # =========================
 # PESO POR TURNO
 # =========================
+traza.bloque("PESO POR TURNO")
 def peso_turno(col):
-    return df_semana[col].sum() / ventas_total * 100 if ventas_total > 0 else 0
+    return peso_pct(df_semana[col].sum(), ventas_total)
 
 peso_manana = peso_turno("ventas_manana_eur")
 peso_tarde = peso_turno("ventas_tarde_eur")
@@ -91,6 +93,7 @@ peso_noche = peso_turno("ventas_noche_eur")
 # =========================
 # CABECERA
 # =========================
+traza.bloque("CABECERA")
 st.markdown("### Semana en curso")
 st.caption(
     f"{df_semana['fecha'].min().strftime('%d/%m/%Y')} "
@@ -100,6 +103,7 @@ st.caption(
 # =========================
 # BLOQUE A · KPIs COMPORTAMIENTO
 # =========================
+traza.bloque("BLOQUE A · KPIs COMPORTAMIENTO")
 c1, c2, c3, c4 = st.columns(4)
 
 with c1:
@@ -129,6 +133,7 @@ with c4:
 # =========================
 # BLOQUE B · POR TURNO
 # =========================
+traza.bloque("BLOQUE B · POR TURNO")
 st.divider()
 st.subheader("Comportamiento por turno")
 
@@ -138,9 +143,9 @@ def bloque_turno(nombre, v_col, c_col, t_col):
     tic = df_semana[t_col].sum()
 
     st.markdown(f"**{nombre}**")
-    st.write(f"€ / comensal: {(ventas / com) if com > 0 else 0:,.2f} €")
-    st.write(f"Tickets / comensal: {(tic / com) if com > 0 else 0:.2f}")
-    st.write(f"Peso sobre total: {(ventas / ventas_total * 100) if ventas_total > 0 else 0:.1f} %")
+    st.write(f"€ / comensal: {ratio(ventas, com):,.2f} €")
+    st.write(f"Tickets / comensal: {ratio(tic, com):.2f}")
+    st.write(f"Peso sobre total: {peso_pct(ventas, ventas_total):.1f} %")
 
 c1, c2, c3 = st.columns(3)
 
@@ -168,9 +173,35 @@ with c3:
         "tickets_noche"
     )
 
+# =========================
+# BLOQUE B2 · DISTRIBUCIÓN DEL TICKET
+# =========================
+traza.bloque("BLOQUE B2 · DISTRIBUCIÓN DEL TICKET")
+# Solo con el registro de tickets del TPV (python -m oyken.importar --tickets)
+if hay_tickets():
+    tickets_semana = cargar_tickets(desde=lunes, hasta=lunes + pd.Timedelta(days=6))
+    cobros = tickets_semana[tickets_semana["importe_eur"] > 0]
+
+    if not cobros.empty:
+        st.divider()
+        st.subheader("Distribución del ticket")
+
+        NOMBRES_TURNO = {"manana": "Mañana", "tarde": "Tarde", "noche": "Noche"}
+        por_turno = cobros.groupby("turno")["importe_eur"]
+        distribucion = por_turno.quantile([0.25, 0.5, 0.75]).unstack().reindex(list(TURNOS))
+        distribucion.columns = ["P25 (€)", "Mediana (€)", "P75 (€)"]
+        distribucion.insert(0, "Tickets", por_turno.size().reindex(list(TURNOS)).fillna(0).astype(int))
+        distribucion.index = [NOMBRES_TURNO[t] for t in distribucion.index]
+
+        st.dataframe(distribucion.round(2), use_container_width=True)
+
+        st.caption("Tickets por hora")
+        st.bar_chart(cobros.groupby(cobros["hora"].astype(int)).size().rename("Tickets"))
+
 # =========================
 # BLOQUE C · LECTURA OYKEN
 # =========================
+traza.bloque("BLOQUE C · LECTURA OYKEN")
 st.divider()
 st.subheader("Lectura de comportamiento")
 
@@ -192,3 +223,5 @@ for l in lectura:
     st.write(l)
 
 st.caption("Este bloque describe comportamiento. No anticipa ni recomienda.")
+
+traza.fin()
@@ -1,36 +1,67 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from pathlib import Path
+
+from oyken import locales, rendimiento
+from oyken.tickets import cargar_tickets, hay_tickets
+from oyken.ventas import cargar_kpi_diario, ultimas_ventas
+
+traza = rendimiento.pagina(__file__)
 
 # =========================
 # CONFIGURACIÓN
 # =========================
+traza.bloque("CONFIGURACIÓN")
 st.set_page_config(page_title="OIKEN · Tendencias", layout="centered")
 
 st.title("OIKEN · Tendencias")
 st.caption("Estructura, estabilidad y robustez del negocio")
 
-DATA_FILE = Path("ventas.csv")
+# Local activo (barra lateral); la vista de grupo suma todos los locales
+locales.selector(grupo=True)
 
 # =========================
 # CARGA DE DATOS
 # =========================
-if not DATA_FILE.exists():
+traza.bloque("CARGA DE DATOS")
+# Solo las columnas que usa la página (sin observaciones)
+COLUMNAS = [
+    "ventas_total_eur",
+    "tickets_manana", "tickets_tarde", "tickets_noche",
+]
+
+# KPIs diarios materializados al guardar (oyken.ventas.kpi_diario)
+COLUMNAS_KPI = [
+    "tickets_total", "ticket_medio_total_eur",
+    "ticket_medio_manana_eur", "ticket_medio_tarde_eur", "ticket_medio_noche_eur",
+]
+
+# Las ventanas más largas (15 días, semana previa) caben en 30 días
+df = ultimas_ventas(30, columnas=COLUMNAS)
+traza.filas(len(df))
+
+if df.empty:
     st.error("No hay datos suficientes para analizar tendencias.")
-    st.stop()
+    traza.parar()
+
+df = df.merge(
+    cargar_kpi_diario(desde=df["fecha"].min(), hasta=df["fecha"].max(), columnas=COLUMNAS_KPI),
+    on="fecha",
+    how="left"
+)
 
-df = pd.read_csv(DATA_FILE, parse_dates=["fecha"]).sort_values("fecha")
 hoy = df["fecha"].max()
 
 # =========================
 # UTILIDADES
 # =========================
+traza.bloque("UTILIDADES")
 def rango_fechas(df):
     return f"{df['fecha'].min().strftime('%d/%m')} – {df['fecha'].max().strftime('%d/%m')}"
 
-def cv_turno_seguro(ventas, tickets):
-    tm = np.where(tickets > 0, ventas / tickets, np.nan)
+def cv_turno_seguro(ticket_medio, tickets):
+    # Días sin tickets fuera de la dispersión
+    tm = np.where(tickets > 0, ticket_medio, np.nan)
     return np.nanstd(tm)
 
 def info_requisito(texto):
@@ -68,21 +99,14 @@ def render_bloque_no_disponible(titulo, motivo, requisito):
 # =========================
 # VARIABLES BASE
 # =========================
-df["tickets_total"] = (
-    df["tickets_manana"] +
-    df["tickets_tarde"] +
-    df["tickets_noche"]
-)
-
-df["ticket_medio"] = np.where(
-    df["tickets_total"] > 0,
-    df["ventas_total_eur"] / df["tickets_total"],
-    np.nan
-)
+traza.bloque("VARIABLES BASE")
+# tickets_total / ticket_medio_*: KPIs diarios (sin tickets, fuera de la media)
+df["ticket_medio"] = df["ticket_medio_total_eur"].where(df["tickets_total"] > 0)
 
 # =========================
 # VENTANAS TEMPORALES
 # =========================
+traza.bloque("VENTANAS TEMPORALES")
 lunes_semana = hoy - pd.Timedelta(days=hoy.weekday())
 df_semana = df[(df["fecha"] >= lunes_semana) & (df["fecha"] <= hoy)]
 
@@ -93,6 +117,7 @@ df_15 = df.tail(15)
 # =========================
 # 1 · DIRECCIÓN DEL NEGOCIO
 # =========================
+traza.bloque("1 · DIRECCIÓN DEL NEGOCIO")
 if len(df_semana) >= 5:
     media_actual = df_semana["ventas_total_eur"].mean()
     prev = df[df["fecha"] < lunes_semana].tail(len(df_semana))
@@ -133,6 +158,7 @@ else:
 # =========================
 # 2 · CONSISTENCIA DEL RESULTADO
 # =========================
+traza.bloque("2 · CONSISTENCIA DEL RESULTADO")
 if len(df_7) >= 7 and df_7["ventas_total_eur"].mean() > 0:
     cv_ventas = (
         df_7["ventas_total_eur"].std()
@@ -166,11 +192,10 @@ else:
 # =========================
 # 3 · DÍAS FUERTES Y DÉBILES
 # =========================
+traza.bloque("3 · DÍAS FUERTES Y DÉBILES")
 if len(df_15) >= 15:
-    df_15 = df_15.copy()
-    df_15["weekday"] = df_15["fecha"].dt.day_name()
-
-    media_dia = df_15.groupby("weekday")["ventas_total_eur"].mean()
+    # dow llega derivado desde la carga (dimensión de calendario)
+    media_dia = df_15.groupby("dow")["ventas_total_eur"].mean()
     dia_fuerte = media_dia.idxmax()
     dia_debil = media_dia.idxmin()
 
@@ -200,6 +225,7 @@ else:
 # =========================
 # 4 · ESTABILIDAD DEL TICKET MEDIO
 # =========================
+traza.bloque("4 · ESTABILIDAD DEL TICKET MEDIO")
 if len(df_7) >= 7 and df_7["ticket_medio"].mean() > 0:
     cv_ticket = (
         df_7["ticket_medio"].std()
@@ -232,11 +258,12 @@ else:
 # =========================
 # 5 · VOLATILIDAD POR TURNOS
 # =========================
+traza.bloque("5 · VOLATILIDAD POR TURNOS")
 if len(df_7) >= 7:
     tabla_turnos = [
-        {"Turno": "Mañana", "CV": cv_turno_seguro(df_7["ventas_manana_eur"], df_7["tickets_manana"])},
-        {"Turno": "Tarde",  "CV": cv_turno_seguro(df_7["ventas_tarde_eur"], df_7["tickets_tarde"])},
-        {"Turno": "Noche",  "CV": cv_turno_seguro(df_7["ventas_noche_eur"], df_7["tickets_noche"])},
+        {"Turno": "Mañana", "CV": cv_turno_seguro(df_7["ticket_medio_manana_eur"], df_7["tickets_manana"])},
+        {"Turno": "Tarde",  "CV": cv_turno_seguro(df_7["ticket_medio_tarde_eur"], df_7["tickets_tarde"])},
+        {"Turno": "Noche",  "CV": cv_turno_seguro(df_7["ticket_medio_noche_eur"], df_7["tickets_noche"])},
     ]
 
     turno_mas_volatil = max(tabla_turnos, key=lambda x: x["CV"])["Turno"]
@@ -266,6 +293,7 @@ else:
 # =========================
 # 6 · DEPENDENCIA DE PICOS
 # =========================
+traza.bloque("6 · DEPENDENCIA DE PICOS")
 if len(df_10) >= 10:
     media = df_10["ventas_total_eur"].mean()
     desv = df_10["ventas_total_eur"].std()
@@ -301,10 +329,49 @@ else:
         "Requisito mínimo: 10 días de operación."
     )
 
+# =========================
+# 7 · DISPERSIÓN DEL TICKET
+# =========================
+traza.bloque("7 · DISPERSIÓN DEL TICKET")
+# Tickets individuales del TPV (registro opcional de oyken.tickets)
+cobros = cargar_tickets(desde=df_7["fecha"].min(), hasta=hoy) if hay_tickets() else None
+if cobros is not None:
+    cobros = cobros[cobros["importe_eur"] > 0]
+
+if cobros is not None and len(cobros) >= 30:
+    p25, mediana, p75 = cobros["importe_eur"].quantile([0.25, 0.5, 0.75])
+    dispersion = (p75 - p25) / mediana * 100 if mediana > 0 else 0
+
+    texto = f"""
+Este bloque describe la distribución real del gasto por ticket, a
+partir de cada operación registrada en el TPV y no de la media diaria.
+
+La mitad central de los tickets se sitúa entre {p25:,.2f} € y {p75:,.2f} €,
+con una mediana de {mediana:,.2f} € y un rango intercuartílico del
+{dispersion:.1f} % sobre la mediana.
+"""
+
+    render_bloque(
+        "Dispersión del ticket",
+        "Ticket mediano",
+        f"{mediana:,.2f} €",
+        rango_fechas(df_7),
+        texto
+    )
+else:
+    render_bloque_no_disponible(
+        "Dispersión del ticket",
+        "Este bloque analiza la distribución del gasto por ticket individual.",
+        "Requisito mínimo: registro de tickets del TPV (importación con --tickets) con 30 tickets."
+    )
+
 # =========================
 # NOTA FINAL
 # =========================
+traza.bloque("NOTA FINAL")
 st.caption(
     "Este módulo analiza tendencias estructurales del negocio. "
     "La lectura se prioriza sobre criterios de calidad operativa."
 )
+
+traza.fin()
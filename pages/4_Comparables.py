@@ -1,37 +1,47 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from pathlib import Path
 from datetime import date
 
+from oyken import locales, rendimiento
+from oyken.ventas import anios_ventas, cargar_ventas, comparar_ventas
+
+traza = rendimiento.pagina(__file__)
+
 # =========================
 # CONFIGURACIÓN
 # =========================
+traza.bloque("CONFIGURACIÓN")
 st.title("OIKEN · Comparables")
 st.caption("Pulso diario, proyección y estructura temporal del negocio")
 
-DATA_FILE = Path("ventas.csv")
+# Local activo (barra lateral); la vista de grupo suma todos los locales
+locales.selector(grupo=True)
 
 # =========================
 # CARGA DE DATOS
 # =========================
-if not DATA_FILE.exists():
-    st.error("No hay datos suficientes para mostrar comparables.")
-    st.stop()
+traza.bloque("CARGA DE DATOS")
+# Año en curso + mismo mes del año anterior; solo las columnas que se usan
+COLUMNAS = ["ventas_total_eur", "tickets_manana", "tickets_tarde", "tickets_noche"]
 
-df = pd.read_csv(DATA_FILE, parse_dates=["fecha"])
-df = df.sort_values("fecha")
+hoy = pd.to_datetime(date.today())
+df = cargar_ventas(
+    desde=date(hoy.year - 1, hoy.month, 1),
+    hasta=date(hoy.year, 12, 31),
+    columnas=COLUMNAS
+)
+traza.filas(len(df))
 
-if df.empty:
-    st.stop()
+if df.empty and not anios_ventas():
+    st.error("No hay datos suficientes para mostrar comparables.")
+    traza.parar()
 
 # =========================
 # VARIABLES BASE
 # =========================
-df["year"] = df["fecha"].dt.year
-df["weekday"] = df["fecha"].dt.weekday
-df["day"] = df["fecha"].dt.day
-
+traza.bloque("VARIABLES BASE")
+# anio / weekday / dia llegan derivados desde la carga
 df["tickets_total"] = (
     df["tickets_manana"] +
     df["tickets_tarde"] +
@@ -41,7 +51,7 @@ df["tickets_total"] = (
 # =========================
 # FECHA ACTUAL
 # =========================
-hoy = pd.to_datetime(date.today())
+traza.bloque("FECHA ACTUAL")
 df_mes = df[
     (df["fecha"].dt.year == hoy.year) &
     (df["fecha"].dt.month == hoy.month) &
@@ -52,7 +62,7 @@ dias_operativos = hoy.day
 
 if df_mes.empty:
     st.warning("No hay datos del mes en curso.")
-    st.stop()
+    traza.parar()
 
 ventas_acumuladas = df_mes["ventas_total_eur"].sum()
 ritmo_diario = ventas_acumuladas / dias_operativos
@@ -61,6 +71,7 @@ estimacion_cierre = ritmo_diario * 30
 # =========================
 # 1. PULSO DIARIO (DOW)
 # =========================
+traza.bloque("1. PULSO DIARIO (DOW)")
 st.subheader("Pulso diario (comparativa DOW)")
 
 df_prev = df[
@@ -68,29 +79,23 @@ df_prev = df[
     (df["fecha"].dt.month == hoy.month)
 ].copy()
 
-registros = []
-
-for _, row in df_mes.iterrows():
-    dow_eq = df_prev[df_prev["weekday"] == row["weekday"]]
-    if dow_eq.empty:
-        continue
-
-    ref = dow_eq.iloc[0]
-    if ref["ventas_total_eur"] <= 0:
-        continue
-
-    pct = (
-        (row["ventas_total_eur"] - ref["ventas_total_eur"])
-        / ref["ventas_total_eur"] * 100
-    )
-
-    registros.append({
-        "fecha": row["fecha"].strftime("%a %d"),
-        "variacion_pct": pct,
-        "ventas": row["ventas_total_eur"]
-    })
+# Cada día frente a su comparable (mismo día de la semana ISO del año
+# anterior), en un solo cruce por versión de los datos
+pulso = comparar_ventas(
+    desde=df_mes["fecha"].min(),
+    hasta=df_mes["fecha"].max(),
+    columnas=["ventas_total_eur"]
+)
+pulso = pulso[pulso["ventas_total_eur_comp"] > 0]
 
-df_pulso = pd.DataFrame(registros)
+df_pulso = pd.DataFrame({
+    "fecha": pulso["fecha"].dt.strftime("%a %d"),
+    "variacion_pct": (
+        (pulso["ventas_total_eur"] - pulso["ventas_total_eur_comp"])
+        / pulso["ventas_total_eur_comp"] * 100
+    ),
+    "ventas": pulso["ventas_total_eur"]
+})
 
 if not df_pulso.empty:
     max_venta = df_pulso["ventas"].max()
@@ -110,6 +115,7 @@ if not df_pulso.empty:
 # =========================
 # 2. ESTIMACIÓN DE CIERRE
 # =========================
+traza.bloque("2. ESTIMACIÓN DE CIERRE")
 st.divider()
 st.subheader("Estimación de cierre de mes")
 
@@ -127,6 +133,7 @@ st.caption(
 # =========================
 # 3. EVOLUCIÓN MENSUAL DOW
 # =========================
+traza.bloque("3. EVOLUCIÓN MENSUAL DOW")
 st.divider()
 st.subheader("Evolución mensual ajustada a DOW")
 
@@ -149,6 +156,7 @@ if ventas_prev > 0:
 # =========================
 # 4. RITMO MEDIO DIARIO
 # =========================
+traza.bloque("4. RITMO MEDIO DIARIO")
 st.divider()
 st.subheader("Ritmo medio diario")
 
@@ -163,10 +171,11 @@ st.metric(
 # =========================
 # 5. PESO DEL AÑO POR CUATRIMESTRES
 # =========================
+traza.bloque("5. PESO DEL AÑO POR CUATRIMESTRES")
 st.divider()
 st.subheader("Peso del año por cuatrimestres")
 
-df_year = df[df["year"] == hoy.year].copy()
+df_year = df[df["anio"] == hoy.year].copy()
 df_year["cuatrimestre"] = pd.cut(
     df_year["fecha"].dt.month,
     bins=[0, 4, 8, 12],
@@ -194,6 +203,9 @@ st.table(
 # =========================
 # NOTA DE SISTEMA
 # =========================
+traza.bloque("NOTA DE SISTEMA")
 st.caption(
     "Comparables estructurales basados en calendario, DOW y ritmo operativo."
 )
+
+traza.fin()
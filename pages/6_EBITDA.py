@@ -1,10 +1,15 @@
 import streamlit as st
-import pandas as pd
-from pathlib import Path
+
+from oyken import ebitda, locales, rendimiento
+from oyken.derivados import asegurar_consolidados
+from oyken.storage import almacen
+
+traza = rendimiento.pagina(__file__)
 
 # =========================
 # CONFIGURACIÓN
 # =========================
+traza.bloque("CONFIGURACIÓN")
 st.set_page_config(
     page_title="OYKEN · EBITDA",
     layout="centered"
@@ -13,50 +18,39 @@ st.set_page_config(
 st.title("OYKEN · EBITDA")
 
 # =========================
-# ARCHIVOS CANÓNICOS
+# ALMACÉN CANÓNICO
 # =========================
-VENTAS_FILE      = Path("ventas_mensuales.csv")
-COMPRAS_FILE     = Path("compras_mensuales.csv")
-RRHH_FILE        = Path("rrhh_mensual.csv")
-GASTOS_FILE      = Path("gastos_mensuales.csv")
-INVENTARIO_FILE  = Path("inventario_mensual.csv")
-
-if not all(p.exists() for p in [
-    VENTAS_FILE, COMPRAS_FILE, RRHH_FILE, GASTOS_FILE
-]):
+traza.bloque("ALMACÉN")
+# Local activo (barra lateral): esta página trabaja sobre un solo local
+locales.selector(grupo=False)
+ALMACEN = almacen()
+
+# Artefactos del grafo que consume EBITDA (oyken.derivados)
+ENTRADAS_EBITDA = [
+    "ventas_mensuales", "compras_mensuales", "rrhh_mensual", "gastos_mensuales",
+    "breakeven_resumen"
+]
+asegurar_consolidados(ALMACEN, ENTRADAS_EBITDA)
+
+if not all(ALMACEN.existe(nombre) for nombre in ENTRADAS_EBITDA[:4]):
     st.warning("Aún no existen cierres mensuales suficientes para calcular EBITDA.")
-    st.stop()
+    traza.parar()
 
 # =========================
-# CARGA DE DATOS
+# CARGA DE DATOS (TIPADA POR EL ALMACÉN)
 # =========================
-df_v = pd.read_csv(VENTAS_FILE)
-df_c = pd.read_csv(COMPRAS_FILE)
-df_r = pd.read_csv(RRHH_FILE)
-df_g = pd.read_csv(GASTOS_FILE)
-
-if INVENTARIO_FILE.exists():
-    df_i = pd.read_csv(INVENTARIO_FILE)
-else:
-    df_i = pd.DataFrame(columns=["anio", "mes", "variacion_inventario_eur"])
-
-# Normalizar tipos
-for df in [df_v, df_c, df_r, df_g, df_i]:
-    df["anio"] = pd.to_numeric(df["anio"], errors="coerce")
-    df["mes"] = pd.to_numeric(df["mes"], errors="coerce")
-
-df_v["ventas_total_eur"] = pd.to_numeric(df_v["ventas_total_eur"], errors="coerce").fillna(0)
-df_c["compras_total_eur"] = pd.to_numeric(df_c["compras_total_eur"], errors="coerce").fillna(0)
-df_r["rrhh_total_eur"] = pd.to_numeric(df_r["rrhh_total_eur"], errors="coerce").fillna(0)
-df_g["gastos_total_eur"] = pd.to_numeric(df_g["gastos_total_eur"], errors="coerce").fillna(0)
-df_i["variacion_inventario_eur"] = pd.to_numeric(
-    df_i.get("variacion_inventario_eur", 0),
-    errors="coerce"
-).fillna(0)
+traza.bloque("CARGA DE DATOS")
+df_v = ALMACEN.leer("ventas_mensuales")
+df_c = ALMACEN.leer("compras_mensuales")
+df_r = ALMACEN.leer("rrhh_mensual")
+df_g = ALMACEN.leer("gastos_mensuales")
+df_i = ALMACEN.leer("inventario_mensual")
+traza.filas(sum(map(len, (df_v, df_c, df_r, df_g, df_i))))
 
 # =========================
 # SELECTORES
 # =========================
+traza.bloque("SELECTORES")
 anios_disponibles = sorted(
     set(df_v["anio"].dropna())
     | set(df_c["anio"].dropna())
@@ -82,17 +76,13 @@ with c2:
 # =========================
 # BREAKEVEN · LECTURA CANÓNICA
 # =========================
+traza.bloque("BREAKEVEN")
 
-BREAKEVEN_RESUMEN_FILE = Path("breakeven_resumen.csv")
-
-if not BREAKEVEN_RESUMEN_FILE.exists():
-    st.warning("No existe resumen de Breakeven. Ejecuta primero la página de Breakeven.")
-    st.stop()
-
-df_be = pd.read_csv(BREAKEVEN_RESUMEN_FILE)
+if not ALMACEN.existe("breakeven_resumen"):
+    st.warning("No existe resumen de Breakeven: faltan compras o ventas consolidadas.")
+    traza.parar()
 
-df_be["anio"] = pd.to_numeric(df_be["anio"], errors="coerce")
-df_be["mes"] = pd.to_numeric(df_be["mes"], errors="coerce")
+df_be = ALMACEN.leer("breakeven_resumen")
 
 df_be_sel = df_be[
     (df_be["anio"] == anio_sel) &
@@ -101,50 +91,21 @@ df_be_sel = df_be[
 
 if df_be_sel.empty:
     st.warning("No hay datos de Breakeven para el período seleccionado.")
-    st.stop()
+    traza.parar()
 
 be = df_be_sel.iloc[0]
 
 # =========================
-# FILTRADO
+# BASE MENSUAL + CÁLCULOS (oyken.ebitda)
 # =========================
-for name in ["df_v", "df_c", "df_r", "df_g", "df_i"]:
-    locals()[name] = locals()[name][locals()[name]["anio"] == anio_sel]
-    if mes_sel != 0:
-        locals()[name] = locals()[name][locals()[name]["mes"] == mes_sel]
-
-# =========================
-# BASE MENSUAL
-# =========================
-base = pd.DataFrame({"mes": range(1, 13)})
-
-base = base.merge(df_v[["mes", "ventas_total_eur"]], on="mes", how="left")
-base = base.merge(df_c[["mes", "compras_total_eur"]], on="mes", how="left")
-base = base.merge(df_r[["mes", "rrhh_total_eur"]], on="mes", how="left")
-base = base.merge(df_g[["mes", "gastos_total_eur"]], on="mes", how="left")
-base = base.merge(df_i[["mes", "variacion_inventario_eur"]], on="mes", how="left")
-
-base = base.fillna(0)
-
-if mes_sel != 0:
-    base = base[base["mes"] == mes_sel]
-
-base = base.sort_values("mes")
-
-# =========================
-# CÁLCULOS
-# =========================
-base["ebitda_base_eur"] = (
-    base["ventas_total_eur"]
-    - base["compras_total_eur"]
-    - base["rrhh_total_eur"]
-    - base["gastos_total_eur"]
-)
-
-base["ebitda_ajustado_eur"] = (
-    base["ebitda_base_eur"]
-    - base["variacion_inventario_eur"]
-)
+traza.bloque("BASE MENSUAL")
+base = ebitda.ebitda(ebitda.base_mensual({
+    "ventas_mensuales": df_v,
+    "compras_mensuales": df_c,
+    "rrhh_mensual": df_r,
+    "gastos_mensuales": df_g,
+    "inventario_mensual": df_i,
+}, anio_sel, mes_sel))
 
 MESES_ES = {
     1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
@@ -157,6 +118,7 @@ base["Mes"] = base["mes"].map(MESES_ES)
 # =====================================================
 # BLOQUE 1 — EBITDA OPERATIVO
 # =====================================================
+traza.bloque("BLOQUE 1 — EBITDA OPERATIVO")
 st.divider()
 st.subheader("EBITDA operativo (sin inventario)")
 
@@ -182,6 +144,7 @@ st.dataframe(
 # =====================================================
 # BLOQUE 2 — AJUSTE POR VARIACIÓN DE INVENTARIO
 # =====================================================
+traza.bloque("BLOQUE 2 — AJUSTE POR VARIACIÓN DE INVENTARIO")
 st.divider()
 st.subheader("Ajuste por variación de inventario")
 
@@ -199,6 +162,7 @@ st.dataframe(
 # =====================================================
 # BLOQUE 3 — EBITDA AJUSTADO
 # =====================================================
+traza.bloque("BLOQUE 3 — EBITDA AJUSTADO")
 st.divider()
 st.subheader("EBITDA ajustado (consumo real)")
 
@@ -245,6 +209,7 @@ with c2:
 # =========================
 # VARIABLES CANÓNICAS GARANTIZADAS
 # =========================
+traza.bloque("VARIABLES CANÓNICAS")
 
 try:
     be_real = float(be["breakeven_real_eur"])
@@ -252,12 +217,13 @@ try:
     mc = float(be["margen_contribucion_real_pct"])
 except Exception:
     st.error("No se pueden calcular las variables estructurales (Breakeven / Brecha).")
-    st.stop()
+    traza.parar()
 
 
 # =====================================================
 # SIMULADOR DE ESCENARIO · ABSORCIÓN DE BRECHA
 # =====================================================
+traza.bloque("SIMULADOR DE ESCENARIO")
 
 st.divider()
 st.subheader("Simulador de escenario operativo")
@@ -279,25 +245,26 @@ absorcion = st.slider(
 ratio = absorcion / 100
 
 # Cálculos estructurales
-ventas_objetivo = be_real + (brecha * ratio)
-ebitda_esperado = brecha * ratio
+esc = ebitda.escenario(be_real, brecha, ratio)
+ventas_objetivo = esc["ventas_objetivo"]
+ebitda_esperado = esc["ebitda_esperado"]
 
 # Clasificación de zona
-if ratio < 0.5:
+if esc["zona"] == "sostenible":
     zona = "🟢 Sostenible"
     riesgo = "Bajo"
     mensaje = (
         "El negocio opera con colchón limitado. "
         "No absorbe toda la brecha, pero mantiene estabilidad."
     )
-elif ratio < 0.7:
+elif esc["zona"] == "eficiente":
     zona = "🟡 Eficiente"
     riesgo = "Controlado"
     mensaje = (
         "Zona óptima. Se absorbe gran parte de la brecha "
         "con equilibrio entre resultado y riesgo."
     )
-elif ratio <= 1:
+elif esc["zona"] == "exigente":
     zona = "🔴 Exigente"
     riesgo = "Alto"
     mensaje = (
@@ -330,6 +297,7 @@ st.info(mensaje)
 # =====================================================
 # LECTURA DEL OBJETIVO · REFERENCIAS ESTRUCTURALES
 # =====================================================
+traza.bloque("LECTURA DEL OBJETIVO")
 
 st.divider()
 st.subheader("Lectura del objetivo según tu estructura actual")
@@ -340,17 +308,16 @@ brecha = float(be["brecha_operativa_eur"])
 mc = float(be["margen_contribucion_real_pct"])
 
 # Escenarios
-ventas_sostenible = be_real
-
-ventas_eficiente_min = be_real + (brecha * 0.5)
-ventas_eficiente_max = be_real + (brecha * 0.7)
+obj = ebitda.objetivos(be_real, brecha, mc)
 
-ventas_exigente = be_real + brecha
+ventas_sostenible = obj["ventas_sostenible"]
+ventas_eficiente_min = obj["ventas_eficiente_min"]
+ventas_eficiente_max = obj["ventas_eficiente_max"]
+ventas_exigente = obj["ventas_exigente"]
 
-ebitda_eficiente_min = (ventas_eficiente_min - be_real) * mc
-ebitda_eficiente_max = (ventas_eficiente_max - be_real) * mc
-
-ebitda_exigente = brecha  # interpretación directa OYKEN
+ebitda_eficiente_min = obj["ebitda_eficiente_min"]
+ebitda_eficiente_max = obj["ebitda_eficiente_max"]
+ebitda_exigente = obj["ebitda_exigente"]
 
 # ---------- MENSAJE 1 · SOSTENIBLE ----------
 st.markdown(
@@ -391,9 +358,4 @@ Requiere disciplina operativa total; cualquier desviación impacta directamente.
     unsafe_allow_html=True
 )
 
-
-
-
-
-
-
+traza.fin()
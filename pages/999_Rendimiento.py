@@ -0,0 +1,106 @@
+import streamlit as st
+
+from oyken import rendimiento
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+# Página interna: las trazas solo se registran con OYKEN_TRAZAS=1
+st.set_page_config(page_title="OYKEN · Rendimiento", layout="wide")
+
+st.title("OYKEN · Rendimiento")
+st.caption("Memoria y tiempo por bloque de página · todas las sesiones del proceso")
+
+# =========================
+# MEMORIA
+# =========================
+st.subheader("Memoria")
+
+sesiones = rendimiento.memoria_sesiones()
+compartida = rendimiento.memoria_compartida()
+
+c1, c2, c3 = st.columns(3)
+c1.metric("Sesiones abiertas", len(sesiones))
+c2.metric("Por sesión (MB, total)", f"{sesiones['bytes'].sum() / 2**20:,.2f}")
+c3.metric("Compartida (MB)", f"{compartida['bytes'].sum() / 2**20:,.2f}")
+
+with st.expander("Detalle"):
+    st.markdown("**st.session_state por sesión**")
+    st.dataframe(sesiones, hide_index=True, use_container_width=True)
+    st.markdown("**Caché de proceso (una copia para todas las sesiones)**")
+    st.dataframe(
+        compartida.sort_values("bytes", ascending=False),
+        hide_index=True,
+        use_container_width=True
+    )
+
+# =========================
+# TRAZAS
+# =========================
+st.divider()
+if not rendimiento.activas():
+    st.info(
+        "Las trazas están desactivadas. Arranca la aplicación con "
+        "OYKEN_TRAZAS=1 para registrar el tiempo de cada bloque."
+    )
+    st.stop()
+
+df = rendimiento.registros()
+
+if df.empty:
+    st.info("Aún no hay bloques registrados: navega por las páginas y vuelve aquí.")
+    st.stop()
+
+c1, c2 = st.columns([3, 1])
+with c1:
+    paginas = st.multiselect(
+        "Páginas",
+        options=sorted(df["pagina"].unique()),
+        default=sorted(df["pagina"].unique())
+    )
+with c2:
+    st.metric("Registros en búfer", f"{len(df)} / {rendimiento.CAPACIDAD}")
+
+df = df[df["pagina"].isin(paginas)]
+
+# =========================
+# PERCENTILES POR BLOQUE
+# =========================
+st.divider()
+st.subheader("p50 / p95 por bloque")
+
+resumen = rendimiento.resumen(df)
+
+st.dataframe(
+    resumen,
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "pagina": "Página",
+        "bloque": "Bloque",
+        "ejecuciones": st.column_config.NumberColumn("Ejecuciones"),
+        "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+        "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+        "max_ms": st.column_config.NumberColumn("Máx (ms)", format="%.1f"),
+        "filas_media": st.column_config.NumberColumn("Filas (media)", format="%.0f"),
+        "leidos_medios": st.column_config.NumberColumn("Bytes leídos (media)", format="%.0f"),
+        "escritos_medios": st.column_config.NumberColumn("Bytes escritos (media)", format="%.0f"),
+    }
+)
+
+# =========================
+# TOTAL POR PÁGINA
+# =========================
+st.divider()
+st.subheader("p95 acumulado por página")
+st.caption("Suma de los p95 de sus bloques: cota del peor rerun habitual.")
+
+st.bar_chart(resumen.groupby("pagina")["p95_ms"].sum())
+
+# =========================
+# MANTENIMIENTO
+# =========================
+st.divider()
+if st.button("Vaciar búfer"):
+    rendimiento.vaciar()
+    st.rerun()
@@ -1,57 +1,35 @@
 import streamlit as st
-import pandas as pd
-from pathlib import Path
 from datetime import date
 
+from oyken import compartido, locales, rendimiento
+from oyken.catalogos import FAMILIAS_MERMAS, MOTIVOS, UNIDADES
+from oyken.storage import almacen
+
+traza = rendimiento.pagina(__file__)
+
 # =========================
 # CONFIGURACIÓN
 # =========================
+traza.bloque("CONFIGURACIÓN")
 
 st.title("OYKEN · Mermas")
 st.markdown("**Registro operativo de pérdidas de producto**")
 st.caption("Fase 1 · Control por cantidad. Sin valoración económica.")
 
-DATA_FILE = Path("mermas.csv")
+# Local activo (barra lateral): esta página trabaja sobre un solo local
+locales.selector(grupo=False)
+ALMACEN = almacen()
 
 # =========================
 # CARGA / ESTADO
 # =========================
-if DATA_FILE.exists():
-    df_mermas = pd.read_csv(DATA_FILE)
-else:
-    df_mermas = pd.DataFrame(
-        columns=[
-            "Fecha",
-            "Mes",
-            "Familia",
-            "Producto",
-            "Unidad",
-            "Cantidad",
-            "Motivo"
-        ]
-    )
-
-# =========================
-# CATÁLOGOS
-# =========================
-FAMILIAS = ["Matería Prima", "Bebidas", "Limpieza", "Otros"]
-
-UNIDADES = ["kg", "uds", "l"]
-
-MOTIVOS = [
-    "Caducidad",
-    "Sobreproducción",
-    "Error de elaboración",
-    "Error de pedido",
-    "Deterioro",
-    "Rotura",
-    "Ajuste inventario",
-    "Otro"
-]
+traza.bloque("CARGA")
+df_mermas = compartido.tabla("mermas", ALMACEN)
 
 # =========================
 # REGISTRO DE MERMA
 # =========================
+traza.bloque("REGISTRO DE MERMA")
 st.subheader("Registrar merma")
 
 with st.form("form_mermas", clear_on_submit=True):
@@ -66,7 +44,7 @@ with st.form("form_mermas", clear_on_submit=True):
         )
 
     with col2:
-        familia = st.selectbox("Familia", FAMILIAS)
+        familia = st.selectbox("Familia", FAMILIAS_MERMAS)
 
     producto = st.text_input(
         "Producto / referencia",
@@ -93,11 +71,11 @@ with st.form("form_mermas", clear_on_submit=True):
 
         if not producto.strip():
             st.warning("Debes indicar el producto.")
-            st.stop()
+            traza.parar()
 
         if cantidad <= 0:
             st.warning("La cantidad debe ser mayor que cero.")
-            st.stop()
+            traza.parar()
 
         nueva = {
             "Fecha": fecha.strftime("%d/%m/%Y"),
@@ -109,17 +87,15 @@ with st.form("form_mermas", clear_on_submit=True):
             "Motivo": motivo
         }
 
-        df_mermas = pd.concat(
-            [df_mermas, pd.DataFrame([nueva])],
-            ignore_index=True
-        )
-
-        df_mermas.to_csv(DATA_FILE, index=False)
+        # Escritura diferida: journal ahora, volcado por lotes (oyken.compartido)
+        compartido.anotar("mermas", nueva, ALMACEN)
+        df_mermas = compartido.tabla("mermas", ALMACEN)
         st.success("Merma registrada correctamente.")
 
 # =========================
 # VISUALIZACIÓN
 # =========================
+traza.bloque("VISUALIZACIÓN")
 st.divider()
 st.subheader("Mermas registradas")
 
@@ -158,3 +134,5 @@ else:
         st.markdown(
             f"**Total {row['Unidad']} perdidos:** {row['Cantidad']:.2f}"
         )
+
+traza.fin()